@@ -5,6 +5,7 @@ import { useUserCourseProgress } from "@/context/UserCourseProgressContext";
 import { DictationProblemSetResponse } from "@/types/response_models/ResourceResponse";
 import { DictationResponse, WritingPhotoRetakeResponse } from "@/types/response_models/LetterWritingResponse";
 import { DictationExplainInput } from "@/types/request_models/DictationExplainInput";
+import { EvaluationExplainInput } from "@/types/request_models/EvaluationExplainInput";
 import { WritingExplainOutput } from "@/types/response_models/WritingExplainOutput";
 import { useRouter } from "next/navigation";
 import { useState, useEffect, useRef } from "react";
@@ -290,17 +291,20 @@ const DictationProblemSet = () => {
         setError("");
 
         try {
-            const explainRequest: DictationExplainInput = {
-                query: query,
-                language: userCourseProgress!.language,
-                dialect: userCourseProgress?.dialect ?? null,
-                target_word: problem.word,
-                status: dictationResponse.status,
-                scores: dictationResponse.scores,
-                previous_feedback: feedback,
-                mistake_tags: dictationResponse.mistake_tags,
-                performance_reflection: dictationResponse.performance_reflection
-            };
+            // Once the evaluation is saved on the server we only need to send its id and the question
+            const explainRequest: DictationExplainInput | EvaluationExplainInput = dictationResponse.evaluation_id
+                ? { evaluation_id: dictationResponse.evaluation_id, query: query }
+                : {
+                    query: query,
+                    language: userCourseProgress!.language,
+                    dialect: userCourseProgress?.dialect ?? null,
+                    target_word: problem.word,
+                    status: dictationResponse.status,
+                    scores: dictationResponse.scores,
+                    previous_feedback: feedback,
+                    mistake_tags: dictationResponse.mistake_tags,
+                    performance_reflection: dictationResponse.performance_reflection
+                };
 
             const explainResponse = await fetch(
                 `${process.env.NEXT_PUBLIC_SERVER_URL}/writing/dictation/explain`,
@@ -5,6 +5,7 @@ import { useUserCourseProgress } from "@/context/UserCourseProgressContext";
 import { LetterJoiningProblemSetResponse } from "@/types/response_models/ResourceResponse";
 import { LetterJoiningResponse, WritingPhotoRetakeResponse } from "@/types/response_models/LetterWritingResponse";
 import { JoiningExplainInput } from "@/types/request_models/JoiningExplainInput";
+import { EvaluationExplainInput } from "@/types/request_models/EvaluationExplainInput";
 import { WritingExplainOutput } from "@/types/response_models/WritingExplainOutput";
 import { useRouter } from "next/navigation";
 import { useState, useEffect, useRef } from "react";
@@ -248,18 +249,21 @@ const LetterJoiningProblemSet = () => {
         setError("");
 
         try {
-            const explainRequest: JoiningExplainInput = {
-                query: query,
-                language: userCourseProgress!.language,
-                dialect: userCourseProgress?.dialect ?? null,
-                letter_list: problem.letter_list,
-                target_word: problem.word,
-                status: joiningResponse.status,
-                scores: joiningResponse.scores,
-                previous_feedback: feedback,
-                mistake_tags: joiningResponse.mistake_tags,
-                performance_reflection: joiningResponse.performance_reflection
-            };
+            // Once the evaluation is saved on the server we only need to send its id and the question
+            const explainRequest: JoiningExplainInput | EvaluationExplainInput = joiningResponse.evaluation_id
+                ? { evaluation_id: joiningResponse.evaluation_id, query: query }
+                : {
+                    query: query,
+                    language: userCourseProgress!.language,
+                    dialect: userCourseProgress?.dialect ?? null,
+                    letter_list: problem.letter_list,
+                    target_word: problem.word,
+                    status: joiningResponse.status,
+                    scores: joiningResponse.scores,
+                    previous_feedback: feedback,
+                    mistake_tags: joiningResponse.mistake_tags,
+                    performance_reflection: joiningResponse.performance_reflection
+                };
 
             const explainResponse = await fetch(
                 `${process.env.NEXT_PUBLIC_SERVER_URL}/writing/joining/explain`,
@@ -5,6 +5,7 @@ import { useUserCourseProgress } from "@/context/UserCourseProgressContext";
 import { LetterWritingProblemSetResponse } from "@/types/response_models/ResourceResponse";
 import { LetterWritingResponse, WritingPhotoRetakeResponse } from "@/types/response_models/LetterWritingResponse";
 import { WritingExplainInput } from "@/types/request_models/WritingExplainInput";
+import { EvaluationExplainInput } from "@/types/request_models/EvaluationExplainInput";
 import { WritingExplainOutput } from "@/types/response_models/WritingExplainOutput";
 import { useRouter } from "next/navigation";
 import { useState, useEffect, useRef } from "react";
@@ -166,11 +167,8 @@ const LetterWritingProblemSet = () => {
             
             formData.append('user_image', uploadedImage);
             
-            // Fetch the reference image
-            const referenceResponse = await fetch(problem.reference_writing);
-            const referenceBlob = await referenceResponse.blob();
-            const referenceFile = new File([referenceBlob], 'reference.png', { type: 'image/png' });
-            formData.append('target_image', referenceFile);
+            // The server looks up (and caches) the reference image for the problem itself
+            formData.append('problem_id', String(problem.id));
             
             formData.append('letter', problem.letter);
             // Convert position to lowercase to match backend enum (database has "Standalone", backend expects "standalone")
@@ -251,18 +249,21 @@ const LetterWritingProblemSet = () => {
         setError("");
 
         try {
-            const explainRequest: WritingExplainInput = {
-                query: query,
-                language: userCourseProgress!.language,
-                dialect: userCourseProgress?.dialect ?? null,
-                letter: problem.letter,
-                position: problem.position.toLowerCase(),
-                status: writingResponse.status,
-                scores: writingResponse.scores,
-                previous_feedback: feedback,
-                mistake_tags: writingResponse.mistake_tags,
-                performance_reflection: writingResponse.performance_reflection
-            };
+            // Once the evaluation is saved on the server we only need to send its id and the question
+            const explainRequest: WritingExplainInput | EvaluationExplainInput = writingResponse.evaluation_id
+                ? { evaluation_id: writingResponse.evaluation_id, query: query }
+                : {
+                    query: query,
+                    language: userCourseProgress!.language,
+                    dialect: userCourseProgress?.dialect ?? null,
+                    letter: problem.letter,
+                    position: problem.position.toLowerCase(),
+                    status: writingResponse.status,
+                    scores: writingResponse.scores,
+                    previous_feedback: feedback,
+                    mistake_tags: writingResponse.mistake_tags,
+                    performance_reflection: writingResponse.performance_reflection
+                };
 
             const explainResponse = await fetch(
                 `${process.env.NEXT_PUBLIC_SERVER_URL}/writing/letter/explain`,
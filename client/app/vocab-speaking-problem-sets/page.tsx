@@ -14,6 +14,7 @@ import { AvailableDialect, Gender } from "@/types/enums";
 import { VoiceTutorTTSInput } from "@/types/request_models/VoiceTutorTTSInput";
 import { VoiceTutorTTSOutput } from "@/types/response_models/VoiceTutorTTSOutput";
 import { VoiceTutorExplainInput } from "@/types/request_models/VoiceTutorExplainInput";
+import { EvaluationExplainInput } from "@/types/request_models/EvaluationExplainInput";
 import { VoiceTutorExplainOutput } from "@/types/response_models/VoiceTutorExplainOutput";
 import { isAuthError, handleAuthError } from "@/utils/auth";
 
@@ -41,6 +42,7 @@ const VocabSpeakingProblemSets = () => {
     const [audioBlob, setAudioBlob] = useState<Blob | null>(null);
     const mediaRecorderRef = useRef<MediaRecorder | null>(null);
     const audioChunksRef = useRef<Blob[]>([]);
+    const runRef = useRef<{ blob: Blob, id: string } | null>(null); // Retrying the same recording resumes its run on the server
 
     // Audio Refs
     const playAudioRef = useRef<HTMLAudioElement | null>(null);
@@ -256,12 +258,17 @@ const VocabSpeakingProblemSets = () => {
             })
 
             // 2. We get back the voice tutor response
+            if (runRef.current?.blob !== audioBlob) {
+                runRef.current = { blob: audioBlob, id: crypto.randomUUID() };
+            }
+
             const requestBody: VoiceTutorInput = {
                 question: question,
                 language: language,
                 dialect: dialect ?? null,
                 vocab_words: vocabWords,
-                user_audio_base64: base64Audio
+                user_audio_base64: base64Audio,
+                run_id: runRef.current.id
             }
 
             const generatedResponse = await fetch(
@@ -364,19 +371,22 @@ const VocabSpeakingProblemSets = () => {
             );
 
             // 2. We generate the response to user query
-            const explainRequest: VoiceTutorExplainInput = {
-                query: query,
-                question: question,
-                language: language,
-                dialect: dialect ?? null,
-                vocab_words: vocabWords,
-                transcription: tutorOutput.transcription,
-                pronounciation_scores: tutorOutput.pronounciation_scores,
-                semantic_evaluation: tutorOutput.semantic_evaluation,
-                status: tutorOutput.status as "pass" | "fail",
-                performance_reflection: tutorOutput.performance_reflection,
-                previous_feedback: previousFeedback
-            }
+            // Once the evaluation is saved on the server we only need to send its id and the question
+            const explainRequest: VoiceTutorExplainInput | EvaluationExplainInput = tutorOutput.evaluation_id
+                ? { evaluation_id: tutorOutput.evaluation_id, query: query }
+                : {
+                    query: query,
+                    question: question,
+                    language: language,
+                    dialect: dialect ?? null,
+                    vocab_words: vocabWords,
+                    transcription: tutorOutput.transcription,
+                    pronounciation_scores: tutorOutput.pronounciation_scores,
+                    semantic_evaluation: tutorOutput.semantic_evaluation,
+                    status: tutorOutput.status as "pass" | "fail",
+                    performance_reflection: tutorOutput.performance_reflection,
+                    previous_feedback: previousFeedback
+                }
 
             const explainResponse = await fetch(
                 `${process.env.NEXT_PUBLIC_SERVER_URL}/speaking/explain`,
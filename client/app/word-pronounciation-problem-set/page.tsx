@@ -3,6 +3,7 @@
 import { useResource } from "@/context/ResourceContext"
 import { useUserCourseProgress } from "@/context/UserCourseProgressContext";
 import { PronounciationExplainInput } from "@/types/request_models/PronounciationExplainInput";
+import { EvaluationExplainInput } from "@/types/request_models/EvaluationExplainInput";
 import { PronounciationExplainOutput } from "@/types/response_models/PronounciationExplainOutput";
 import { PronounciationResponse } from "@/types/response_models/PronounciationResponse";
 import { WordPronounciationProblemSetResponse } from "@/types/response_models/ResourceResponse";
@@ -60,6 +61,7 @@ const WordPronounciationProblemSet = () => {
     const [feedback, setFeedback] = useState<string[]>([]);
     const mistake_tags = useRef<string[]>([]);
     const performance_reflection = useRef<string>("");
+    const evaluation_id = useRef<string | null>(null);
     const [showFeedback, setShowFeedback] = useState<boolean>(false);
     const [passed, setPassed] = useState<boolean>(false);
     
@@ -112,6 +114,7 @@ const WordPronounciationProblemSet = () => {
         setFeedback([]);
         mistake_tags.current = [];
         performance_reflection.current = "";
+        evaluation_id.current = null;
         setShowFeedback(false);
         setPassed(false);
         setAudioBlob(null);
@@ -235,6 +238,7 @@ const WordPronounciationProblemSet = () => {
             setFeedback([pronounciationCheckResult.feedback]);
             mistake_tags.current = pronounciationCheckResult.mistake_tags;
             performance_reflection.current = pronounciationCheckResult.performance_reflection;
+            evaluation_id.current = pronounciationCheckResult.evaluation_id ?? null;
 
             if(pronounciationCheckResult.status === "pass"){
                 setPassed(true);
@@ -271,17 +275,20 @@ const WordPronounciationProblemSet = () => {
         setError("");
 
         try{
-            const explainRequest: PronounciationExplainInput = {
-                query: query,
-                language: userCourseProgress!.language,
-                dialect: userCourseProgress?.dialect ?? null,
-                phrase: word.current,
-                status: status,
-                transcription: transcription.current,
-                previous_feedback: feedback,
-                mistake_tags: mistake_tags.current,
-                performance_reflection: performance_reflection.current
-            }
+            // Once the evaluation is saved on the server we only need to send its id and the question
+            const explainRequest: PronounciationExplainInput | EvaluationExplainInput = evaluation_id.current
+                ? { evaluation_id: evaluation_id.current, query: query }
+                : {
+                    query: query,
+                    language: userCourseProgress!.language,
+                    dialect: userCourseProgress?.dialect ?? null,
+                    phrase: word.current,
+                    status: status,
+                    transcription: transcription.current,
+                    previous_feedback: feedback,
+                    mistake_tags: mistake_tags.current,
+                    performance_reflection: performance_reflection.current
+                }
 
             const explainResponse = await fetch(
                 `${process.env.NEXT_PUBLIC_SERVER_URL}/pronounciation/explain`,
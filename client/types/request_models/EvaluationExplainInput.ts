@@ -0,0 +1,4 @@
+export interface EvaluationExplainInput {
+    evaluation_id: string;
+    query: string;
+}
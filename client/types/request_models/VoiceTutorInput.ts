@@ -7,4 +7,5 @@ export interface VoiceTutorInput {
     dialect: AvailableDialect | null;
     vocab_words: VocabWordResponse[];
     user_audio_base64: string | null;
+    run_id?: string | null;
 }
\ No newline at end of file
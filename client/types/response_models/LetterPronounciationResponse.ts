@@ -3,5 +3,6 @@ export interface LetterPronounciationResponse {
     transcription: string;
     feedback: string;
     mistake_tags: string[];
-    performance_reflection: string
+    performance_reflection: string;
+    evaluation_id?: string | null;
 }
\ No newline at end of file
@@ -1,8 +1,9 @@
 export interface LetterHandwritingScores {
-    legibility: number;
-    form_accuracy: number;
-    dots_diacritics: number;
-    baseline_proportion: number;
+    // null when the writing was failed by the shape check without being graded in detail
+    legibility: number | null;
+    form_accuracy: number | null;
+    dots_diacritics: number | null;
+    baseline_proportion: number | null;
     overall: number;
 }
 
@@ -12,6 +13,7 @@ export interface LetterWritingResponse {
     feedback: string;
     mistake_tags: string[];
     performance_reflection: string;
+    evaluation_id?: string | null;
 }
 
 export interface LetterJoiningScores {
@@ -29,6 +31,7 @@ export interface LetterJoiningResponse {
     feedback: string;
     mistake_tags: string[];
     performance_reflection: string;
+    evaluation_id?: string | null;
 }
 
 export interface DictationScores {
@@ -48,6 +51,7 @@ export interface DictationResponse {
     feedback: string;
     mistake_tags: string[];
     performance_reflection: string;
+    evaluation_id?: string | null;
 }
 
 export interface WritingPhotoRetakeResponse {
@@ -4,4 +4,5 @@ export interface PronounciationResponse {
     feedback: string;
     mistake_tags: string[];
     performance_reflection: string;
+    evaluation_id?: string | null;
 }
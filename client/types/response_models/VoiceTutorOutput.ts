@@ -8,4 +8,5 @@ export interface VoiceTutorOutput{
     performance_reflection: string;
     feedback_text: string | null;
     feedback_audio_base64: string | null;
+    evaluation_id?: string | null;
 }
\ No newline at end of file
@@ -76,6 +76,10 @@ from app.routers.speaking import speaking_router
 from app.routers.writing import writing_router
 
 from app.db.database import get_db
+from app.utils.metrics import metrics
+from app.services.writing_service import writing_stats
+from app.services.pronounciation_service import pronounciation_stats
+from app.utils.llm_gateway import llm_gateway
 
 
 app = FastAPI()
@@ -121,4 +125,16 @@ def health_check(db: Session = Depends(get_db)):
          return {
             "status": "unhealthy",
             "test_query_result": str(e)
-        }
\ No newline at end of file
+        }
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Counters and timings for the AI pipelines, plus the state of the LLM circuit breakers, prompt cache hit rates, and the writing and pronounciation pipelines"""
+    return {
+        **metrics.snapshot(),
+        "llm_circuits": llm_gateway.stats(),
+        "llm_prompt_cache": llm_gateway.prompt_cache_stats(),
+        "writing": writing_stats(),
+        "pronounciation": pronounciation_stats()
+    }
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class EvaluationExplainInput(BaseModel):
+    """A follow up question about a graded attempt whose evaluation is stored on the server"""
+    evaluation_id: str
+    query: str
@@ -3,15 +3,21 @@ from pydantic import BaseModel
 from app.db.enums import AvailableDialect, AvailableLanguage
 
 
+class PronounciationFeedback(BaseModel):
+    feedback: str
+    mistake_tags: List[str]
+    performance_reflection: str
+
 class PronounciationResponse(BaseModel):
     status: Literal["pass", "fail"]
     transcription: str
     feedback: str
     mistake_tags: List[str]
     performance_reflection: str
+    trimmed_duration: float | None = None # Seconds of audio sent for scoring after silence trimming
+    evaluation_id: str | None = None # Lets follow up questions send just this id and the query
 
-class PronounciationExplainInput(BaseModel):
-    query: str
+class PronounciationEvaluationContext(BaseModel):
     language: AvailableLanguage
     dialect: AvailableDialect | None
     phrase: str
@@ -21,5 +27,8 @@ class PronounciationExplainInput(BaseModel):
     mistake_tags: List[str]
     performance_reflection: str
 
+class PronounciationExplainInput(PronounciationEvaluationContext):
+    query: str
+
 class PronounciationExplainResponse(BaseModel):
     response: str
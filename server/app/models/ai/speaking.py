@@ -2,6 +2,7 @@ from pydantic import BaseModel
 from typing import List, Literal
 from app.models.db.vocab.vocab_word_response import VocabWordResponse
 from app.db.enums import AvailableDialect, AvailableLanguage
+from app.utils.constants import TTS_OUTPUT_FORMAT
 
 
 class PronounciationScores(BaseModel):
@@ -11,14 +12,31 @@ class PronounciationScores(BaseModel):
     overall: float = 0.0
 
 
-class SemanticEvaluation(BaseModel):
-    """Shows how much the answer made sematic sense of for the question asked"""
-    vocab_words_used: List[str] = []
+class SemanticJudgement(BaseModel):
+    """The parts of the semantic evaluation the LLM decides: whether the answer makes sense and how good its grammar is"""
     answer_makes_sense: bool = False
     grammatical_score: float = 0.0
     grammar_notes: str = ""
 
 
+class SemanticEvaluation(SemanticJudgement):
+    """Shows how much the answer made sematic sense of for the question asked"""
+    vocab_words_used: List[str] = [] # Found in the transcription locally, see app/utils/text_normalization.py
+
+
+class SpeakingFeedback(BaseModel):
+    """The feedback the LLM writes for a graded response"""
+    feedback_text: str
+    performance_reflection: str
+
+
+class SpeakingEvaluationAndFeedback(SemanticJudgement):
+    """The semantic evaluation and the feedback for both outcomes, written in a single LLM call"""
+    pass_feedback_text: str
+    fail_feedback_text: str
+    performance_reflection: str
+
+
 class VoiceTutorInput(BaseModel):
     """Audio input of user's response"""
     question: str = ""
@@ -26,6 +44,9 @@ class VoiceTutorInput(BaseModel):
     dialect: AvailableDialect | None = None
     vocab_words: List[VocabWordResponse] = []
     user_audio_base64: str | None = None
+    audio_accept: str | None = None # Accept-style feedback audio preference, e.g. "audio/ogg, audio/mpeg;bitrate=128;q=0.5"
+    tts_mode: Literal["inline", "pipelined", "deferred", "skip"] = "inline" # pipelined speaks the feedback while it is generated, deferred returns a feedback_audio_id to fetch the audio with later
+    run_id: str | None = None # Chosen by the client. Retrying a failed request with the same run_id resumes it at the step that failed.
 
 
 class VoiceTutorOutput(BaseModel):
@@ -37,6 +58,9 @@ class VoiceTutorOutput(BaseModel):
     performance_reflection: str
     feedback_text: str | None = None
     feedback_audio_base64: str | None = None
+    feedback_audio_id: str | None = None # Set when tts_mode is deferred
+    trimmed_duration: float | None = None # Seconds of user audio evaluated after silence trimming
+    evaluation_id: str | None = None # Lets follow up questions send just this id and the query
 
 
 class VoiceTutorState(BaseModel):
@@ -45,8 +69,11 @@ class VoiceTutorState(BaseModel):
     language: AvailableLanguage = AvailableLanguage.FRENCH
     dialect: AvailableDialect | None = None
     vocab_words: List[VocabWordResponse] = []
-    user_audio_base64: str | None = None
+    audio_format: str = TTS_OUTPUT_FORMAT
+    tts_mode: Literal["inline", "pipelined", "deferred", "skip"] = "inline"
+    audio_hash: str = "" # The recording itself is kept on the SpeakingService, out of the checkpointed state
     # Evaluation
+    trimmed_duration: float | None = None
     transcription: str = ""
     pronounciation_scores: PronounciationScores = PronounciationScores()
     semantic_evaluation: SemanticEvaluation = SemanticEvaluation()
@@ -57,8 +84,8 @@ class VoiceTutorState(BaseModel):
     feedback_audio_base64: str | None = None
 
 
-class VoiceTutorExplainInput(BaseModel):
-    query: str
+class VoiceTutorEvaluationContext(BaseModel):
+    """What follow up questions about a speaking attempt are answered from"""
     question: str
     language: AvailableLanguage
     dialect: AvailableDialect | None = None
@@ -70,12 +97,16 @@ class VoiceTutorExplainInput(BaseModel):
     performance_reflection: str
     previous_feedback: List[str]
 
+class VoiceTutorExplainInput(VoiceTutorEvaluationContext):
+    query: str
+
 class VoiceTutorExplainOutput(BaseModel):
     response_text: str | None = None
 
 
 class VoiceTutorTTSInput(BaseModel):
     text: str = ""
+    audio_accept: str | None = None # Accept-style audio preference, e.g. "audio/ogg, audio/mpeg;q=0.5"
 
 
 class VoiceTutorTTSOutput(BaseModel):
@@ -14,10 +14,11 @@ class WritingPhotoRetakeResponse(BaseModel):
     capture_tips: str
 
 class LetterHandwritingScores(BaseModel):
-    legibility: float
-    form_accuracy: float
-    dots_diacritics: float
-    baseline_proportion: float
+    # None when the writing was failed by the local shape check without being graded in detail
+    legibility: float | None = None
+    form_accuracy: float | None = None
+    dots_diacritics: float | None = None
+    baseline_proportion: float | None = None
     overall: float
 
 class LetterWritingResponse(BaseModel):
@@ -26,6 +27,7 @@ class LetterWritingResponse(BaseModel):
     feedback: str
     mistake_tags: List[str]
     performance_reflection: str
+    evaluation_id: str | None = None # Lets follow up questions send just this id and the query
 
 class LetterJoiningScores(BaseModel):
     connection_accuracy: float
@@ -41,6 +43,7 @@ class LetterJoiningResponse(BaseModel):
     feedback: str
     mistake_tags: List[str]
     performance_reflection: str
+    evaluation_id: str | None = None # Lets follow up questions send just this id and the query
 
 class DictationScores(BaseModel):
     word_accuracy: float
@@ -58,9 +61,9 @@ class DictationResponse(BaseModel):
     feedback: str
     mistake_tags: List[str]
     performance_reflection: str
+    evaluation_id: str | None = None # Lets follow up questions send just this id and the query
 
-class WritingExplainInput(BaseModel):
-    query: str
+class WritingEvaluationContext(BaseModel):
     language: AvailableLanguage
     dialect: AvailableDialect | None
     letter: str
@@ -71,8 +74,10 @@ class WritingExplainInput(BaseModel):
     mistake_tags: List[str]
     performance_reflection: str
 
-class JoiningExplainInput(BaseModel):
+class WritingExplainInput(WritingEvaluationContext):
     query: str
+
+class JoiningEvaluationContext(BaseModel):
     language: AvailableLanguage
     dialect: AvailableDialect | None
     letter_list: List[str]
@@ -83,8 +88,10 @@ class JoiningExplainInput(BaseModel):
     mistake_tags: List[str]
     performance_reflection: str
 
-class DictationExplainInput(BaseModel):
+class JoiningExplainInput(JoiningEvaluationContext):
     query: str
+
+class DictationEvaluationContext(BaseModel):
     language: AvailableLanguage
     dialect: AvailableDialect | None
     target_word: str
@@ -94,5 +101,29 @@ class DictationExplainInput(BaseModel):
     mistake_tags: List[str]
     performance_reflection: str
 
+class DictationExplainInput(DictationEvaluationContext):
+    query: str
+
 class WritingExplainResponse(BaseModel):
-    response: str
\ No newline at end of file
+    response: str
+
+class WritingBatchItem(BaseModel):
+    problem_type: Literal["letter_writing", "letter_joining", "dictation"]
+    problem_id: int
+
+class WritingBatchItemResult(BaseModel):
+    index: int # Position of the item (and its image) in the batch
+    problem_type: Literal["letter_writing", "letter_joining", "dictation"]
+    problem_id: int
+    result: LetterWritingResponse | LetterJoiningResponse | DictationResponse | WritingPhotoRetakeResponse
+
+class WritingBatchItemError(BaseModel):
+    index: int
+    problem_type: Literal["letter_writing", "letter_joining", "dictation"]
+    problem_id: int
+    status_code: int
+    detail: str
+
+class WritingBatchSummary(BaseModel):
+    completed: int
+    failed: int
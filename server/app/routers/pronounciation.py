@@ -1,7 +1,11 @@
 from fastapi import APIRouter, UploadFile, File, Form, Depends
+from fastapi.responses import StreamingResponse
 from app.models.ai.pronounciation import PronounciationResponse, PronounciationExplainInput, PronounciationExplainResponse
+from app.models.ai.evaluation import EvaluationExplainInput
 from app.services.pronounciation_service import PronounciationService
 from app.utils.di import get_pronounciation_service
+from app.utils.auth import get_current_user_email
+from app.utils.sse import sse_response
 from app.db.enums import AvailableLanguage, AvailableDialect
 
 
@@ -15,16 +19,29 @@ async def check_pronounciation(
     isWord: bool = Form(...),
     language: AvailableLanguage = Form(...),
     dialect: AvailableDialect | None = Form(None), # This is nullable form field
+    rich_feedback: bool = Form(False), # Has the LLM write the feedback even when the scores make the outcome clear
+    email: str = Depends(get_current_user_email),
     service: PronounciationService = Depends(get_pronounciation_service)
 ) -> PronounciationResponse:
     """Take in a user's pronounciation recording and return its evaluation."""
-    return await service.check_pronounciation(user_audio, phrase, isWord, language, dialect)
+    return await service.check_pronounciation(user_audio, phrase, isWord, language, dialect, rich_feedback, email)
 
 
 @pronounciation_router.post("/explain", response_model=PronounciationExplainResponse)
 async def explain_pronounciation(
-    input: PronounciationExplainInput, 
+    input: PronounciationExplainInput | EvaluationExplainInput, # Either the full evaluation or the id it was saved under
+    email: str = Depends(get_current_user_email),
     service: PronounciationService = Depends(get_pronounciation_service)
 ) -> PronounciationExplainResponse:
     """Takes in a reflection of the user's pronounciation and past questions to generate a response for their query."""
-    return await service.explain_pronounciation(input)
\ No newline at end of file
+    return await service.explain_pronounciation(input, email)
+
+
+@pronounciation_router.post("/explain/stream")
+async def stream_explain_pronounciation(
+    input: PronounciationExplainInput | EvaluationExplainInput,
+    email: str = Depends(get_current_user_email),
+    service: PronounciationService = Depends(get_pronounciation_service)
+) -> StreamingResponse:
+    """Streams the answer to a question about the user's pronounciation as Server-Sent Events while it is written."""
+    return sse_response(await service.stream_explain_pronounciation(input, email))
\ No newline at end of file
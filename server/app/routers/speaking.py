@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from app.models.ai.speaking import VoiceTutorExplainInput, VoiceTutorExplainOutput, VoiceTutorInput, VoiceTutorOutput, VoiceTutorTTSInput, VoiceTutorTTSOutput
+from app.models.ai.evaluation import EvaluationExplainInput
 from app.services.speaking_service import SpeakingService
 from app.utils.auth import get_current_user_email
 from app.utils.di import get_speaking_service
+from app.utils.sse import sse_response
 
 
 speaking_router = APIRouter()
@@ -25,14 +28,44 @@ async def generate_response(
     service: SpeakingService = Depends(get_speaking_service)
 ) -> VoiceTutorOutput:
     """Generates feedback on the user's speaking performance based on the question details."""
-    return await service.generate_response(input)
+    return await service.generate_response(input, email)
+
+
+@speaking_router.post("/generate-response/stream")
+async def stream_response(
+    input: VoiceTutorInput,
+    email: str = Depends(get_current_user_email),
+    service: SpeakingService = Depends(get_speaking_service)
+) -> StreamingResponse:
+    """Streams each stage of the speaking feedback as Server-Sent Events as soon as it is ready."""
+    return sse_response(service.stream_response(input, email))
+
+
+@speaking_router.get("/feedback-audio/{feedback_audio_id}", response_model=VoiceTutorTTSOutput)
+async def get_feedback_audio(
+    feedback_audio_id: str,
+    email: str = Depends(get_current_user_email),
+    service: SpeakingService = Depends(get_speaking_service)
+) -> VoiceTutorTTSOutput:
+    """Returns the feedback audio for a response generated with deferred TTS."""
+    return await service.get_feedback_audio(feedback_audio_id, email)
 
 
 @speaking_router.post("/explain", response_model=VoiceTutorExplainOutput)
 async def explain_speaking(
-    input: VoiceTutorExplainInput,
+    input: VoiceTutorExplainInput | EvaluationExplainInput, # Either the full evaluation or the id it was saved under
     email: str = Depends(get_current_user_email),
     service: SpeakingService = Depends(get_speaking_service)
 ) -> VoiceTutorExplainOutput:
     """Answers questions regarding user speaking performance based on previous evaluation."""
-    return await service.explain_response(input)
\ No newline at end of file
+    return await service.explain_response(input, email)
+
+
+@speaking_router.post("/explain/stream")
+async def stream_explain_speaking(
+    input: VoiceTutorExplainInput | EvaluationExplainInput,
+    email: str = Depends(get_current_user_email),
+    service: SpeakingService = Depends(get_speaking_service)
+) -> StreamingResponse:
+    """Streams the answer to a question about the user's speaking performance as Server-Sent Events while it is written."""
+    return sse_response(await service.stream_explain_response(input, email))
\ No newline at end of file
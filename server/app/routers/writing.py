@@ -1,10 +1,16 @@
 from typing import List
 from fastapi import APIRouter, Depends, File, Form, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.db.database import get_db
 from app.models.ai.writing import DictationExplainInput, DictationResponse, JoiningExplainInput, LetterJoiningResponse, LetterWritingResponse, WritingExplainInput, WritingExplainResponse, WritingPhotoRetakeResponse
+from app.models.ai.evaluation import EvaluationExplainInput
 from app.services.writing_service import WritingService
 from app.utils.di import get_writing_service
 from app.utils.enums import LetterPosition
 from app.db.enums import AvailableDialect, AvailableLanguage
+from app.utils.sse import sse_response
+from app.utils.auth import get_current_user_email
 
 
 writing_router = APIRouter()
@@ -13,15 +19,21 @@ writing_router = APIRouter()
 @writing_router.post("/letter", response_model=LetterWritingResponse | WritingPhotoRetakeResponse)
 async def check_letter_writing(
     user_image: UploadFile = File(...), 
-    target_image: UploadFile = File(...), 
-    letter: str = Form(...), 
+    target_image: UploadFile | None = File(None), 
+    letter: str | None = Form(None), 
     language: AvailableLanguage = Form(...),
     dialect: AvailableDialect | None = Form(None),
     position: LetterPosition | None = Form(None),
+    problem_id: int | None = Form(None),
+    email: str = Depends(get_current_user_email),
+    db: Session = Depends(get_db),
     service: WritingService = Depends(get_writing_service)
 ):
-    """Takes in an image of the user's letter writing and evaluates it."""
-    return await service.check_letter_writing(user_image, target_image, letter, language, dialect, position)
+    """
+    Takes in an image of the user's letter writing and evaluates it. Send problem_id to use the problem's stored
+    reference image, letter and position, or upload target_image along with the letter instead.
+    """
+    return await service.check_letter_writing(db, user_image, target_image, letter, language, dialect, position, problem_id, email)
 
 
 @writing_router.post("/joining", response_model=LetterJoiningResponse | WritingPhotoRetakeResponse)
@@ -31,10 +43,11 @@ async def check_letter_joining(
     target_word: str = Form(...),
     language: AvailableLanguage = Form(...),
     dialect: AvailableDialect | None = Form(None),
+    email: str = Depends(get_current_user_email),
     service: WritingService = Depends(get_writing_service)
 ):
     """Takes in an image of the user's writing of joining letters and evaluates it."""
-    return await service.check_letter_joining(user_image, letter_list, target_word, language, dialect)
+    return await service.check_letter_joining(user_image, letter_list, target_word, language, dialect, email)
 
 
 @writing_router.post("/dictation", response_model=DictationResponse | WritingPhotoRetakeResponse)
@@ -43,34 +56,86 @@ async def check_dictation(
     target_word: str = Form(...),
     language: AvailableLanguage = Form(...),
     dialect: AvailableDialect | None = Form(None),
+    email: str = Depends(get_current_user_email),
     service: WritingService = Depends(get_writing_service)
 ):
     """Takes in an image of the user's writing of a dictated word and evaluates it."""
-    return await service.check_dictation(user_image, target_word, language, dialect)
+    return await service.check_dictation(user_image, target_word, language, dialect, email)
+
+
+@writing_router.post("/batch")
+async def grade_batch(
+    images: List[UploadFile] = File(...),
+    items: str = Form(...),
+    language: AvailableLanguage = Form(...),
+    dialect: AvailableDialect | None = Form(None),
+    email: str = Depends(get_current_user_email),
+    db: Session = Depends(get_db),
+    service: WritingService = Depends(get_writing_service)
+):
+    """
+    Grades several writing images at once, e.g. a photographed worksheet. items is a JSON list of
+    {"problem_type": "letter_writing" | "letter_joining" | "dictation", "problem_id": int}, one per image in the same order.
+    Streams a "result" or "item_error" event per item as it finishes, then a "done" event.
+    """
+    return sse_response(await service.grade_batch(db, images, items, language, dialect, email))
 
 
 @writing_router.post("/letter/explain", response_model=WritingExplainResponse)
 async def explain_writing(
-    input: WritingExplainInput,
+    input: WritingExplainInput | EvaluationExplainInput, # Either the full evaluation or the id it was saved under
+    email: str = Depends(get_current_user_email),
     service: WritingService = Depends(get_writing_service)
 ) -> WritingExplainResponse:
     """Takes in a reflection on the user's letter writing performance and user question and returns a response."""
-    return await service.explain_writing(input)
+    return await service.explain_writing(input, email)
+
+
+@writing_router.post("/letter/explain/stream")
+async def stream_explain_writing(
+    input: WritingExplainInput | EvaluationExplainInput,
+    email: str = Depends(get_current_user_email),
+    service: WritingService = Depends(get_writing_service)
+) -> StreamingResponse:
+    """Streams the answer to a question about the user's letter writing performance as Server-Sent Events while it is written."""
+    return sse_response(await service.stream_explain_writing(input, email))
 
 
 @writing_router.post("/joining/explain", response_model=WritingExplainResponse)
 async def explain_joining(
-    input: JoiningExplainInput,
+    input: JoiningExplainInput | EvaluationExplainInput, # Either the full evaluation or the id it was saved under
+    email: str = Depends(get_current_user_email),
     service: WritingService = Depends(get_writing_service)
 ) -> WritingExplainResponse:
     """Takes in a reflection on the user's letter joining performance and user question and returns a response."""
-    return await service.explain_joining(input)
+    return await service.explain_joining(input, email)
+
+
+@writing_router.post("/joining/explain/stream")
+async def stream_explain_joining(
+    input: JoiningExplainInput | EvaluationExplainInput,
+    email: str = Depends(get_current_user_email),
+    service: WritingService = Depends(get_writing_service)
+) -> StreamingResponse:
+    """Streams the answer to a question about the user's letter joining performance as Server-Sent Events while it is written."""
+    return sse_response(await service.stream_explain_joining(input, email))
 
 
 @writing_router.post("/dictation/explain", response_model=WritingExplainResponse)
 async def explain_dictation(
-    input: DictationExplainInput,
+    input: DictationExplainInput | EvaluationExplainInput, # Either the full evaluation or the id it was saved under
+    email: str = Depends(get_current_user_email),
     service: WritingService = Depends(get_writing_service)
 ) -> WritingExplainResponse:
     """Takes in a reflection on the user's dictation performance and user question and returns a response."""
-    return await service.explain_dictation(input)
\ No newline at end of file
+    return await service.explain_dictation(input, email)
+
+
+@writing_router.post("/dictation/explain/stream")
+async def stream_explain_dictation(
+    input: DictationExplainInput | EvaluationExplainInput,
+    email: str = Depends(get_current_user_email),
+    service: WritingService = Depends(get_writing_service)
+) -> StreamingResponse:
+    """Streams the answer to a question about the user's dictation performance as Server-Sent Events while it is written."""
+    return sse_response(await service.stream_explain_dictation(input, email))
\ No newline at end of file
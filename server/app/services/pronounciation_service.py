@@ -1,14 +1,30 @@
-from app.models.ai.pronounciation import PronounciationExplainInput, PronounciationExplainResponse, PronounciationResponse
+from app.models.ai.pronounciation import PronounciationEvaluationContext, PronounciationFeedback, PronounciationExplainInput, PronounciationExplainResponse, PronounciationResponse
+from app.models.ai.evaluation import EvaluationExplainInput
 from fastapi import HTTPException, UploadFile, status
-from pydub import AudioSegment
-from app.utils.constants import PRONOUNCIATION_BASE_URL, AZURE_LANGUAGE_CODE
-from app.utils.openai import openai_client
+from typing import AsyncIterator, Dict, List, Tuple
+from app.utils.audio import normalize_audio
+from app.utils.constants import PRONOUNCIATION_BASE_URL, AZURE_LANGUAGE_CODE, PRONOUNCIATION_TEMPLATED_FEEDBACK_ENABLED
+from app.utils.llm_gateway import llm_gateway
+from app.utils.evaluation_store import evaluation_store, record_answer, resolve_explain_input
+from app.utils.conversation_memory import render_previous_feedback
+from app.utils.explain_stream import stream_explain_answer
+from app.utils.explain_cache import explain_cache
+from app.utils.metrics import metrics
+from app.utils.pronounciation_feedback import passes, score_band, templated_feedback, parse_word_details
 from app.db.enums import AvailableLanguage, AvailableDialect
-import os, httpx, io, base64, json
+import os, httpx, base64, json
 from app.utils.prompts.pronounciation.check_pronounciation import build_check_pronounciation_messages
 from app.utils.prompts.pronounciation.explain_pronounciation_messages import build_explain_pronounciation_messages
 
 
+def pronounciation_stats() -> Dict[str, float | None]:
+    """Returns the share of pronounciation checks whose feedback was templated instead of written by the LLM."""
+
+    return {
+        "templated_feedback_rate": metrics.ratio("pronounciation.feedback.templated", "pronounciation.feedback.checks")
+    }
+
+
 class PronounciationService():
     def _get_language_code(self, language: AvailableLanguage, dialect: AvailableDialect | None) -> str:
         """Get the Azure language code based on language and optional dialect."""
@@ -33,29 +49,26 @@ class PronounciationService():
         phrase: str,
         isWord: bool,
         language: AvailableLanguage,
-        dialect: AvailableDialect | None = None
+        dialect: AvailableDialect | None = None,
+        rich_feedback: bool = False,
+        user_email: str | None = None
     ) -> PronounciationResponse:
-        """Takes in the user audio and letter to be pronounced and evaluates the performance."""
-        # 1. Converting the user audio into WAV bytes
+        """
+        Takes in the user audio and letter to be pronounced and evaluates the performance. The LLM only writes the
+        feedback on borderline attempts, or on every attempt if rich_feedback is asked for.
+        """
+        # 1. Converting the user audio into WAV bytes with the silence trimmed off
         raw_bytes = await user_audio.read()
 
-        audio_bytes = AudioSegment.from_file(io.BytesIO(raw_bytes))
-        audio = audio_bytes.set_frame_rate(16000).set_channels(1)
-
-        wav_buffer = io.BytesIO()
-        audio.export(wav_buffer, format="wav")
-        wav_bytes = wav_buffer.getvalue()
+        normalized_audio = normalize_audio(raw_bytes) # Rejects recordings with no speech before we call Azure
+        wav_bytes = normalized_audio.wav_bytes
 
         # 2. Setting up the Azure Pronounciation Assessment request
-        if isWord:
-            granularity = "Word"
-        else:
-            granularity = "Phoneme"
-
+        # Phoneme granularity also returns the word scores, and the phoneme scores let templated feedback name the weak sounds
         pronounciation_config = {
             "ReferenceText": phrase,
             "GradingSystem": "HundredMark",
-            "Granularity": granularity,
+            "Granularity": "Phoneme",
             "Dimension": "Comprehensive",
         }
 
@@ -105,50 +118,99 @@ class PronounciationService():
         accuracy = scores.get("AccuracyScore", 0.0)
         completeness = scores.get("CompletenessScore", 0.0)
         overall_score = scores.get("PronScore", 0.0)
-        
-        status = "fail"
-
-        if(
-            overall_score >= 88
-            and accuracy >= 85
-            and completeness >= 95
-        ):
-            status = "pass"
-        
-        language_value = language.value
-        dialect_value = dialect.value if dialect else None
 
-        # 5. Generating pronounciation feedback with OpenAI API and parsing response
+        pronounciation_status = "pass" if passes(accuracy, completeness, overall_score) else "fail"
+        band = score_band(accuracy, completeness, overall_score)
+
+        # 5. Writing the feedback. Clear passes and fails are templated from the scores, borderline ones need the LLM.
+        metrics.increment("pronounciation.feedback.checks")
+
+        if PRONOUNCIATION_TEMPLATED_FEEDBACK_ENABLED and not rich_feedback and band != "borderline":
+            metrics.increment("pronounciation.feedback.templated")
+            metrics.increment(f"pronounciation.feedback.templated.{band}")
+
+            feedback = templated_feedback(
+                band,
+                phrase,
+                isWord,
+                language,
+                dialect,
+                transcription,
+                accuracy,
+                completeness,
+                overall_score,
+                parse_word_details(scores)
+            )
+        else:
+            feedback = await self._llm_feedback(phrase, language, dialect, transcription, accuracy, completeness, overall_score, pronounciation_status)
+
+        pronounciation_check_response = PronounciationResponse(
+            status=pronounciation_status,
+            transcription=transcription,
+            feedback=feedback.feedback,
+            mistake_tags=feedback.mistake_tags,
+            performance_reflection=feedback.performance_reflection,
+            trimmed_duration=normalized_audio.trimmed_duration,
+        )
+
+        # Saved so follow up questions only need to send the evaluation id
+        pronounciation_check_response.evaluation_id = await evaluation_store.save(PronounciationEvaluationContext(
+            language=language,
+            dialect=dialect,
+            phrase=phrase,
+            status=pronounciation_status,
+            transcription=transcription,
+            previous_feedback=[pronounciation_check_response.feedback],
+            mistake_tags=pronounciation_check_response.mistake_tags,
+            performance_reflection=pronounciation_check_response.performance_reflection
+        ), user_email)
+
+        return pronounciation_check_response
+
+
+    async def _llm_feedback(
+        self,
+        phrase: str,
+        language: AvailableLanguage,
+        dialect: AvailableDialect | None,
+        transcription: str,
+        accuracy: float,
+        completeness: float,
+        overall_score: float,
+        pronounciation_status: str
+    ) -> PronounciationFeedback:
+        """Has the LLM write the feedback on the user's pronounciation."""
+
+        metrics.increment("pronounciation.feedback.llm")
+
         pronounciation_messages = build_check_pronounciation_messages(
             phrase, 
-            language_value, 
-            dialect_value, 
+            language.value, 
+            dialect.value if dialect else None, 
             transcription, 
             accuracy, 
             completeness, 
             overall_score, 
-            status
+            pronounciation_status
         )
 
         try:
-            chat_response = await openai_client.chat.completions.create(
-                model=os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest",
+            chat_response = await llm_gateway.chat(
+                task="pronounciation_feedback",
                 messages=pronounciation_messages,
                 response_format={"type": "json_object"},
             )
 
             chat_response_content = chat_response.choices[0].message.content
             chat_response_obj = json.loads(chat_response_content)
-            
-            pronounciation_check_response = PronounciationResponse(
-                status=status,
-                transcription=transcription,
+
+            return PronounciationFeedback(
                 feedback=chat_response_obj["feedback"],
                 mistake_tags=chat_response_obj["mistake_tags"],
-                performance_reflection=chat_response_obj["performance_reflection"],
+                performance_reflection=chat_response_obj["performance_reflection"]
             )
-
-            return pronounciation_check_response
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -156,8 +218,10 @@ class PronounciationService():
             )
 
 
-    async def explain_pronounciation(self, input: PronounciationExplainInput) -> PronounciationExplainResponse:
-        """Takes in the previous user performance evaluation and query and answers the query."""
+    async def _explain_pronounciation_messages(self, input: PronounciationExplainInput | EvaluationExplainInput, user_email: str | None = None) -> Tuple[PronounciationExplainInput, str | None, List]:
+        """Fills in the input from the stored evaluation if needed, and builds the explain pronounciation prompt."""
+
+        input, evaluation_id = await resolve_explain_input(input, PronounciationEvaluationContext, PronounciationExplainInput, user_email)
 
         query = input.query
         language = input.language.value
@@ -165,7 +229,7 @@ class PronounciationService():
         phrase = input.phrase
         status = input.status
         transcription = input.transcription
-        previous_feedback = str(input.previous_feedback)
+        previous_feedback = render_previous_feedback(input.previous_feedback)
         mistake_tags_string = str(input.mistake_tags)
         performance_reflection = input.performance_reflection
 
@@ -181,9 +245,24 @@ class PronounciationService():
             performance_reflection
         )
 
+        return input, evaluation_id, explain_messages
+
+
+    async def explain_pronounciation(self, input: PronounciationExplainInput | EvaluationExplainInput, user_email: str | None = None) -> PronounciationExplainResponse:
+        """Takes in the previous user performance evaluation and query and answers the query."""
+
+        input, evaluation_id, explain_messages = await self._explain_pronounciation_messages(input, user_email)
+
+        cache_key = explain_cache.key("explain_pronounciation", input)
+        cached_answer = explain_cache.get(cache_key, input.query)
+
+        if cached_answer is not None:
+            await record_answer(evaluation_id, input.query, cached_answer)
+            return PronounciationExplainResponse(response=cached_answer)
+
         try:
-            chat_response = await openai_client.chat.completions.create(
-                model=os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest",
+            chat_response = await llm_gateway.chat(
+                task="explain_pronounciation",
                 messages=explain_messages,
                 response_format={"type": "json_object"},
             )
@@ -195,9 +274,31 @@ class PronounciationService():
                 response=chat_response_obj["response"]
             )
 
+            explain_cache.set(cache_key, input.query, explain_response.response)
+            await record_answer(evaluation_id, input.query, explain_response.response)
+
             return explain_response
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error in fetching or parsing pronounciation explanation chat response: {e}"
-            )
\ No newline at end of file
+            )
+
+
+    async def stream_explain_pronounciation(self, input: PronounciationExplainInput | EvaluationExplainInput, user_email: str | None = None) -> AsyncIterator[str]:
+        """Answers the same question as explain_pronounciation, streaming the answer as Server-Sent Events while it is written."""
+
+        # Prepared before streaming starts so a missing evaluation still gets a normal 404 response
+        input, evaluation_id, explain_messages = await self._explain_pronounciation_messages(input, user_email)
+
+        return stream_explain_answer(
+            "explain_pronounciation",
+            explain_messages,
+            "response",
+            lambda answer: PronounciationExplainResponse(response=answer),
+            lambda answer: record_answer(evaluation_id, input.query, answer),
+            cache_key=explain_cache.key("explain_pronounciation", input),
+            query=input.query
+        )
\ No newline at end of file
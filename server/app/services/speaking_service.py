@@ -1,38 +1,125 @@
 import os # Helps us read env variables
-import io # Helps us use data streams like audio files
+import uuid
+import asyncio
 import json
+import hashlib
 import base64 # Helps us encode and decode binary data as strings
 from fastapi import HTTPException, status as http_status
+from pydantic import ValidationError
 import httpx # Allows us to make async API requests
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, List, Tuple
 from langgraph.graph import StateGraph, END # Helps us build graphs
-from langchain_openai import ChatOpenAI # Helps us easily make GPT calls
-from app.models.ai.speaking import VoiceTutorExplainInput, VoiceTutorExplainOutput, VoiceTutorState, VoiceTutorInput, VoiceTutorOutput, PronounciationScores, SemanticEvaluation, VocabWordResponse, VoiceTutorTTSInput, VoiceTutorTTSOutput
-from pydub import AudioSegment
-from app.utils.constants import AZURE_LANGUAGE_CODE, PRONOUNCIATION_BASE_URL, TTS_BASE_URL
+from langgraph.pregel.types import StateSnapshot
+from app.models.ai.evaluation import EvaluationExplainInput
+from app.models.ai.speaking import VoiceTutorEvaluationContext, VoiceTutorExplainInput, VoiceTutorExplainOutput, VoiceTutorState, VoiceTutorInput, VoiceTutorOutput, PronounciationScores, SemanticJudgement, SemanticEvaluation, VocabWordResponse, VoiceTutorTTSInput, VoiceTutorTTSOutput, SpeakingFeedback, SpeakingEvaluationAndFeedback
+from app.utils.audio import normalize_audio
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+from app.utils.graph_checkpoints import ExpiringMemorySaver
+from app.utils.llm_gateway import llm_gateway # All LLM calls go through the gateway for concurrency limits and retries
+from app.utils.llm_parsing import chat_structured, json_schema_format, parse_structured, repair_structured
+from app.utils.evaluation_store import evaluation_store, record_answer, resolve_explain_input
+from app.utils.conversation_memory import render_previous_feedback
+from app.utils.explain_stream import stream_explain_answer
+from app.utils.sse import format_sse, format_sse_error
+from app.utils.json_stream import JsonStringFieldExtractor
+from app.utils.tts_pipeline import PipelinedSpeech, SentenceBuffer, supports_pipelining
+from app.utils.text_normalization import find_vocab_words_used
+from app.utils.constants import (
+    AZURE_LANGUAGE_CODE,
+    PRONOUNCIATION_BASE_URL,
+    FEEDBACK_AUDIO_CACHE_SIZE,
+    FEEDBACK_AUDIO_CACHE_MAX_BYTES,
+    FEEDBACK_AUDIO_TTL_SECONDS,
+    FEEDBACK_AUDIO_WAIT_SECONDS,
+    SPEAKING_PRONOUNCIATION_PASS_SCORE,
+    SPEAKING_GRAMMAR_PASS_SCORE,
+    SPEAKING_SINGLE_CALL_ENABLED,
+    SPEAKING_CHECKPOINT_MAX_RUNS,
+    SPEAKING_CHECKPOINT_TTL_SECONDS,
+    SPEAKING_CHECKPOINT_MAX_BYTES,
+    SPEAKING_NODE_CACHE_SIZE,
+    SPEAKING_NODE_CACHE_MAX_BYTES,
+    SPEAKING_NODE_CACHE_TTL_SECONDS,
+)
+from app.utils.elevenlabs import negotiate_output_format, synthesize_speech
 from app.utils.prompts.speaking.generate_feedback import build_generate_feedback_messages
 from app.db.enums import AvailableDialect, AvailableLanguage
 from app.utils.prompts.speaking.semantic_eval import build_semantic_eval_messages
 from app.utils.prompts.speaking.explain_speaking import build_explain_speaking_messages
+from app.utils.prompts.speaking.evaluate_and_feedback import build_evaluate_and_feedback_messages
+
+
+def _audio_task_size(task: asyncio.Task) -> int:
+    """Size of a feedback audio task's result, 0 until it has finished."""
+
+    if not task.done() or task.cancelled() or task.exception() is not None:
+        return 0
+
+    return len(task.result() or "")
+
+
+# Deferred feedback audio synthesis tasks keyed by (user email, feedback audio id), so only the user who got the
+# feedback can fetch its audio. SpeakingService is created per request, so these live at module level.
+feedback_audio_tasks: TTLCache[Tuple[str | None, str], asyncio.Task] = TTLCache(
+    max_size=FEEDBACK_AUDIO_CACHE_SIZE,
+    ttl_seconds=FEEDBACK_AUDIO_TTL_SECONDS,
+    max_bytes=FEEDBACK_AUDIO_CACHE_MAX_BYTES,
+    size_of=_audio_task_size
+)
+
+# Checkpoints of each voice tutor run after every node, keyed by run id, so a retry resumes where the run failed.
+# Feedback audio isn't checkpointed, so a replayed run synthesizes it again.
+voice_tutor_checkpoints = ExpiringMemorySaver(
+    max_runs=SPEAKING_CHECKPOINT_MAX_RUNS,
+    ttl_seconds=SPEAKING_CHECKPOINT_TTL_SECONDS,
+    max_bytes=SPEAKING_CHECKPOINT_MAX_BYTES,
+    excluded_channels=["feedback_audio_base64"]
+)
+
+# State updates of the expensive evaluation nodes, keyed by node and by what they depend on.
+# Reused when the same recording is submitted again for the same question, even without a run id.
+node_results: TTLCache[str, Dict[str, Any]] = TTLCache(
+    max_size=SPEAKING_NODE_CACHE_SIZE,
+    ttl_seconds=SPEAKING_NODE_CACHE_TTL_SECONDS,
+    max_bytes=SPEAKING_NODE_CACHE_MAX_BYTES
+)
+
+# Nodes whose results only depend on the recording, question, language, dialect and vocab words
+CACHED_NODES = {"transcribe", "pronounciation_eval", "semantic_eval", "evaluate_and_feedback"}
+
+
+# The event each graph node emits when streaming, and the state fields it sends
+STREAM_EVENTS: Dict[str, list[tuple[str, list[str]]]] = {
+    "transcribe": [("transcription", ["transcription", "trimmed_duration"])],
+    "pronounciation_eval": [("pronounciation_scores", ["pronounciation_scores"])],
+    "semantic_eval": [("semantic_evaluation", ["semantic_evaluation"])],
+    "generate_feedback": [
+        ("feedback", ["status", "feedback_text", "performance_reflection"]),
+        ("audio", ["feedback_audio_base64"]), # Only present when the audio was pipelined
+    ],
+    "evaluate_and_feedback": [
+        ("semantic_evaluation", ["semantic_evaluation"]),
+        ("feedback", ["status", "feedback_text", "performance_reflection"]),
+    ],
+    "speak": [("audio", ["feedback_audio_base64"])],
+}
 
 
 class SpeakingService:
     """This class runs the voice tutor langchain workflow and returns the result to the user."""
 
     def __init__(self):
-        # Setup GPT
-        self.llm = ChatOpenAI(
-            model=os.getenv("PRIMARY_MODEL"),
-            temperature=1,
-            api_key=os.getenv("OPENAI_API_KEY")
-        )
-
         # Get API Keys and Data
         self.azure_key = os.getenv("AZURE_SUBSCRIPTION_KEY")
-        self.openai_key = os.getenv("OPENAI_API_KEY")
         self.eleven_labs_key = os.getenv("ELEVEN_LABS_KEY")
         self.eleven_labs_voice_id = os.getenv("ELEVEN_LABS_VOICE_ID")
 
+        # The recording being evaluated, keyed by its audio hash. It stays out of the graph state so checkpoints and
+        # cached node results never hold audio, and a resumed run gets it from the retried request.
+        self._user_audio: Dict[str, str] = {}
+        self._user_audio_wav: Dict[str, bytes] = {} # Trimmed WAV, so the pronounciation node doesn't decode it again
+
         # Build LangGraph Workflow
         self.workflow = self._build_workflow()
 
@@ -44,23 +131,84 @@ class SpeakingService:
 
         # 2. Add needed nodes to graph
         # A node just takes the state as input -> does stuff -> updates the state
-        workflow.add_node("transcribe", self._transcribe_node)
-        workflow.add_node("pronounciation_eval", self._pronounciation_eval_node)
-        workflow.add_node("semantic_eval", self._semantic_eval_node)
-        workflow.add_node("generate_feedback", self._generate_feedback_node)
-        workflow.add_node("speak", self._speak_node)
+        nodes = {
+            "transcribe": self._transcribe_node,
+            "pronounciation_eval": self._pronounciation_eval_node,
+            "semantic_eval": self._semantic_eval_node,
+            "generate_feedback": self._generate_feedback_node,
+            "evaluate_and_feedback": self._evaluate_and_feedback_node,
+            "speak": self._speak_node,
+        }
+
+        for name, node in nodes.items():
+            workflow.add_node(name, self._cached_node(name, node) if name in CACHED_NODES else node)
 
         workflow.set_entry_point("transcribe")
 
         # 3. Add edges between nodes
         workflow.add_edge("transcribe", "pronounciation_eval")
-        workflow.add_edge("pronounciation_eval", "semantic_eval")
+        workflow.add_conditional_edges(
+            "pronounciation_eval",
+            self._route_after_pronounciation,
+            {"semantic_eval": "semantic_eval", "evaluate_and_feedback": "evaluate_and_feedback"}
+        )
         workflow.add_edge("semantic_eval", "generate_feedback")
-        workflow.add_edge("generate_feedback", "speak")
+        workflow.add_conditional_edges("generate_feedback", self._route_after_feedback, {"speak": "speak", END: END}) # TTS is skipped unless it's needed inline
+        workflow.add_conditional_edges("evaluate_and_feedback", self._route_after_feedback, {"speak": "speak", END: END})
         workflow.add_edge("speak", END)
 
-        # 4. We compile the workflow so we can use it
-        return workflow.compile()
+        # 4. We compile the workflow so we can use it. The checkpointer saves the state after every node.
+        return workflow.compile(checkpointer=voice_tutor_checkpoints)
+
+
+    def _node_cache_key(self, name: str, state: VoiceTutorState) -> str:
+        key_data = [
+            name,
+            state.audio_hash,
+            state.question,
+            state.language.value,
+            state.dialect.value if state.dialect else None,
+            [vocab_word.word for vocab_word in state.vocab_words],
+        ]
+
+        return hashlib.sha256(json.dumps(key_data, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+    def _cached_node(self, name: str, node):
+        """Wraps a node so its state update is reused when the same recording is evaluated for the same question again."""
+
+        async def run(state: VoiceTutorState) -> Dict[str, Any]:
+            key = self._node_cache_key(name, state)
+
+            cached = node_results.get(key)
+            if cached is not None:
+                metrics.increment(f"speaking.node_cache.{name}.hits")
+                return cached
+
+            metrics.increment(f"speaking.node_cache.{name}.misses")
+            update = await node(state)
+            node_results.set(key, update)
+
+            return update
+
+        return run
+
+
+    def _route_after_pronounciation(self, state: VoiceTutorState) -> str:
+        """
+        Evaluates the answer and writes the feedback in a single LLM call when enabled. Pipelined TTS keeps the separate
+        feedback call, since it speaks the feedback while it's written and needs to know the status before it starts.
+        """
+
+        if SPEAKING_SINGLE_CALL_ENABLED and not (state.tts_mode == "pipelined" and supports_pipelining(state.audio_format)):
+            return "evaluate_and_feedback"
+
+        return "semantic_eval"
+
+
+    def _route_after_feedback(self, state: VoiceTutorState) -> str:
+        """Only runs TTS in the graph when the client wants the feedback audio in the response and it wasn't pipelined already."""
+        return "speak" if state.tts_mode == "inline" or (state.tts_mode == "pipelined" and not state.feedback_audio_base64) else END
 
 
     def _get_language_code(self, language: AvailableLanguage, dialect: AvailableDialect | None) -> str:
@@ -80,6 +228,19 @@ class SpeakingService:
         return language_mapping
 
 
+    def _response_status(self, pronounciation_scores: PronounciationScores, semantic_evaluation: SemanticEvaluation) -> str:
+        """Decides if the response passes. This is always done here, even when the LLM was told the rule."""
+
+        if(
+            pronounciation_scores.overall > SPEAKING_PRONOUNCIATION_PASS_SCORE
+            and semantic_evaluation.grammatical_score > SPEAKING_GRAMMAR_PASS_SCORE
+            and semantic_evaluation.answer_makes_sense
+        ):
+            return "pass"
+
+        return "fail"
+
+
     async def _transcribe_node(self, state: VoiceTutorState) -> Dict[str, Any]:
         """Makes call to Azure Speech SDK to get transcription of user audio"""
         
@@ -87,16 +248,12 @@ class SpeakingService:
 
         try:
             # 1. Convert bytes to WAV
-            audio_bytes = base64.b64decode(state.user_audio_base64) # Decodes audio string into binary audio data
+            audio_bytes = base64.b64decode(self._user_audio.get(state.audio_hash) or "") # Decodes audio string into binary audio data
             
-            # We take the bytes and covert it into the right format for Azure
-            audio_segment = AudioSegment.from_file(io.BytesIO(audio_bytes))
-            audio = audio_segment.set_frame_rate(16000).set_channels(1) # 16 kHz
-
-            # We create a buffer and load up the audio segment and extract it as WAV bytes
-            wav_buffer = io.BytesIO()
-            audio.export(wav_buffer, format="wav")
-            wav_bytes = wav_buffer.getvalue()
+            # We convert the bytes into the right format for Azure and trim the silence around the speech.
+            # Recordings with no speech are rejected here before we make any Azure calls.
+            normalized_audio = normalize_audio(audio_bytes)
+            wav_bytes = normalized_audio.wav_bytes
             
             # 2. Get transcription
             language = state.language
@@ -130,7 +287,12 @@ class SpeakingService:
                     detail=f"{function_code}: Failed to generate transcription with Azure."
                 )
 
-            return {"transcription": transcription}
+            self._user_audio_wav[state.audio_hash] = wav_bytes
+
+            return {
+                "transcription": transcription,
+                "trimmed_duration": normalized_audio.trimmed_duration
+            }
         except HTTPException:
             raise
         except ValueError as e:
@@ -151,16 +313,12 @@ class SpeakingService:
         function_code = "VoiceTutorService/_pronounciation_eval_node"
 
         try:
-            # 1. Covert audio file to WAV
-            audio_bytes = base64.b64decode(state.user_audio_base64)
-            
-            audio_segment = AudioSegment.from_file(io.BytesIO(audio_bytes))
-            audio_segment = audio_segment.set_frame_rate(16000) # 16 kHz
-            audio_segment = audio_segment.set_channels(1) # Mono
+            # 1. Reuse the trimmed WAV from the transcribe node, unless it was cached or ran in an earlier attempt
+            wav_bytes = self._user_audio_wav.get(state.audio_hash)
 
-            wav_buffer = io.BytesIO()
-            audio_segment.export(wav_buffer, format="wav")
-            wav_bytes = wav_buffer.getvalue()
+            if wav_bytes is None:
+                audio_bytes = base64.b64decode(self._user_audio.get(state.audio_hash) or "")
+                wav_bytes = normalize_audio(audio_bytes).wav_bytes
 
             # 2. Get pronounciation scores
             language = state.language
@@ -220,16 +378,19 @@ class SpeakingService:
             )
 
     
+    def _vocab_words_used(self, state: VoiceTutorState) -> List[str]:
+        """The vocab words found in the transcription, allowing for spelling, clitics and small STT mistakes."""
+
+        return find_vocab_words_used(state.transcription or "", [vocab_word.word for vocab_word in state.vocab_words], state.language)
+
+
     async def _semantic_eval_node(self, state: VoiceTutorState) -> Dict[str, Any]:
         """Determines if the user answer makes sense for the question asked and evaluates the answer's grammatical accuracy."""
 
         function_code = "VoiceTutorService/_semantic_eval_node"
 
         try:
-            # 1. We get semantic evaluation of user's response
-            vocab_words_list = [f"{vocab_word.word} ({vocab_word.meaning})" for vocab_word in state.vocab_words]
-            vocab_words_str = "\n".join(vocab_words_list)
-
+            # 1. We get semantic evaluation of user's response. Which vocab words were used is plain string matching, so it's done locally.
             language = state.language.value
             dialect = state.dialect.value if state.dialect else None
             question = state.question
@@ -239,51 +400,17 @@ class SpeakingService:
                 language=language, 
                 dialect=dialect, 
                 question=question, 
-                vocab_words=vocab_words_str, 
                 transcription=transcription
             )
 
-            response = await self.llm.ainvoke(messages)
-            
-            # Debug logging
-            print(f"[DEBUG] Semantic eval response type: {type(response.content)}")
-            print(f"[DEBUG] Semantic eval response content: {response.content[:500] if response.content else 'EMPTY'}")
-            
-            # Clean up the response
-            content = response.content.strip()
-            
-            # Remove markdown code fences if present
-            if content.startswith('```'):
-                # Remove opening fence (```json or ```)
-                content = content.split('\n', 1)[1] if '\n' in content else content
-                # Remove closing fence (```)
-                if content.endswith('```'):
-                    content = content.rsplit('```', 1)[0]
-                content = content.strip()
-            
-            # Fix Python-style values to JSON-style
-            content = content.replace('True', 'true').replace('False', 'false').replace('None', 'null')
-            
-            # Try to parse JSON
-            try:
-                response_data = json.loads(content)
-            except json.JSONDecodeError as e:
-                print(f"[ERROR] JSON parsing failed. Raw content: {content}")
-                raise HTTPException(
-                    status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"{function_code}: LLM returned invalid JSON: {str(e)}"
-                )
-
-            semantic_evaluation = SemanticEvaluation(
-                vocab_words_used=response_data.get("vocab_words_used", []),
-                answer_makes_sense=response_data.get("answer_makes_sense", False),
-                grammatical_score=response_data.get("grammatical_score", 0),
-                grammar_notes=response_data.get("grammar_notes", ""),
-            )
+            judgement = await chat_structured("semantic_eval", messages, SemanticJudgement)
+            semantic_evaluation = SemanticEvaluation(**judgement.model_dump(), vocab_words_used=self._vocab_words_used(state))
 
             return {
                 "semantic_evaluation": semantic_evaluation,
             }
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -295,6 +422,7 @@ class SpeakingService:
         """Takes in all the user audio evaluation data, determines if the user audio passes, and generates feedback."""
 
         function_code = "VoiceTutorService/_generate_feedback_node"
+        speech = None
 
         try:
             vocab_words_list = [f"{vocab_word.word} ({vocab_word.meaning})" for vocab_word in state.vocab_words]
@@ -302,25 +430,12 @@ class SpeakingService:
             vocab_words_used_str = "\n".join(state.semantic_evaluation.vocab_words_used)
 
             # 2. We determine the pass/fail status of the user's response
-            overall_pron_score = state.pronounciation_scores.overall
             grammatical_score = state.semantic_evaluation.grammatical_score
             answer_makes_sense = state.semantic_evaluation.answer_makes_sense
-            
-            # Thresholds
-            overall_pron_score_threshold = 70.0
-            grammatical_score_threshold = 70.0
-
-            if(
-                overall_pron_score > overall_pron_score_threshold 
-                and grammatical_score > grammatical_score_threshold
-                and answer_makes_sense
-            ):
-                status = "pass"
-            else:
-                status = "fail"
+            status = self._response_status(state.pronounciation_scores, state.semantic_evaluation)
 
             language = state.language.value
-            dialect = state.dialect.value
+            dialect = state.dialect.value if state.dialect else None
             question = state.question
             transcription = state.transcription
             accuracy = state.pronounciation_scores.accuracy
@@ -344,97 +459,128 @@ class SpeakingService:
                 grammar_notes=grammar_notes,
             )
 
-            response = await self.llm.ainvoke(messages)
-            
-            # Debug logging
-            print(f"[DEBUG] Generate feedback response type: {type(response.content)}")
-            print(f"[DEBUG] Generate feedback response content: {response.content[:500] if response.content else 'EMPTY'}")
-            
-            # Clean up the response
-            content = response.content.strip()
-            
-            # Remove markdown code fences if present
-            if content.startswith('```'):
-                # Remove opening fence (```json or ```)
-                content = content.split('\n', 1)[1] if '\n' in content else content
-                # Remove closing fence (```)
-                if content.endswith('```'):
-                    content = content.rsplit('```', 1)[0]
-                content = content.strip()
-            
-            # Fix Python-style values to JSON-style
-            content = content.replace('True', 'true').replace('False', 'false').replace('None', 'null')
-            
-            # Try to parse JSON
-            try:
-                response_data = json.loads(content)
-            except json.JSONDecodeError as e:
-                print(f"[ERROR] JSON parsing failed. Raw content: {content}")
+            # In pipelined mode the feedback is spoken sentence by sentence while the LLM is still writing it
+            if state.tts_mode == "pipelined" and supports_pipelining(state.audio_format):
+                speech = PipelinedSpeech(state.audio_format)
+                feedback = await self._stream_feedback_into_speech(messages, speech)
+            else:
+                feedback = await chat_structured("feedback", messages, SpeakingFeedback)
+
+            if not feedback.feedback_text:
                 raise HTTPException(
-                    status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"{function_code}: LLM returned invalid JSON: {str(e)}"
+                    status_code=http_status.HTTP_404_NOT_FOUND,
+                    detail=f"{function_code}: Failed to generate feedback with OpenAI API."
                 )
+            
+            output = {
+                "status": status,
+                "feedback_text": feedback.feedback_text,
+                "performance_reflection": feedback.performance_reflection
+            }
 
-            feedback_text = response_data.get("feedback_text")
-            performance_reflection = response_data.get("performance_reflection")
+            if speech:
+                output["feedback_audio_base64"] = await speech.finish()
+
+            return output
+        except HTTPException:
+            if speech:
+                speech.cancel()
+            raise
+        except Exception as e:
+            if speech:
+                speech.cancel()
+            raise HTTPException(
+                status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"{function_code}: Generate feedback failed: {str(e)}"
+            )
+
+
+    async def _evaluate_and_feedback_node(self, state: VoiceTutorState) -> Dict[str, Any]:
+        """
+        Does the work of the semantic eval and generate feedback nodes in one LLM call. The LLM writes feedback for
+        both outcomes, and the status decided here picks which one the user gets.
+        """
+
+        function_code = "VoiceTutorService/_evaluate_and_feedback_node"
+
+        try:
+            vocab_words_list = [f"{vocab_word.word} ({vocab_word.meaning})" for vocab_word in state.vocab_words]
+            vocab_words_used = self._vocab_words_used(state)
+
+            messages = build_evaluate_and_feedback_messages(
+                language=state.language.value,
+                dialect=state.dialect.value if state.dialect else None,
+                question=state.question,
+                vocab_words="\n".join(vocab_words_list),
+                vocab_words_used="\n".join(vocab_words_used),
+                transcription=state.transcription,
+                accuracy=state.pronounciation_scores.accuracy,
+                completeness=state.pronounciation_scores.completeness,
+                overall=state.pronounciation_scores.overall
+            )
+
+            evaluation = await chat_structured("evaluate_and_feedback", messages, SpeakingEvaluationAndFeedback)
+            semantic_evaluation = SemanticEvaluation(**evaluation.model_dump(include=set(SemanticJudgement.model_fields)), vocab_words_used=vocab_words_used)
+
+            status = self._response_status(state.pronounciation_scores, semantic_evaluation)
+            feedback_text = evaluation.pass_feedback_text if status == "pass" else evaluation.fail_feedback_text
 
             if not feedback_text:
                 raise HTTPException(
                     status_code=http_status.HTTP_404_NOT_FOUND,
                     detail=f"{function_code}: Failed to generate feedback with OpenAI API."
                 )
-            
+
             return {
+                "semantic_evaluation": semantic_evaluation,
                 "status": status,
                 "feedback_text": feedback_text,
-                "performance_reflection": performance_reflection
+                "performance_reflection": evaluation.performance_reflection
             }
         except HTTPException:
             raise
         except Exception as e:
             raise HTTPException(
                 status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"{function_code}: Generate feedback failed: {str(e)}"
+                detail=f"{function_code}: Evaluate and generate feedback failed: {str(e)}"
             )
 
 
-    async def _speak_node(self, state: VoiceTutorState) -> Dict[str, Any]:
-        """Performs TTS on the feedback text and generates the resulting audio file."""
+    async def _stream_feedback_into_speech(self, messages, speech: PipelinedSpeech) -> SpeakingFeedback:
+        """Streams the feedback LLM response, sending each finished sentence of feedback_text to TTS, and returns the parsed feedback."""
 
-        function_code = "VoiceTutorService/_speak_node"
+        extractor = JsonStringFieldExtractor("feedback_text")
+        sentences = SentenceBuffer()
+        content = ""
+        spoken_text = ""
+
+        async for chunk in llm_gateway.stream_chat(task="feedback", messages=messages, response_format=json_schema_format(SpeakingFeedback)):
+            content += chunk
+            text = extractor.feed(chunk)
+            spoken_text += text
+
+            for sentence in sentences.add(text):
+                speech.add(sentence)
+
+        for sentence in sentences.flush():
+            speech.add(sentence)
 
         try:
-            headers = {
-                "Accept": "audio/mpeg", # We want to get MP3 audio back. Might cause issues
-                "Content-Type": "application/json",
-                "xi-api-key": os.getenv("ELEVEN_LABS_KEY")
-            }
+            return parse_structured(content, SpeakingFeedback)
+        except ValidationError as e:
+            feedback = await repair_structured("feedback", messages, content, e, SpeakingFeedback)
 
-            payload = {
-                "text": state.feedback_text,
-                "model_id": "eleven_multilingual_v2",
-                "voice_settings": {
-                    "stability": 0.5, # How emotive the voice is
-                    "use_speaker_boost": True, # Boosts similarity of the voice of the response to the selected voice
-                    "similarity_boost": 0.75, # Determines how closely response follows specified voice
-                    "style": 0.3, # How exaggerated the response voice is
-                    "speed": 0.8 # Controls the speed of the voice
-                }
-            }
+            # The feedback was already spoken, so keep its text in step with the audio
+            return feedback.model_copy(update={"feedback_text": spoken_text}) if extractor.done else feedback
 
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    TTS_BASE_URL,
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
 
-                response.raise_for_status()
+    async def _speak_node(self, state: VoiceTutorState) -> Dict[str, Any]:
+        """Performs TTS on the feedback text and generates the resulting audio file."""
 
-            audio_bytes = response.content
-            audio_base64 = base64.b64encode(audio_bytes).decode()
-            feedback_audio_base64 = f"data:audio/mpeg;base64,{audio_base64}" # This is the format we need to play audio on browser
+        function_code = "VoiceTutorService/_speak_node"
+
+        try:
+            feedback_audio_base64 = await synthesize_speech(state.feedback_text, state.audio_format) # This is the format we need to play audio on browser
 
             if not feedback_audio_base64:
                 raise HTTPException(
@@ -457,38 +603,9 @@ class SpeakingService:
 
         try:
             text = input.text
+            output_format = negotiate_output_format(input.audio_accept)
 
-            headers = {
-                "Accept": "audio/mpeg", # We want to get MP3 audio back. Might cause issues
-                "Content-Type": "application/json",
-                "xi-api-key": os.getenv("ELEVEN_LABS_KEY")
-            }
-
-            payload = {
-                "text": text,
-                "model_id": "eleven_multilingual_v2",
-                "voice_settings": {
-                    "stability": 0.5, # How emotive the voice is
-                    "use_speaker_boost": True, # Boosts similarity of the voice of the response to the selected voice
-                    "similarity_boost": 0.75, # Determines how closely response follows specified voice
-                    "style": 0.3, # How exaggerated the response voice is
-                    "speed": 0.8 # Controls the speed of the voice
-                }
-            }
-
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    TTS_BASE_URL,
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
-
-                response.raise_for_status()
-
-            audio_bytes = response.content
-            audio_base64 = base64.b64encode(audio_bytes).decode()
-            response_audio_base64 = f"data:audio/mpeg;base64,{audio_base64}" # This is the format we need to play audio on browser
+            response_audio_base64 = await synthesize_speech(text, output_format) # This is the format we need to play audio on browser
 
             if not response_audio_base64:
                 raise HTTPException(
@@ -506,35 +623,176 @@ class SpeakingService:
             )
 
 
-    async def generate_response(self, input: VoiceTutorInput) -> VoiceTutorOutput:
+    def _start_feedback_audio(self, feedback_text: str, output_format: str, user_email: str | None) -> str:
+        """Starts synthesizing the feedback audio in the background and returns the id the user can fetch it with."""
+
+        feedback_audio_id = uuid.uuid4().hex
+        key = (user_email, feedback_audio_id)
+
+        task = asyncio.create_task(synthesize_speech(feedback_text, output_format))
+        task.add_done_callback(lambda t: t.cancelled() or t.exception()) # Marks failures as retrieved if the audio is never fetched
+        task.add_done_callback(lambda t: feedback_audio_tasks.resize(key)) # Counts the audio against the cache's byte limit
+
+        feedback_audio_tasks.set(key, task)
+
+        return feedback_audio_id
+
+
+    async def get_feedback_audio(self, feedback_audio_id: str, user_email: str | None = None) -> VoiceTutorTTSOutput:
+        """Returns the user's deferred feedback audio, waiting for the synthesis to finish if it is still running."""
+
+        key = (user_email, feedback_audio_id)
+        task = feedback_audio_tasks.get(key) # Another user's audio id is simply not found
+
+        if task is None:
+            raise HTTPException(
+                status_code=http_status.HTTP_404_NOT_FOUND,
+                detail=f"Feedback audio {feedback_audio_id} not found or expired."
+            )
+
+        try:
+            # shield keeps the synthesis running for later fetches if this request times out
+            feedback_audio_base64 = await asyncio.wait_for(asyncio.shield(task), timeout=FEEDBACK_AUDIO_WAIT_SECONDS)
+
+            return VoiceTutorTTSOutput(response_audio_base64=feedback_audio_base64)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=http_status.HTTP_504_GATEWAY_TIMEOUT,
+                detail=f"Feedback audio {feedback_audio_id} is still being generated."
+            )
+        except Exception as e:
+            feedback_audio_tasks.pop(key)
+            raise HTTPException(
+                status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Generating feedback audio failed: {str(e)}"
+            )
+
+
+    def _build_initial_state(self, input: VoiceTutorInput) -> VoiceTutorState:
+        """Creates the initial graph state from the request, and holds on to the recording for the nodes."""
+
+        audio_hash = hashlib.sha256((input.user_audio_base64 or "").encode("utf-8")).hexdigest()
+        self._user_audio[audio_hash] = input.user_audio_base64 or ""
+
+        # The audio format is negotiated up front so an unsupported format fails before any Azure or LLM calls
+        return VoiceTutorState(
+            question=input.question,
+            language=input.language,
+            dialect=input.dialect,
+            vocab_words=input.vocab_words,
+            audio_format=negotiate_output_format(input.audio_accept),
+            tts_mode=input.tts_mode,
+            audio_hash=audio_hash
+        )
+
+
+    def _run_config(self, run_id: str) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": run_id}}
+
+
+    async def _saved_run(self, run_id: str, initial_state: VoiceTutorState) -> StateSnapshot | None:
+        """Returns the latest checkpoint of an earlier attempt at this run, or None if the run should start from the beginning."""
+
+        snapshot = await self.workflow.aget_state(self._run_config(run_id))
+
+        if not snapshot.values:
+            return None
+
+        # A run id reused for a different recording can't pick up the old run's results
+        if snapshot.values.get("audio_hash") != initial_state.audio_hash:
+            voice_tutor_checkpoints.delete_run(run_id)
+            return None
+
+        return snapshot
+
+
+    async def _replayed_state(self, snapshot: StateSnapshot) -> Dict[str, Any]:
+        """The final state of a finished run. Its feedback audio wasn't checkpointed, so it is synthesized again if the response includes it."""
+
+        final_state = dict(snapshot.values)
+        state = VoiceTutorState(**final_state)
+
+        if state.tts_mode in ("inline", "pipelined") and state.feedback_text:
+            final_state.update(await self._speak_node(state))
+
+        return final_state
+
+
+    async def _run_workflow(self, run_id: str, initial_state: VoiceTutorState, resume: bool) -> Dict[str, Any]:
+        """Runs the workflow, or with resume, finishes an earlier attempt at the run from the node that failed."""
+
+        config = self._run_config(run_id)
+        snapshot = await self._saved_run(run_id, initial_state) if resume else None
+
+        if snapshot is None:
+            return await self.workflow.ainvoke(initial_state, config)
+
+        if snapshot.next:
+            metrics.increment("speaking.runs.resumed")
+            return await self.workflow.ainvoke(None, config)
+
+        # The run already finished, only its response was lost
+        metrics.increment("speaking.runs.replayed")
+        return await self._replayed_state(snapshot)
+
+
+    async def _save_evaluation(self, final_state: Dict[str, Any], user_email: str | None) -> str:
+        """Saves the user's evaluation so their follow up questions only need to send the evaluation id."""
+
+        return await evaluation_store.save(VoiceTutorEvaluationContext(
+            question=final_state["question"],
+            language=final_state["language"],
+            dialect=final_state.get("dialect"), # None valued fields are left out of the final state
+            vocab_words=final_state["vocab_words"],
+            transcription=final_state["transcription"],
+            pronounciation_scores=final_state["pronounciation_scores"],
+            semantic_evaluation=final_state["semantic_evaluation"],
+            status=final_state["status"],
+            performance_reflection=final_state["performance_reflection"],
+            previous_feedback=[final_state["feedback_text"]] if final_state.get("feedback_text") else []
+        ), user_email)
+
+
+    def _build_output(self, final_state: Dict[str, Any], feedback_audio_id: str | None, evaluation_id: str | None = None) -> VoiceTutorOutput:
+        """Creates the output object from the final graph state."""
+
+        return VoiceTutorOutput(
+            transcription=final_state["transcription"],
+            pronounciation_scores=final_state["pronounciation_scores"],
+            semantic_evaluation=final_state["semantic_evaluation"],
+            status=final_state["status"],
+            performance_reflection=final_state["performance_reflection"],
+            feedback_text=final_state.get("feedback_text", None),
+            feedback_audio_base64=final_state.get("feedback_audio_base64", None),
+            feedback_audio_id=feedback_audio_id,
+            trimmed_duration=final_state.get("trimmed_duration", None),
+            evaluation_id=evaluation_id
+        )
+
+
+    async def generate_response(self, input: VoiceTutorInput, user_email: str | None = None) -> VoiceTutorOutput:
         """Generates feedback on the user's speaking performance based on the question details."""
 
+        run_id = input.run_id or uuid.uuid4().hex
+
         try:
             # 1. Creating the initial graph state
-            initial_state = VoiceTutorState(
-                question=input.question,
-                language=input.language,
-                dialect=input.dialect,
-                vocab_words=input.vocab_words,
-                user_audio_base64=input.user_audio_base64
-            )
+            initial_state = self._build_initial_state(input)
 
-            # 2. Run workflow on initial state
-            final_state = await self.workflow.ainvoke(initial_state)
+            # 2. Run workflow on initial state, or finish an earlier attempt at the same run
+            final_state = await self._run_workflow(run_id, initial_state, resume=input.run_id is not None)
+
+            # If TTS is deferred we start it in the background and hand back an id the audio can be fetched with
+            feedback_audio_id = None
+            if input.tts_mode == "deferred" and final_state.get("feedback_text"):
+                feedback_audio_id = self._start_feedback_audio(final_state["feedback_text"], final_state["audio_format"], user_email)
 
             # 3. Create and return the output object
-            output = VoiceTutorOutput(
-                transcription=final_state["transcription"],
-                pronounciation_scores=final_state["pronounciation_scores"],
-                semantic_evaluation=final_state["semantic_evaluation"],
-                status=final_state["status"],
-                performance_reflection=final_state["performance_reflection"],
-                feedback_text=final_state.get("feedback_text", None),
-                feedback_audio_base64=final_state.get("feedback_audio_base64", None)
-            )
+            evaluation_id = await self._save_evaluation(final_state, user_email)
 
-            return output
-        
+            return self._build_output(final_state, feedback_audio_id, evaluation_id)
+        except HTTPException:
+            raise
         except Exception as e:
             print(f"[ERROR] Speaking service generate_response failed: {type(e).__name__}: {str(e)}")
             import traceback
@@ -543,87 +801,127 @@ class SpeakingService:
                 status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Failed to generate speaking response: {str(e)}"
             )
+        finally:
+            # Without a run id from the client the run can never be resumed, so its checkpoints aren't kept
+            if input.run_id is None:
+                voice_tutor_checkpoints.delete_run(run_id)
 
 
-    async def explain_response(self, input: VoiceTutorExplainInput) -> VoiceTutorExplainOutput:
-        """Takes in previous eval data regarding user performance and generates an audio response."""
+    def stream_response(self, input: VoiceTutorInput, user_email: str | None = None) -> AsyncIterator[str]:
+        """
+        Generates the same feedback as generate_response, but streams each stage as a Server-Sent Event as soon as
+        its graph node finishes: transcription, pronounciation_scores, semantic_evaluation, feedback, then audio.
+        A final done event carries the full VoiceTutorOutput.
+        """
+
+        # Built before streaming starts so bad requests still get a normal 4xx response
+        initial_state = self._build_initial_state(input)
+
+        return self._stream_events(initial_state, input.run_id, user_email)
+
+
+    async def _stream_events(self, initial_state: VoiceTutorState, client_run_id: str | None = None, user_email: str | None = None) -> AsyncIterator[str]:
+        """
+        Runs the workflow in streaming mode and formats each node's state update as an event. A retry with the run id
+        of a failed stream resumes it, sending the events of the remaining nodes and then done.
+        """
+
+        run_id = client_run_id or uuid.uuid4().hex
+        config = self._run_config(run_id)
+        final_state = initial_state.model_dump()
+        graph_input: VoiceTutorState | None = initial_state
 
         try:
-            query = input.query
-            question = input.question
-            language = input.language.value
-            dialect = input.dialect.value if input.dialect else None
-            vocab_words = input.vocab_words
+            snapshot = await self._saved_run(run_id, initial_state) if client_run_id else None
 
-            transcription = input.transcription
-            accuracy = input.pronounciation_scores.accuracy
-            completeness = input.pronounciation_scores.completeness
-            overall = input.pronounciation_scores.overall
+            if snapshot is not None:
+                metrics.increment("speaking.runs.resumed" if snapshot.next else "speaking.runs.replayed")
+                final_state.update(snapshot.values if snapshot.next else await self._replayed_state(snapshot))
+                graph_input = None
 
-            vocab_words_used = str(input.semantic_evaluation.vocab_words_used)
-            answer_makes_sense = input.semantic_evaluation.answer_makes_sense
-            grammatical_score = input.semantic_evaluation.grammatical_score
-            grammar_notes = input.semantic_evaluation.grammar_notes
+            # With stream_mode="updates" LangGraph yields {node name: state update} after each node runs.
+            # A finished run has no nodes left, so it goes straight to done.
+            async for chunk in self.workflow.astream(graph_input, config, stream_mode="updates"):
+                for node, update in chunk.items():
+                    final_state.update(update)
 
-            status = input.status
-            performance_reflection = input.performance_reflection
-            previous_feedback = str(input.previous_feedback)
+                    for event_name, fields in STREAM_EVENTS.get(node, []):
+                        if any(field in update for field in fields):
+                            yield format_sse(event_name, {field: update.get(field) for field in fields})
 
+            feedback_audio_id = None
+            if initial_state.tts_mode == "deferred" and final_state.get("feedback_text"):
+                feedback_audio_id = self._start_feedback_audio(final_state["feedback_text"], final_state["audio_format"], user_email)
+                yield format_sse("audio", {"feedback_audio_id": feedback_audio_id})
 
-            vocab_words_list = [f"{vocab_word.word} ({vocab_word.meaning})" for vocab_word in vocab_words]
-            vocab_words_str = "\n".join(vocab_words_list)
+            evaluation_id = await self._save_evaluation(final_state, user_email)
 
-            messages = build_explain_speaking_messages(
-                query=query,
-                question=question,
-                language=language,
-                dialect=dialect,
-                vocab_words=vocab_words_str,
-                transcription=transcription,
-                accuracy=accuracy,
-                completeness=completeness,
-                overall=overall,
-                vocab_words_used=vocab_words_used,
-                answer_makes_sense=answer_makes_sense,
-                grammatical_score=grammatical_score,
-                grammar_notes=grammar_notes,
-                status=status,
-                performance_reflection=performance_reflection,
-                previous_feedback=previous_feedback
-            )
+            yield format_sse("done", self._build_output(final_state, feedback_audio_id, evaluation_id))
+        except Exception as e:
+            print(f"[ERROR] Speaking service stream_response failed: {type(e).__name__}: {str(e)}")
+            yield format_sse_error(e)
+        finally:
+            if client_run_id is None:
+                voice_tutor_checkpoints.delete_run(run_id)
+
+
+    async def _explain_messages(self, input: VoiceTutorExplainInput | EvaluationExplainInput, user_email: str | None = None) -> Tuple[VoiceTutorExplainInput, str | None, List]:
+        """Fills in the input from the stored evaluation if needed, and builds the explain speaking prompt."""
+
+        input, evaluation_id = await resolve_explain_input(input, VoiceTutorEvaluationContext, VoiceTutorExplainInput, user_email)
+
+        query = input.query
+        question = input.question
+        language = input.language.value
+        dialect = input.dialect.value if input.dialect else None
+        vocab_words = input.vocab_words
+
+        transcription = input.transcription
+        accuracy = input.pronounciation_scores.accuracy
+        completeness = input.pronounciation_scores.completeness
+        overall = input.pronounciation_scores.overall
+
+        vocab_words_used = str(input.semantic_evaluation.vocab_words_used)
+        answer_makes_sense = input.semantic_evaluation.answer_makes_sense
+        grammatical_score = input.semantic_evaluation.grammatical_score
+        grammar_notes = input.semantic_evaluation.grammar_notes
+
+        status = input.status
+        performance_reflection = input.performance_reflection
+        previous_feedback = render_previous_feedback(input.previous_feedback)
+
+        vocab_words_list = [f"{vocab_word.word} ({vocab_word.meaning})" for vocab_word in vocab_words]
+        vocab_words_str = "\n".join(vocab_words_list)
+
+        messages = build_explain_speaking_messages(
+            query=query,
+            question=question,
+            language=language,
+            dialect=dialect,
+            vocab_words=vocab_words_str,
+            transcription=transcription,
+            accuracy=accuracy,
+            completeness=completeness,
+            overall=overall,
+            vocab_words_used=vocab_words_used,
+            answer_makes_sense=answer_makes_sense,
+            grammatical_score=grammatical_score,
+            grammar_notes=grammar_notes,
+            status=status,
+            performance_reflection=performance_reflection,
+            previous_feedback=previous_feedback
+        )
 
-            response = await self.llm.ainvoke(messages)
-            
-            # Debug logging
-            print(f"[DEBUG] Explain response type: {type(response.content)}")
-            print(f"[DEBUG] Explain response content: {response.content[:500] if response.content else 'EMPTY'}")
-            
-            # Clean up the response
-            content = response.content.strip()
-            
-            # Remove markdown code fences if present
-            if content.startswith('```'):
-                # Remove opening fence (```json or ```)
-                content = content.split('\n', 1)[1] if '\n' in content else content
-                # Remove closing fence (```)
-                if content.endswith('```'):
-                    content = content.rsplit('```', 1)[0]
-                content = content.strip()
-            
-            # Fix Python-style values to JSON-style
-            content = content.replace('True', 'true').replace('False', 'false').replace('None', 'null')
-            
-            # Try to parse JSON
-            try:
-                response_data = json.loads(content)
-            except json.JSONDecodeError as e:
-                print(f"[ERROR] JSON parsing failed. Raw content: {content}")
-                raise HTTPException(
-                    status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"LLM returned invalid JSON: {str(e)}"
-                )
-            
-            response_text = response_data.get("response_text")
+        return input, evaluation_id, messages
+
+
+    async def explain_response(self, input: VoiceTutorExplainInput | EvaluationExplainInput, user_email: str | None = None) -> VoiceTutorExplainOutput:
+        """Takes in previous eval data regarding user performance and generates an audio response."""
+
+        input, evaluation_id, messages = await self._explain_messages(input, user_email)
+
+        try:
+            response_text = (await chat_structured("explain_speaking", messages, VoiceTutorExplainOutput)).response_text
 
             if not response_text:
                 raise HTTPException(
@@ -631,6 +929,8 @@ class SpeakingService:
                     detail="Failed to generate speaking query response with OpenAI API."
                 )
 
+            await record_answer(evaluation_id, input.query, response_text)
+
             return VoiceTutorExplainOutput(response_text=response_text)
         except HTTPException:
             raise
@@ -638,4 +938,20 @@ class SpeakingService:
             raise HTTPException(
                 status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Generating speaking query response failed: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+
+    async def stream_explain_response(self, input: VoiceTutorExplainInput | EvaluationExplainInput, user_email: str | None = None) -> AsyncIterator[str]:
+        """Answers the same question as explain_response, streaming the answer as Server-Sent Events while it is written."""
+
+        # Prepared before streaming starts so a missing evaluation still gets a normal 404 response
+        input, evaluation_id, messages = await self._explain_messages(input, user_email)
+
+        return stream_explain_answer(
+            "explain_speaking",
+            messages,
+            "response_text",
+            lambda answer: VoiceTutorExplainOutput(response_text=answer),
+            lambda answer: record_answer(evaluation_id, input.query, answer),
+            response_format=json_schema_format(VoiceTutorExplainOutput)
+        )
@@ -1,30 +1,386 @@
-from app.models.ai.writing import DictationExplainInput, DictationResponse, DictationScores, JoiningExplainInput, LetterHandwritingScores, LetterJoiningResponse, LetterJoiningScores, LetterWritingResponse, WritingExplainInput, WritingExplainResponse, WritingQAResponse, WritingPhotoRetakeResponse
-from app.utils.openai import openai_client
+from app.models.ai.writing import DictationEvaluationContext, DictationExplainInput, DictationResponse, DictationScores, JoiningEvaluationContext, JoiningExplainInput, LetterHandwritingScores, LetterJoiningResponse, LetterJoiningScores, LetterWritingResponse, WritingBatchItem, WritingBatchItemError, WritingBatchItemResult, WritingBatchSummary, WritingEvaluationContext, WritingExplainInput, WritingExplainResponse, WritingQAResponse, WritingPhotoRetakeResponse
+from app.utils.llm_gateway import llm_gateway
 from fastapi import HTTPException, UploadFile, status as http_status
-from typing import List
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Tuple
 from app.utils.prompts.writing.letter_writing_qa import build_letter_writing_qa_messages
 from app.utils.prompts.writing.letter_writing import build_letter_writing_messages
 from app.utils.prompts.writing.letter_joining import build_letter_joining_messages
 from app.utils.enums import LetterPosition
-import base64, os, json
+import asyncio, io, json, time, httpx
 from app.utils.prompts.writing.dictation import build_dictation_messages
 from app.utils.prompts.writing.explain_joining_messages import build_explain_joining_messages
 from app.utils.prompts.writing.explain_writing_messages import build_explain_writing_messages
 from app.utils.prompts.writing.explain_dictation_messages import build_explain_dictation_messages
 from app.db.enums import AvailableDialect, AvailableLanguage
+from app.db.schemas.letter_writing_problem import LetterWritingProblem
+from app.db.schemas.letter_joining_problem import LetterJoiningProblem
+from app.db.schemas.dictation_problem import DictationProblem
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from app.utils.sse import error_details, format_sse
+from sqlalchemy.orm import Session
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+from app.utils.image_processing import PreparedImage, hamming_distance, prepare_image
+from app.utils.shape_matching import ShapeMatch, match_to_reference
+from app.utils.evaluation_store import evaluation_store, record_answer, resolve_explain_input
+from app.utils.conversation_memory import render_previous_feedback
+from app.utils.explain_stream import stream_explain_answer
+from app.utils.explain_cache import explain_cache
+from app.models.ai.evaluation import EvaluationExplainInput
+from app.utils.constants import (
+    WRITING_CASCADE_ENABLED,
+    WRITING_CASCADE_MARGIN,
+    WRITING_SPECULATIVE_ENDPOINTS,
+    REFERENCE_IMAGE_CACHE_SIZE,
+    REFERENCE_IMAGE_TTL_SECONDS,
+    WRITING_DEDUP_TTL_SECONDS,
+    WRITING_DEDUP_CACHE_SIZE,
+    WRITING_DEDUP_IMAGES_PER_SCOPE,
+    WRITING_DEDUP_MAX_HAMMING_DISTANCE,
+    WRITING_DEDUP_MAX_ASPECT_DIFFERENCE,
+    WRITING_BATCH_MAX_ITEMS,
+    WRITING_BATCH_CONCURRENCY,
+    SHAPE_MATCH_ENABLED,
+    SHAPE_MATCH_REJECT_SCORE,
+)
+
+
+EVAL_TASKS = ("letter_eval", "joining_eval", "dictation_eval")
+WRITING_ENDPOINTS = ("letter_writing", "letter_joining", "dictation")
+
+# Letter writing problem id -> task preparing its reference image, shared so concurrent attempts fetch it only once
+reference_images: TTLCache[int, asyncio.Task] = TTLCache(REFERENCE_IMAGE_CACHE_SIZE, REFERENCE_IMAGE_TTL_SECONDS)
+
+
+class LetterReference(BaseModel):
+    """A letter writing problem's prepared reference image, with the letter and position it shows"""
+    letter: str
+    position: LetterPosition | None
+    image: PreparedImage
+
+
+async def _fetch_reference_image(letter: str, position: LetterPosition | None, reference_url: str) -> LetterReference:
+    """Downloads a stored reference image and prepares it like any other image we send to the vision models."""
+
+    async with httpx.AsyncClient() as client:
+        response = await client.get(reference_url, follow_redirects=True, timeout=15.0)
+        response.raise_for_status()
+
+    return LetterReference(letter=letter, position=position, image=await prepare_image(response.content))
+
+
+async def get_reference_image(db: Session, problem_id: int) -> LetterReference:
+    """
+    Returns the prepared reference image of a letter writing problem, along with the problem's letter and position.
+    It is looked up and encoded once, then served from memory, so clients don't have to upload it with every attempt.
+    """
+
+    task = reference_images.get(problem_id)
+
+    if task is None:
+        metrics.increment("writing.reference_images.misses")
+
+        problem = db.get(LetterWritingProblem, problem_id)
+        if problem is None:
+            raise HTTPException(
+                status_code=http_status.HTTP_404_NOT_FOUND,
+                detail=f"Letter writing problem with id {problem_id} not found."
+            )
+
+        position = LetterPosition(problem.position.lower()) if problem.position else None
+        task = asyncio.create_task(_fetch_reference_image(problem.letter, position, problem.reference_writing))
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        reference_images.set(problem_id, task)
+    else:
+        metrics.increment("writing.reference_images.hits")
+
+    try:
+        # Shielded so one cancelled request doesn't cancel the fetch other requests are waiting on
+        return await asyncio.shield(task)
+    except Exception as e:
+        # Don't cache failures, so the next attempt tries again
+        if reference_images.get(problem_id) is task:
+            reference_images.pop(problem_id)
+
+        if isinstance(e, HTTPException):
+            raise
+
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error when fetching the reference image for letter writing problem {problem_id}: {str(e)}"
+        )
+
+
+def _escalation_reason(eval_obj: Dict[str, Any], thresholds: Dict[str, float], score_fields: Iterable[str]) -> str | None:
+    """Checks if a fast model evaluation is too unclear to trust, and returns why (or None if it can be used as is)."""
+
+    try:
+        confidence = float(eval_obj["confidence"])
+        scores = {field: float(eval_obj["scores"][field]) for field in score_fields}
+    except (KeyError, TypeError, ValueError):
+        return "invalid"
+
+    if confidence < thresholds["baseline_eval_confidence"]:
+        return "low_confidence"
+
+    # A score right next to its threshold could flip the pass/fail result, so we want the stronger model's opinion
+    for field, score in scores.items():
+        if field in thresholds and abs(score - thresholds[field]) < WRITING_CASCADE_MARGIN:
+            return "near_threshold"
+
+    return None
+
+
+async def _evaluate_writing(task: str, messages: List, thresholds: Dict[str, float], score_fields: Iterable[str]) -> Dict[str, Any]:
+    """
+    Runs a writing evaluation prompt and returns the parsed JSON. In cascade mode the fast model grades first and we only
+    escalate to the primary model when its answer is low confidence, near a pass/fail boundary, or unusable.
+    """
+
+    if WRITING_CASCADE_ENABLED:
+        metrics.increment(f"writing.cascade.{task}.calls")
+        reason = None
+
+        try:
+            fast_response = await llm_gateway.chat(
+                task=f"{task}_fast",
+                messages=messages,
+                response_format={"type": "json_object"}
+            )
+            fast_obj = json.loads(fast_response.choices[0].message.content)
+            reason = _escalation_reason(fast_obj, thresholds, score_fields)
+        except Exception:
+            # If the fast tier is failing the primary model still gets a chance
+            reason = "fast_model_error"
+
+        if reason is None:
+            return fast_obj
+
+        metrics.increment(f"writing.cascade.{task}.escalations")
+        metrics.increment(f"writing.cascade.{task}.escalations.{reason}")
+
+    eval_response = await llm_gateway.chat(
+        task=task,
+        messages=messages,
+        response_format={"type": "json_object"}
+    )
+
+    return json.loads(eval_response.choices[0].message.content)
+
+
+def _start_speculative_evaluation(endpoint: str, evaluate: Callable[[], Awaitable[Dict[str, Any]]]) -> asyncio.Task | None:
+    """
+    Starts the evaluation in the background so it runs while photo QA is still deciding, if the endpoint is
+    configured for it. Returns None when the evaluation should wait for QA instead.
+    """
+
+    if endpoint not in WRITING_SPECULATIVE_ENDPOINTS:
+        return None
+
+    metrics.increment(f"writing.speculative.{endpoint}.started")
+    task = asyncio.create_task(evaluate())
+
+    # Retrieve the exception of a discarded evaluation so asyncio doesn't log it as never retrieved
+    task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+    return task
+
+
+def _discard_speculative_evaluation(endpoint: str, task: asyncio.Task | None, reason: str) -> None:
+    """Cancels a speculative evaluation we no longer need and counts it as wasted."""
+
+    if task is None:
+        return
+
+    task.cancel()
+    metrics.increment(f"writing.speculative.{endpoint}.wasted")
+    metrics.increment(f"writing.speculative.{endpoint}.wasted.{reason}")
+
+
+async def _check_photo_then_evaluate(
+    endpoint: str,
+    activity: str,
+    image: PreparedImage,
+    baseline_qa_confidence: float,
+    evaluate: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any] | WritingPhotoRetakeResponse:
+    """
+    Makes sure the photo is usable and then runs the evaluation. The local quality check settles clearly bad and clearly
+    good photos on its own. Only the ambiguous ones go to the LLM QA, with the evaluation started alongside it in speculative mode.
+    """
+
+    quality = image.quality
+    metrics.increment(f"writing.local_qa.{endpoint}.{quality.verdict}")
+
+    if quality.verdict == "reject":
+        return WritingPhotoRetakeResponse(capture_tips=quality.capture_tips)
+
+    if quality.verdict == "accept":
+        return await evaluate()
+
+    speculative_eval = _start_speculative_evaluation(endpoint, evaluate)
+    qa_messages = build_letter_writing_qa_messages(image.data_url, image.detail)
+
+    try:
+        qa_chat_response = await llm_gateway.chat(
+            task="qa",
+            messages=qa_messages,
+            response_format={"type": "json_object"}
+        )
+
+        qa_response_content = qa_chat_response.choices[0].message.content
+        qa_response_obj = json.loads(qa_response_content)
+
+        qa_response = WritingQAResponse(
+            is_usable=qa_response_obj["is_usable"],
+            confidence=qa_response_obj["confidence"],
+            reasons=qa_response_obj["reasons"],
+            capture_tips=qa_response_obj["capture_tips"]
+        )
+    except (HTTPException, asyncio.CancelledError):
+        _discard_speculative_evaluation(endpoint, speculative_eval, "qa_error")
+        raise
+    except Exception as e:
+        _discard_speculative_evaluation(endpoint, speculative_eval, "qa_error")
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error when performing QA for {activity}: {str(e)}"
+        )
+
+    if (not qa_response.is_usable) or qa_response.confidence < baseline_qa_confidence:
+        _discard_speculative_evaluation(endpoint, speculative_eval, "qa_rejected")
+        return WritingPhotoRetakeResponse(capture_tips=qa_response.capture_tips)
+
+    return await speculative_eval if speculative_eval else await evaluate()
+
+
+# (user, endpoint, problem details) -> that user's recent gradings for the problem as (started at, image hash, aspect ratio, task), newest first
+graded_images: TTLCache[Tuple, List[Tuple[float, int, float, asyncio.Task]]] = TTLCache(WRITING_DEDUP_CACHE_SIZE, WRITING_DEDUP_TTL_SECONDS)
+
+
+def _find_duplicate_grading(scope: Tuple, image: PreparedImage) -> asyncio.Task | None:
+    """Returns the recent grading of a near-identical photo in the same scope, if there is one that hasn't failed."""
+
+    now = time.monotonic()
+
+    for started_at, image_hash, aspect_ratio, task in graded_images.get(scope, []):
+        if now - started_at > WRITING_DEDUP_TTL_SECONDS:
+            continue
+
+        if task.done() and (task.cancelled() or task.exception()):
+            continue
+
+        if abs(aspect_ratio - image.aspect_ratio) / image.aspect_ratio > WRITING_DEDUP_MAX_ASPECT_DIFFERENCE:
+            continue
+
+        if hamming_distance(image_hash, image.image_hash) <= WRITING_DEDUP_MAX_HAMMING_DISTANCE:
+            return task
+
+    return None
+
+
+async def _grade_unless_duplicate(scope: Tuple | None, image: PreparedImage, grade: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Grades the photo, unless the same user recently submitted a near-identical one for the same problem (e.g. a resubmit
+    after a network error). Then the earlier grading is reused, even if it is still running. No scope means no dedup.
+    """
+
+    if scope is None:
+        return await grade()
+
+    task = _find_duplicate_grading(scope, image)
+
+    if task:
+        metrics.increment("writing.dedup.hits")
+    else:
+        metrics.increment("writing.dedup.misses")
+
+        now = time.monotonic()
+        task = asyncio.create_task(grade())
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+        recent = [entry for entry in graded_images.get(scope, []) if now - entry[0] <= WRITING_DEDUP_TTL_SECONDS]
+        graded_images.set(scope, [(now, image.image_hash, image.aspect_ratio, task)] + recent[:WRITING_DEDUP_IMAGES_PER_SCOPE - 1])
+
+    # Shielded so a client disconnecting doesn't cancel a grading other requests may reuse
+    return await asyncio.shield(task)
+
+
+async def _match_shape(user_image: PreparedImage, reference_image: PreparedImage) -> ShapeMatch | None:
+    """
+    Scores how closely the writing's shape matches the reference. Matching is only a hint, so if it is disabled or
+    fails we carry on without it.
+    """
+
+    if not SHAPE_MATCH_ENABLED:
+        return None
+
+    try:
+        shape_match = await match_to_reference(user_image, reference_image)
+    except Exception:
+        metrics.increment("writing.shape.errors")
+        return None
+
+    if shape_match:
+        metrics.increment("writing.shape.comparisons")
+        metrics.observe("writing.shape.score", shape_match.score)
+
+    return shape_match
+
+
+def _wrong_shape_response(letter: str, position: str | None, shape_match: ShapeMatch) -> LetterWritingResponse:
+    """Builds the failing grade for writing that clearly isn't the letter asked for."""
+
+    letter_description = f"the {position} form of {letter}" if position else letter
+    score = round(shape_match.score, 1)
+
+    return LetterWritingResponse(
+        status="fail",
+        scores=LetterHandwritingScores(overall=score), # The rubric wasn't assessed, so only the shape similarity is reported
+        feedback=f"This doesn't look like {letter_description} yet. Compare your writing with the reference, paying close attention to the overall shape of the letter, then try again.",
+        mistake_tags=["WRONG_LETTER_SHAPE"],
+        performance_reflection=f"The student's writing did not resemble {letter_description} (automated shape similarity {score} out of 100), so it was failed without a detailed review of the writing."
+    )
+
+
+def writing_stats() -> Dict[str, Dict[str, float | None]]:
+    """
+    Returns the share of evaluations per task that the cascade escalated to the primary model, the share of
+    speculative evaluations per endpoint that were thrown away, and the share of letter writing attempts failed by the
+    local shape check.
+    """
+
+    return {
+        "cascade_escalation_rates": {
+            task: metrics.ratio(f"writing.cascade.{task}.escalations", f"writing.cascade.{task}.calls") for task in EVAL_TASKS
+        },
+        "speculative_waste_rates": {
+            endpoint: metrics.ratio(f"writing.speculative.{endpoint}.wasted", f"writing.speculative.{endpoint}.started") for endpoint in WRITING_ENDPOINTS
+        },
+        "shape_rejection_rates": {
+            "letter_writing": metrics.ratio("writing.shape.rejections", "writing.shape.comparisons")
+        }
+    }
 
 
 class WritingService:
     async def check_letter_writing(
         self, 
+        db: Session,
         user_image: UploadFile, 
-        target_image: UploadFile, 
-        letter: str, 
+        target_image: UploadFile | None, 
+        letter: str | None, 
         language: AvailableLanguage,
         dialect: AvailableDialect | None,
-        position: LetterPosition | None
+        position: LetterPosition | None,
+        problem_id: int | None = None,
+        user_email: str | None = None
     ) -> LetterWritingResponse | WritingPhotoRetakeResponse:
-        """Takes in the user's writing image and a reference image to evaluate the user's writing."""
+        """
+        Takes in the user's writing image and a reference image to evaluate the user's writing. The reference is the
+        stored one for problem_id if given, in which case the letter and position also come from the problem, otherwise
+        the uploaded target_image. Resubmissions of the same photo by the same user are answered from the earlier grading.
+        """
 
         # 1. Establishing thresholds for QA and scoring
         thresholds = {
@@ -37,65 +393,92 @@ class WritingService:
             "overall": 85.0,
         }
         
-        # 2. Converting files into image urls that can be fed into OpenAI API
-        raw_user_bytes = await user_image.read()
-        raw_target_bytes = await target_image.read()
-
-        user_image_base64 = base64.b64encode(raw_user_bytes).decode("utf-8")
-        target_image_base64 = base64.b64encode(raw_target_bytes).decode("utf-8")
-        
-        user_image_format = user_image.content_type or "image/jpeg"
-        target_image_format = target_image.content_type or "image/jpeg"
-
-        user_image_url = f"data:{user_image_format};base64,{user_image_base64}"
-        target_image_url = f"data:{target_image_format};base64,{target_image_base64}"
-
-        # 3. Determining if the image is actually suitable for evaluation
-        qa_messages = build_letter_writing_qa_messages(user_image_url)
-
-        try:
-            qa_chat_response = await openai_client.chat.completions.create(
-                model=os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest",
-                messages=qa_messages,
-                response_format={"type": "json_object"},
+        # 2. Shrinking the images down and encoding them once as image urls that can be fed into OpenAI API
+        if problem_id is not None:
+            prepared_target = get_reference_image(db, problem_id)
+        elif target_image is not None and letter:
+            prepared_target = prepare_image(await target_image.read())
+        else:
+            raise HTTPException(
+                status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Either problem_id, or target_image and letter, are required for letter writing."
             )
 
-            qa_response_content = qa_chat_response.choices[0].message.content
-            qa_response_obj = json.loads(qa_response_content)
+        raw_user_bytes = await user_image.read()
 
-            qa_response = WritingQAResponse(
-                is_usable=qa_response_obj["is_usable"],
-                confidence=qa_response_obj["confidence"],
-                reasons=qa_response_obj["reasons"],
-                capture_tips=qa_response_obj["capture_tips"]
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error when performing QA for letter writing: {str(e)}"
-            )
+        prepared_user_image, prepared_target = await asyncio.gather(
+            prepare_image(raw_user_bytes),
+            prepared_target
+        )
 
-        # If QA says the image is not good enough, we ask the user to retake their writing image
-        if (not qa_response.is_usable) or qa_response.confidence < thresholds["baseline_qa_confidence"]:
-            return WritingPhotoRetakeResponse(capture_tips=qa_response.capture_tips)
+        # The graded letter must be the one the reference shows, whatever the client sent
+        if isinstance(prepared_target, LetterReference):
+            letter, position, prepared_target_image = prepared_target.letter, prepared_target.position, prepared_target.image
+        else:
+            prepared_target_image = prepared_target
 
-        # 4. Running evaluation of user writing image relative to the target image and actual letter
+        # 3. Comparing the shape of the writing with the reference locally
         position_value = position.value if position else None
         language_value = language.value
         dialect_value = dialect.value if dialect else None
 
-        writing_eval_messages = build_letter_writing_messages(user_image_url, target_image_url, letter, language_value, dialect_value, position_value)
+        shape_match = await _match_shape(prepared_user_image, prepared_target_image)
+
+        # A clean photo of clearly the wrong shape fails straight away, without spending a vision call on it.
+        # Off unless SHAPE_MATCH_REJECT_SCORE is set from calibration results, until then the score is only a prompt hint.
+        if shape_match and prepared_user_image.quality.verdict == "accept" and shape_match.score < SHAPE_MATCH_REJECT_SCORE:
+            metrics.increment("writing.shape.rejections")
+            writing_eval_response = _wrong_shape_response(letter, position_value, shape_match)
+            writing_eval_response.evaluation_id = await evaluation_store.save(WritingEvaluationContext(
+                language=language,
+                dialect=dialect,
+                letter=letter,
+                position=position,
+                status=writing_eval_response.status,
+                scores=writing_eval_response.scores,
+                previous_feedback=[writing_eval_response.feedback],
+                mistake_tags=writing_eval_response.mistake_tags,
+                performance_reflection=writing_eval_response.performance_reflection
+            ), user_email)
+
+            return writing_eval_response
+
+        # 4. Preparing the evaluation
+        writing_eval_messages = build_letter_writing_messages(
+            prepared_user_image.data_url,
+            prepared_target_image.data_url,
+            letter,
+            language_value,
+            dialect_value,
+            position_value,
+            prepared_user_image.detail,
+            prepared_target_image.detail,
+            shape_match.score if shape_match else None
+        )
+        evaluate = lambda: _evaluate_writing("letter_eval", writing_eval_messages, thresholds, LetterHandwritingScores.model_fields)
+
+        # 5. Checking the photo is usable, then running evaluation of user writing image relative to the target image and actual letter
         status = "fail"
 
         try:
-            writing_eval_chat_response = await openai_client.chat.completions.create(
-                model=os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest",
-                messages=writing_eval_messages,
-                response_format={"type": "json_object"}
+            target_key = problem_id if problem_id is not None else prepared_target_image.image_hash
+            dedup_scope = (user_email, "letter_writing", letter, position_value, language_value, dialect_value, target_key) if user_email else None
+
+            writing_eval_response_obj = await _grade_unless_duplicate(
+                dedup_scope,
+                prepared_user_image,
+                lambda: _check_photo_then_evaluate(
+                    "letter_writing",
+                    "letter writing",
+                    prepared_user_image,
+                    thresholds["baseline_qa_confidence"],
+                    evaluate
+                )
             )
 
-            writing_eval_response_content = writing_eval_chat_response.choices[0].message.content
-            writing_eval_response_obj = json.loads(writing_eval_response_content)
+            # If the photo is not good enough, we ask the user to retake their writing image
+            if isinstance(writing_eval_response_obj, WritingPhotoRetakeResponse):
+                return writing_eval_response_obj
 
             handwriting_scores = LetterHandwritingScores(
                 legibility=writing_eval_response_obj["scores"]["legibility"],
@@ -125,7 +508,22 @@ class WritingService:
                 performance_reflection=writing_eval_response_obj["performance_reflection"]
             )
 
+            # Saved so follow up questions only need to send the evaluation id
+            writing_eval_response.evaluation_id = await evaluation_store.save(WritingEvaluationContext(
+                language=language,
+                dialect=dialect,
+                letter=letter,
+                position=position,
+                status=status,
+                scores=handwriting_scores,
+                previous_feedback=[writing_eval_response.feedback],
+                mistake_tags=writing_eval_response.mistake_tags,
+                performance_reflection=writing_eval_response.performance_reflection
+            ), user_email)
+
             return writing_eval_response
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -139,7 +537,8 @@ class WritingService:
         letter_list: List[str], 
         target_word: str,
         language: AvailableLanguage,
-        dialect: AvailableDialect | None
+        dialect: AvailableDialect | None,
+        user_email: str | None = None
     ) -> LetterJoiningResponse | WritingPhotoRetakeResponse:
         """Takes in the user's writing image of joining a list of letters and evaluates the user's writing."""
 
@@ -155,60 +554,46 @@ class WritingService:
             "overall": 85.0,
         }
         
-        # 2. Converting file into image urls that can be fed into OpenAI API
+        # 2. Shrinking the image down and encoding it once as an image url that can be fed into OpenAI API
         raw_user_bytes = await user_image.read()
-        user_image_base64 = base64.b64encode(raw_user_bytes).decode("utf-8")
-        user_image_format = user_image.content_type or "image/jpeg"
-        user_image_url = f"data:{user_image_format};base64,{user_image_base64}"
-
-        print(f"Image Format: {user_image_format}")
-        print(f"Image b64 Len: {len(user_image_base64)}")
-
-        # 3. Determining if the image is actually suitable for evaluation
-        qa_messages = build_letter_writing_qa_messages(user_image_url)
-
-        try:
-            qa_chat_response = await openai_client.chat.completions.create(
-                model=os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest",
-                messages=qa_messages,
-                response_format={"type": "json_object"}
-            )
-
-            qa_response_content = qa_chat_response.choices[0].message.content
-            qa_response_obj = json.loads(qa_response_content)
+        prepared_user_image = await prepare_image(raw_user_bytes)
 
-            qa_response = WritingQAResponse(
-                is_usable=qa_response_obj["is_usable"],
-                confidence=qa_response_obj["confidence"],
-                reasons=qa_response_obj["reasons"],
-                capture_tips=qa_response_obj["capture_tips"]
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error when performing QA for letter joining: {str(e)}"
-            )
-
-        # If QA says the image is not good enough, we ask the user to retake their writing image
-        if (not qa_response.is_usable) or qa_response.confidence < thresholds["baseline_qa_confidence"]:
-            return WritingPhotoRetakeResponse(capture_tips=qa_response.capture_tips)
-
-        # 4. Running evaluation of user joining writing image relative to the target word
+        # 3. Preparing the evaluation
         letter_list_str = str(letter_list)
         language_value = language.value
         dialect_value = dialect.value if dialect else None
-        joining_messages = build_letter_joining_messages(user_image_url, letter_list_str, target_word, language_value, dialect_value)
+
+        joining_messages = build_letter_joining_messages(
+            prepared_user_image.data_url,
+            letter_list_str,
+            target_word,
+            language_value,
+            dialect_value,
+            prepared_user_image.detail
+        )
+        evaluate = lambda: _evaluate_writing("joining_eval", joining_messages, thresholds, LetterJoiningScores.model_fields)
+
+        # 4. Checking the photo is usable, then running evaluation of user joining writing image relative to the target word
         status = "fail"
 
         try:
-            joining_chat_response = await openai_client.chat.completions.create(
-                model=os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest",
-                messages=joining_messages,
-                response_format={"type": "json_object"}
+            dedup_scope = (user_email, "letter_joining", tuple(letter_list), target_word, language_value, dialect_value) if user_email else None
+
+            joining_obj = await _grade_unless_duplicate(
+                dedup_scope,
+                prepared_user_image,
+                lambda: _check_photo_then_evaluate(
+                    "letter_joining",
+                    "letter joining",
+                    prepared_user_image,
+                    thresholds["baseline_qa_confidence"],
+                    evaluate
+                )
             )
 
-            joining_content = joining_chat_response.choices[0].message.content
-            joining_obj = json.loads(joining_content)
+            # If the photo is not good enough, we ask the user to retake their writing image
+            if isinstance(joining_obj, WritingPhotoRetakeResponse):
+                return joining_obj
 
             joining_scores = LetterJoiningScores(
                 connection_accuracy=joining_obj["scores"]["connection_accuracy"],
@@ -240,7 +625,22 @@ class WritingService:
                 performance_reflection=joining_obj["performance_reflection"]
             )
 
+            # Saved so follow up questions only need to send the evaluation id
+            joining_response.evaluation_id = await evaluation_store.save(JoiningEvaluationContext(
+                language=language,
+                dialect=dialect,
+                letter_list=letter_list,
+                target_word=target_word,
+                status=status,
+                scores=joining_scores,
+                previous_feedback=[joining_response.feedback],
+                mistake_tags=joining_response.mistake_tags,
+                performance_reflection=joining_response.performance_reflection
+            ), user_email)
+
             return joining_response
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -248,7 +648,14 @@ class WritingService:
             )
 
 
-    async def check_dictation(self, user_image: UploadFile, target_word: str, language: AvailableLanguage, dialect: AvailableDialect | None) -> DictationResponse | WritingPhotoRetakeResponse:
+    async def check_dictation(
+        self,
+        user_image: UploadFile,
+        target_word: str,
+        language: AvailableLanguage,
+        dialect: AvailableDialect | None,
+        user_email: str | None = None
+    ) -> DictationResponse | WritingPhotoRetakeResponse:
         """Takes in the user's writing image from a dictation and evaluates the user's writing."""
 
         # 1. Establishing thresholds for QA and scoring
@@ -264,56 +671,44 @@ class WritingService:
             "overall": 85.0,
         }
 
-        # 2. Converting file into image urls that can be fed into OpenAI API
+        # 2. Shrinking the image down and encoding it once as an image url that can be fed into OpenAI API
         raw_user_bytes = await user_image.read()
-        user_image_base64 = base64.b64encode(raw_user_bytes).decode("utf-8")
-        user_image_format = user_image.content_type or "image/jpeg"
-        user_image_url = f"data:{user_image_format};base64,{user_image_base64}"
-
-        # 3. Determining if the image is actually suitable for evaluation
-        qa_messages = build_letter_writing_qa_messages(user_image_url)
-
-        try:
-            qa_chat_response = await openai_client.chat.completions.create(
-                model=os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest",
-                messages=qa_messages,
-                response_format={"type": "json_object"}
-            )
-            
-            qa_response_content = qa_chat_response.choices[0].message.content
-            qa_response_obj = json.loads(qa_response_content)
-            
-            qa_response = WritingQAResponse(
-                is_usable=qa_response_obj["is_usable"],
-                confidence=qa_response_obj["confidence"],
-                reasons=qa_response_obj["reasons"],
-                capture_tips=qa_response_obj["capture_tips"]
-            )
-        except Exception as e:
-            raise HTTPException(
-                status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error when performing QA for dictation: {str(e)}"
-            )
-
-        # If QA says the image is not good enough, we ask the user to retake their writing image
-        if (not qa_response.is_usable) or qa_response.confidence < thresholds["baseline_qa_confidence"]:
-            return WritingPhotoRetakeResponse(capture_tips=qa_response.capture_tips)
+        prepared_user_image = await prepare_image(raw_user_bytes)
 
-        # 4. Running evaluation of user dictation writing image relative to the target word
+        # 3. Preparing the evaluation
         language_value = language.value
         dialect_value = dialect.value if dialect else None
-        dictation_messages = build_dictation_messages(user_image_url, target_word, language_value, dialect_value)
+
+        dictation_messages = build_dictation_messages(
+            prepared_user_image.data_url,
+            target_word,
+            language_value,
+            dialect_value,
+            prepared_user_image.detail
+        )
+        evaluate = lambda: _evaluate_writing("dictation_eval", dictation_messages, thresholds, DictationScores.model_fields)
+
+        # 4. Checking the photo is usable, then running evaluation of user dictation writing image relative to the target word
         status = "fail"
 
         try:
-            dictation_chat_response = await openai_client.chat.completions.create(
-                model=os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest",
-                messages=dictation_messages,
-                response_format={"type": "json_object"}
+            dedup_scope = (user_email, "dictation", target_word, language_value, dialect_value) if user_email else None
+
+            dictation_obj = await _grade_unless_duplicate(
+                dedup_scope,
+                prepared_user_image,
+                lambda: _check_photo_then_evaluate(
+                    "dictation",
+                    "dictation",
+                    prepared_user_image,
+                    thresholds["baseline_qa_confidence"],
+                    evaluate
+                )
             )
 
-            dictation_content = dictation_chat_response.choices[0].message.content
-            dictation_obj = json.loads(dictation_content)
+            # If the photo is not good enough, we ask the user to retake their writing image
+            if isinstance(dictation_obj, WritingPhotoRetakeResponse):
+                return dictation_obj
 
             dictation_scores = DictationScores(
                 word_accuracy=dictation_obj["scores"]["word_accuracy"],
@@ -349,16 +744,161 @@ class WritingService:
                 performance_reflection=dictation_obj["performance_reflection"]
             )
 
+            # Saved so follow up questions only need to send the evaluation id
+            dictation_response.evaluation_id = await evaluation_store.save(DictationEvaluationContext(
+                language=language,
+                dialect=dialect,
+                target_word=target_word,
+                status=status,
+                scores=dictation_scores,
+                previous_feedback=[dictation_response.feedback],
+                mistake_tags=dictation_response.mistake_tags,
+                performance_reflection=dictation_response.performance_reflection
+            ), user_email)
+
             return dictation_response
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error when evaluating user image in dictation: {str(e)}"
             )
 
+    async def grade_batch(
+        self,
+        db: Session,
+        images: List[UploadFile],
+        items: str,
+        language: AvailableLanguage,
+        dialect: AvailableDialect | None,
+        user_email: str | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Grades a worksheet of writing images at once. items is a JSON list of {problem_type, problem_id}, one per image
+        in the same order. Everything that can fail the whole request (bad input, unknown problems) is checked before
+        the stream starts; after that each item's result or error is streamed as soon as it finishes.
+        """
+
+        # 1. Validating the batch
+        try:
+            batch_items = TypeAdapter(List[WritingBatchItem]).validate_json(items)
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Invalid batch items: {str(e)}"
+            )
+
+        if len(batch_items) != len(images):
+            raise HTTPException(
+                status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Got {len(images)} images for {len(batch_items)} batch items. Send exactly one image per item."
+            )
+
+        if len(batch_items) > WRITING_BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=http_status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"A batch can have at most {WRITING_BATCH_MAX_ITEMS} items."
+            )
+
+        # 2. Resolving every problem now, since the DB session and uploads are closed once streaming starts
+        graders = []
+        reference_problem_ids = set()
+
+        for item, image in zip(batch_items, images):
+            user_image = UploadFile(io.BytesIO(await image.read()), filename=image.filename, headers=image.headers)
+            graders.append(self._batch_grader(db, item, user_image, language, dialect, user_email))
+
+            if item.problem_type == "letter_writing":
+                reference_problem_ids.add(item.problem_id)
+
+        # Warming the reference image cache so letter writing items don't need the DB later
+        await asyncio.gather(*(get_reference_image(db, problem_id) for problem_id in reference_problem_ids))
+
+        return self._stream_batch(batch_items, graders)
+
+
+    def _batch_grader(
+        self,
+        db: Session,
+        item: WritingBatchItem,
+        user_image: UploadFile,
+        language: AvailableLanguage,
+        dialect: AvailableDialect | None,
+        user_email: str | None
+    ) -> Callable[[], Awaitable[Any]]:
+        """Looks up the item's problem and returns a function that grades the image against it."""
+
+        if item.problem_type == "letter_writing":
+            problem = db.get(LetterWritingProblem, item.problem_id)
+            if problem:
+                return lambda: self.check_letter_writing(db, user_image, None, None, language, dialect, None, problem.id, user_email)
+        elif item.problem_type == "letter_joining":
+            problem = db.get(LetterJoiningProblem, item.problem_id)
+            if problem:
+                return lambda: self.check_letter_joining(user_image, problem.letter_list, problem.word, language, dialect, user_email)
+        else:
+            problem = db.get(DictationProblem, item.problem_id)
+            if problem:
+                return lambda: self.check_dictation(user_image, problem.word, language, dialect, user_email)
+
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail=f"{item.problem_type.replace('_', ' ').capitalize()} problem with id {item.problem_id} not found."
+        )
+
+
+    async def _stream_batch(self, batch_items: List[WritingBatchItem], graders: List[Callable[[], Awaitable[Any]]]) -> AsyncIterator[str]:
+        """Grades the items with bounded concurrency and formats each result or error as an event as soon as it's ready."""
+
+        semaphore = asyncio.Semaphore(WRITING_BATCH_CONCURRENCY)
+
+        async def grade(index: int) -> tuple[int, Any, Exception | None]:
+            async with semaphore:
+                try:
+                    return index, await graders[index](), None
+                except Exception as e:
+                    return index, None, e
+
+        tasks = [asyncio.create_task(grade(index)) for index in range(len(graders))]
+        failed = 0
+
+        metrics.increment("writing.batch.requests")
+        metrics.increment("writing.batch.items", len(tasks))
+
+        try:
+            for next_finished in asyncio.as_completed(tasks):
+                index, result, error = await next_finished
+                item = batch_items[index]
+
+                if error:
+                    failed += 1
+                    metrics.increment("writing.batch.failed_items")
+                    yield format_sse("item_error", WritingBatchItemError(
+                        index=index,
+                        problem_type=item.problem_type,
+                        problem_id=item.problem_id,
+                        **error_details(error)
+                    ))
+                else:
+                    yield format_sse("result", WritingBatchItemResult(
+                        index=index,
+                        problem_type=item.problem_type,
+                        problem_id=item.problem_id,
+                        result=result
+                    ))
+
+            yield format_sse("done", WritingBatchSummary(completed=len(tasks) - failed, failed=failed))
+        finally:
+            # Stops grading if the client goes away mid stream
+            for task in tasks:
+                task.cancel()
+
     
-    async def explain_writing(self, input: WritingExplainInput) -> WritingExplainResponse:
-        """Takes in a reflection on the user's letter writing performance and user question and returns a response."""
+    async def _explain_writing_messages(self, input: WritingExplainInput | EvaluationExplainInput, user_email: str | None = None) -> Tuple[WritingExplainInput, str | None, List]:
+        """Fills in the input from the stored evaluation if needed, and builds the explain letter writing prompt."""
+
+        input, evaluation_id = await resolve_explain_input(input, WritingEvaluationContext, WritingExplainInput, user_email)
         
         query = input.query
         language = input.language.value
@@ -371,7 +911,7 @@ class WritingService:
         dots_diacritics = input.scores.dots_diacritics
         baseline_proportion = input.scores.baseline_proportion
         overall = input.scores.overall
-        previous_feedback = str(input.previous_feedback)
+        previous_feedback = render_previous_feedback(input.previous_feedback)
         mistake_tags = str(input.mistake_tags)
         performance_reflection = input.performance_reflection
 
@@ -396,9 +936,24 @@ class WritingService:
             performance_reflection
         )
 
+        return input, evaluation_id, explain_messages
+
+
+    async def explain_writing(self, input: WritingExplainInput | EvaluationExplainInput, user_email: str | None = None) -> WritingExplainResponse:
+        """Takes in a reflection on the user's letter writing performance and user question and returns a response."""
+
+        input, evaluation_id, explain_messages = await self._explain_writing_messages(input, user_email)
+
+        cache_key = explain_cache.key("explain_writing", input)
+        cached_answer = explain_cache.get(cache_key, input.query)
+
+        if cached_answer is not None:
+            await record_answer(evaluation_id, input.query, cached_answer)
+            return WritingExplainResponse(response=cached_answer)
+
         try:
-            chat_response = await openai_client.chat.completions.create(
-                model=os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest",
+            chat_response = await llm_gateway.chat(
+                task="explain_writing",
                 messages=explain_messages,
                 response_format={"type": "json_object"},
             )
@@ -409,7 +964,13 @@ class WritingService:
             explain_response = WritingExplainResponse(
                 response=chat_response_obj["response"]
             )
+
+            explain_cache.set(cache_key, input.query, explain_response.response)
+            await record_answer(evaluation_id, input.query, explain_response.response)
+
             return explain_response
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -417,8 +978,27 @@ class WritingService:
             )
 
 
-    async def explain_joining(self, input: JoiningExplainInput) -> WritingExplainResponse:
-        """Takes in a reflection on the user's letter joining performance and user question and returns a response."""
+    async def stream_explain_writing(self, input: WritingExplainInput | EvaluationExplainInput, user_email: str | None = None) -> AsyncIterator[str]:
+        """Answers the same question as explain_writing, streaming the answer as Server-Sent Events while it is written."""
+
+        # Prepared before streaming starts so a missing evaluation still gets a normal 404 response
+        input, evaluation_id, explain_messages = await self._explain_writing_messages(input, user_email)
+
+        return stream_explain_answer(
+            "explain_writing",
+            explain_messages,
+            "response",
+            lambda answer: WritingExplainResponse(response=answer),
+            lambda answer: record_answer(evaluation_id, input.query, answer),
+            cache_key=explain_cache.key("explain_writing", input),
+            query=input.query
+        )
+
+
+    async def _explain_joining_messages(self, input: JoiningExplainInput | EvaluationExplainInput, user_email: str | None = None) -> Tuple[JoiningExplainInput, str | None, List]:
+        """Fills in the input from the stored evaluation if needed, and builds the explain letter joining prompt."""
+
+        input, evaluation_id = await resolve_explain_input(input, JoiningEvaluationContext, JoiningExplainInput, user_email)
         
         query = input.query
         language = input.language.value
@@ -432,7 +1012,7 @@ class WritingService:
         baseline_consistency = input.scores.baseline_consistency
         dots_diacritics = input.scores.dots_diacritics
         overall = input.scores.overall
-        previous_feedback = str(input.previous_feedback)
+        previous_feedback = render_previous_feedback(input.previous_feedback)
         mistake_tags = str(input.mistake_tags)
         performance_reflection = input.performance_reflection
 
@@ -454,9 +1034,24 @@ class WritingService:
             performance_reflection
         )
 
+        return input, evaluation_id, explain_messages
+
+
+    async def explain_joining(self, input: JoiningExplainInput | EvaluationExplainInput, user_email: str | None = None) -> WritingExplainResponse:
+        """Takes in a reflection on the user's letter joining performance and user question and returns a response."""
+
+        input, evaluation_id, explain_messages = await self._explain_joining_messages(input, user_email)
+
+        cache_key = explain_cache.key("explain_joining", input)
+        cached_answer = explain_cache.get(cache_key, input.query)
+
+        if cached_answer is not None:
+            await record_answer(evaluation_id, input.query, cached_answer)
+            return WritingExplainResponse(response=cached_answer)
+
         try:
-            chat_response = await openai_client.chat.completions.create(
-                model=os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest",
+            chat_response = await llm_gateway.chat(
+                task="explain_joining",
                 messages=explain_messages,
                 response_format={"type": "json_object"},
             )
@@ -468,7 +1063,12 @@ class WritingService:
                 response=chat_response_obj["response"]
             )
 
+            explain_cache.set(cache_key, input.query, explain_response.response)
+            await record_answer(evaluation_id, input.query, explain_response.response)
+
             return explain_response
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -476,8 +1076,26 @@ class WritingService:
             )
 
 
-    async def explain_dictation(self, input: DictationExplainInput) -> WritingExplainResponse:
-        """Takes in a reflection on the user's dictation performance and user question and returns a response."""
+    async def stream_explain_joining(self, input: JoiningExplainInput | EvaluationExplainInput, user_email: str | None = None) -> AsyncIterator[str]:
+        """Answers the same question as explain_joining, streaming the answer as Server-Sent Events while it is written."""
+
+        input, evaluation_id, explain_messages = await self._explain_joining_messages(input, user_email)
+
+        return stream_explain_answer(
+            "explain_joining",
+            explain_messages,
+            "response",
+            lambda answer: WritingExplainResponse(response=answer),
+            lambda answer: record_answer(evaluation_id, input.query, answer),
+            cache_key=explain_cache.key("explain_joining", input),
+            query=input.query
+        )
+
+
+    async def _explain_dictation_messages(self, input: DictationExplainInput | EvaluationExplainInput, user_email: str | None = None) -> Tuple[DictationExplainInput, str | None, List]:
+        """Fills in the input from the stored evaluation if needed, and builds the explain dictation prompt."""
+
+        input, evaluation_id = await resolve_explain_input(input, DictationEvaluationContext, DictationExplainInput, user_email)
         
         query = input.query
         language = input.language.value
@@ -491,7 +1109,7 @@ class WritingService:
         dots_diacritics = input.scores.dots_diacritics
         baseline_spacing = input.scores.baseline_spacing
         overall = input.scores.overall
-        previous_feedback = str(input.previous_feedback)
+        previous_feedback = render_previous_feedback(input.previous_feedback)
         mistake_tags = str(input.mistake_tags)
         performance_reflecton = input.performance_reflection
 
@@ -513,9 +1131,24 @@ class WritingService:
             performance_reflecton
         )
 
+        return input, evaluation_id, explain_messages
+
+
+    async def explain_dictation(self, input: DictationExplainInput | EvaluationExplainInput, user_email: str | None = None) -> WritingExplainResponse:
+        """Takes in a reflection on the user's dictation performance and user question and returns a response."""
+
+        input, evaluation_id, explain_messages = await self._explain_dictation_messages(input, user_email)
+
+        cache_key = explain_cache.key("explain_dictation", input)
+        cached_answer = explain_cache.get(cache_key, input.query)
+
+        if cached_answer is not None:
+            await record_answer(evaluation_id, input.query, cached_answer)
+            return WritingExplainResponse(response=cached_answer)
+
         try:
-            chat_response = await openai_client.chat.completions.create(
-                model=os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest",
+            chat_response = await llm_gateway.chat(
+                task="explain_dictation",
                 messages=explain_messages,
                 response_format={"type": "json_object"},
             )
@@ -527,9 +1160,30 @@ class WritingService:
                 response=chat_response_obj["response"]
             )
 
+            explain_cache.set(cache_key, input.query, explain_response.response)
+            await record_answer(evaluation_id, input.query, explain_response.response)
+
             return explain_response
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Error when generating response for explain dictation: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+
+    async def stream_explain_dictation(self, input: DictationExplainInput | EvaluationExplainInput, user_email: str | None = None) -> AsyncIterator[str]:
+        """Answers the same question as explain_dictation, streaming the answer as Server-Sent Events while it is written."""
+
+        input, evaluation_id, explain_messages = await self._explain_dictation_messages(input, user_email)
+
+        return stream_explain_answer(
+            "explain_dictation",
+            explain_messages,
+            "response",
+            lambda answer: WritingExplainResponse(response=answer),
+            lambda answer: record_answer(evaluation_id, input.query, answer),
+            cache_key=explain_cache.key("explain_dictation", input),
+            query=input.query
+        )
\ No newline at end of file
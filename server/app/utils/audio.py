@@ -0,0 +1,108 @@
+import io
+import numpy as np
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from pydub import AudioSegment
+from app.utils.constants import (
+    AZURE_SAMPLE_RATE,
+    VAD_FRAME_MS,
+    VAD_PADDING_MS,
+    VAD_MIN_SPEECH_MS,
+    VAD_MIN_ENERGY_DBFS,
+    VAD_NOISE_MARGIN_DB,
+    VAD_FRICATIVE_ZCR,
+    VAD_FRICATIVE_MARGIN_DB,
+)
+
+
+class NormalizedAudio(BaseModel):
+    """16 kHz mono WAV audio with leading and trailing silence removed"""
+    wav_bytes: bytes
+    duration: float # Length of the original recording in seconds
+    trimmed_duration: float # Length of the audio we actually send on in seconds
+
+
+def _frame_features(samples: np.ndarray, frame_length: int) -> tuple[np.ndarray, np.ndarray]:
+    """Splits the samples into frames and returns the energy (dBFS) and zero crossing rate of each frame."""
+
+    frame_count = len(samples) // frame_length
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length).astype(np.float32) / 32768.0
+
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    energy = 20 * np.log10(rms + 1e-10)
+
+    # Fraction of neighbouring samples that change sign. Unvoiced sounds like س and ف are quiet but have a high ZCR.
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+    return energy, zcr
+
+
+def detect_speech(samples: np.ndarray, sample_rate: int) -> tuple[int, int] | None:
+    """Returns the (start, end) sample range that contains speech, or None if no speech was found."""
+
+    frame_length = int(sample_rate * VAD_FRAME_MS / 1000)
+    if len(samples) < frame_length:
+        return None
+
+    energy, zcr = _frame_features(samples, frame_length)
+
+    peak = float(np.max(energy))
+    if peak < VAD_MIN_ENERGY_DBFS:
+        return None
+
+    # Speech has to stand out from the noise floor. A recording whose loudest frame barely rises above its
+    # quietest ones is steady noise (a fan, hiss, a hum) rather than someone talking, however loud it is.
+    noise_floor = float(np.percentile(energy, 10))
+    if peak - noise_floor < VAD_NOISE_MARGIN_DB:
+        return None
+
+    threshold = max(noise_floor + VAD_NOISE_MARGIN_DB, VAD_MIN_ENERGY_DBFS)
+
+    is_speech = (energy > threshold) | (
+        (energy > threshold - VAD_FRICATIVE_MARGIN_DB)
+        & (energy > VAD_MIN_ENERGY_DBFS)
+        & (zcr > VAD_FRICATIVE_ZCR)
+    )
+
+    speech_frames = np.flatnonzero(is_speech)
+    if len(speech_frames) * VAD_FRAME_MS < VAD_MIN_SPEECH_MS:
+        return None
+
+    padding = int(sample_rate * VAD_PADDING_MS / 1000)
+    start = max(0, int(speech_frames[0]) * frame_length - padding)
+    end = min(len(samples), (int(speech_frames[-1]) + 1) * frame_length + padding)
+
+    return start, end
+
+
+def normalize_audio(raw_bytes: bytes) -> NormalizedAudio:
+    """Converts an uploaded recording into 16 kHz mono WAV and trims the silence around the speech."""
+
+    # 1. Decode whatever the browser recorded and convert it into the format Azure expects
+    audio_segment = AudioSegment.from_file(io.BytesIO(raw_bytes))
+    audio = audio_segment.set_frame_rate(AZURE_SAMPLE_RATE).set_channels(1).set_sample_width(2) # 16 kHz, mono, 16 bit
+
+    samples = np.frombuffer(audio.raw_data, dtype=np.int16)
+    duration = len(samples) / AZURE_SAMPLE_RATE
+
+    # 2. Find the speech and reject the recording early if there isn't any
+    speech_range = detect_speech(samples, AZURE_SAMPLE_RATE)
+    if speech_range is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="No speech was detected in the recording. Please try recording again."
+        )
+
+    # 3. Cut the silence off both ends and export the rest as WAV bytes
+    start, end = speech_range
+    trimmed_audio = audio[start * 1000 // AZURE_SAMPLE_RATE:end * 1000 // AZURE_SAMPLE_RATE] # pydub slices in ms
+
+    wav_buffer = io.BytesIO()
+    trimmed_audio.export(wav_buffer, format="wav")
+
+    return NormalizedAudio(
+        wav_bytes=wav_buffer.getvalue(),
+        duration=duration,
+        trimmed_duration=(end - start) / AZURE_SAMPLE_RATE
+    )
@@ -0,0 +1,120 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Iterator, Tuple, TypeVar
+
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """
+    A small in-memory LRU cache whose entries expire after a fixed time to live. With max_bytes it also evicts the
+    least recently used entries once the entries' sizes, as measured by size_of, add up to more than max_bytes.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, max_bytes: int | None = None, size_of: Callable[[V], int] | None = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.size_of = size_of or (lambda value: len(repr(value))) # Rough, but cheap and good enough to bound memory
+        self.total_bytes = 0
+        self._entries: "OrderedDict[K, Tuple[float, V]]" = OrderedDict() # key -> (expiry time, value), oldest first
+        self._sizes: Dict[K, int] = {} # Only measured when max_bytes is set
+
+
+    def _is_expired(self, expires_at: float) -> bool:
+        return expires_at <= time.monotonic()
+
+
+    def _remove(self, key: K) -> Tuple[float, V] | None:
+        self.total_bytes -= self._sizes.pop(key, 0)
+        return self._entries.pop(key, None)
+
+
+    def _evict(self) -> None:
+        if len(self._entries) > self.max_size or (self.max_bytes is not None and self.total_bytes > self.max_bytes):
+            self.prune()
+
+        while len(self._entries) > self.max_size or (self.max_bytes is not None and self.total_bytes > self.max_bytes and self._entries):
+            self._remove(next(iter(self._entries)))
+
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        """Returns the value for the key and marks it as recently used, or the default if it is missing or expired."""
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if self._is_expired(expires_at):
+            self._remove(key)
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+
+    def set(self, key: K, value: V, ttl_seconds: float | None = None) -> None:
+        """Stores the value, evicting expired entries and then the least recently used ones if we are full."""
+
+        expires_at = time.monotonic() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+
+        self._remove(key)
+        self._entries[key] = (expires_at, value)
+
+        if self.max_bytes is not None:
+            self._sizes[key] = self.size_of(value)
+            self.total_bytes += self._sizes[key]
+
+        self._evict()
+
+
+    def resize(self, key: K) -> None:
+        """Measures an entry again after its value changed in place, e.g. a task that finished, keeping its expiry."""
+
+        if self.max_bytes is None or key not in self._entries:
+            return
+
+        self.total_bytes -= self._sizes.get(key, 0)
+        self._sizes[key] = self.size_of(self._entries[key][1])
+        self.total_bytes += self._sizes[key]
+
+        self._evict()
+
+
+    def pop(self, key: K, default: Any = None) -> V | Any:
+        """Removes the key and returns its value, or the default if it is missing or expired."""
+
+        entry = self._remove(key)
+        if entry is None or self._is_expired(entry[0]):
+            return default
+
+        return entry[1]
+
+
+    def prune(self) -> None:
+        """Removes every expired entry."""
+
+        expired_keys = [key for key, (expires_at, _) in self._entries.items() if self._is_expired(expires_at)]
+        for key in expired_keys:
+            self._remove(key)
+
+
+    def items(self) -> Iterator[Tuple[K, V]]:
+        """Iterates over the live entries from least to most recently used without changing their order."""
+
+        for key, (expires_at, value) in list(self._entries.items()):
+            if not self._is_expired(expires_at):
+                yield key, value
+
+
+    def __contains__(self, key: K) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not self._is_expired(entry[0])
+
+
+    def __len__(self) -> int:
+        self.prune()
+        return len(self._entries)
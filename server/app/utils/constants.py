@@ -4,9 +4,101 @@ from dotenv import load_dotenv
 from app.db.enums import AvailableDialect, AvailableLanguage
 
 
-# Env Variables
 load_dotenv()
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    """Reads a true/false env variable. Anything unrecognised keeps the default, so a typo can't silently turn a feature off."""
+
+    value = (os.getenv(name) or "").strip().lower()
+    if not value:
+        return default
+    if value in ("true", "1", "yes", "on"):
+        return True
+    if value in ("false", "0", "no", "off"):
+        return False
+
+    print(f"[WARNING] Unrecognised value {os.getenv(name)!r} for {name}, using the default {str(default).lower()}. Use true or false.")
+    return default
+
+
+# Env Variables
 VOICE_ID = os.getenv("ELEVEN_LABS_VOICE_ID")
+TTS_OUTPUT_FORMAT = os.getenv("TTS_OUTPUT_FORMAT") or "mp3_22050_32" # Small enough for mobile data, clear enough for speech
+PRIMARY_MODEL = os.getenv("PRIMARY_MODEL") or "gpt-5.2-chat-latest"
+FAST_MODEL = os.getenv("FAST_MODEL") or "gpt-4.1-mini" # Small vision capable model for light tasks like photo QA
+
+
+# LLM Gateway
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY") or 32) # Max LLM calls in flight across the whole server
+LLM_ROUTE_MAX_CONCURRENCY = int(os.getenv("LLM_ROUTE_MAX_CONCURRENCY") or 16) # Max LLM calls in flight per route (writing, speaking, ...)
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS") or 20.0) # How long a call may wait for a free slot before we shed it
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS") or 60.0) # Default timeout for a single LLM call
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES") or 3)
+LLM_RETRY_BASE_SECONDS = 0.5 # Backoff before the first retry, doubled on every attempt and fully jittered
+LLM_RETRY_MAX_SECONDS = 8.0 # Cap on a single backoff
+LLM_MAX_RETRY_AFTER_SECONDS = 20.0 # If the provider asks us to wait longer than this we fail fast instead
+LLM_RETRY_BUDGET_RATIO = 0.2 # Retries may add at most 20% on top of the calls made in the budget window
+LLM_RETRY_BUDGET_MIN_RETRIES = 5 # Retries always allowed per window, so a quiet server can still retry
+LLM_RETRY_BUDGET_WINDOW_SECONDS = 10.0
+LLM_CIRCUIT_FAILURE_THRESHOLD = 5 # Consecutive failures that open a route's circuit
+LLM_CIRCUIT_RESET_SECONDS = 30.0 # How long an open circuit rejects calls before letting a trial call through
+
+
+# Image Processing
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION") or 1024) # Longest side of the handwriting photos we send to the vision models
+IMAGE_LOW_DETAIL_MAX_DIMENSION = 512 # Images this small are sent with detail "low", which costs a fixed, small number of tokens
+IMAGE_JPEG_QUALITY = 80
+IMAGE_INK_CONTRAST = 40 # How many gray levels darker than the paper a pixel must be to count as ink
+IMAGE_MIN_INK_FRACTION = 0.001 # With less ink than this we don't crop, and leave QA to judge the photo
+IMAGE_INK_OUTLIER_FRACTION = 0.005 # Share of ink pixels on each side ignored when cropping, so specks don't widen the box
+IMAGE_CROP_PADDING = 0.1 # Padding around the ink as a fraction of the ink box's longest side
+IMAGE_HASH_SIZE = 16 # Perceptual hashes are IMAGE_HASH_SIZE² bits
+
+
+# Shape Matching
+SHAPE_MATCH_ENABLED = _env_flag("SHAPE_MATCH_ENABLED", True)
+SHAPE_MATCH_REJECT_SCORE = float(os.getenv("SHAPE_MATCH_REJECT_SCORE") or 0.0) # Clean photos scoring below this are failed without the LLM. 0 turns this off; set it from scripts/evaluate_shape_matching.py results.
+SHAPE_CANVAS_SIZE = 64 # Side of the square canvas both shapes are normalized onto
+SHAPE_CHAMFER_SCALE = 0.15 # Chamfer distance (fraction of the canvas) at which the chamfer similarity reaches 0
+SHAPE_HU_SCALE = 4.0 # Hu moment distance at which the Hu similarity falls to 1/e
+SHAPE_CHAMFER_WEIGHT = 0.7 # Share of the score from the chamfer similarity, the rest comes from the Hu moments
+
+REFERENCE_IMAGE_CACHE_SIZE = 1000 # Max number of prepared letter reference images held in memory
+REFERENCE_IMAGE_TTL_SECONDS = 24 * 60 * 60 # References rarely change, so we only refetch them once a day
+
+
+# Writing Evaluation
+WRITING_CASCADE_ENABLED = _env_flag("WRITING_CASCADE_ENABLED", False) # Grade with the fast model first and escalate unclear cases
+WRITING_CASCADE_MARGIN = float(os.getenv("WRITING_CASCADE_MARGIN") or 5.0) # Scores this close to a pass threshold are escalated to the primary model
+# Endpoints that start the evaluation while photo QA is still running, and throw it away if QA rejects the photo
+WRITING_ENDPOINTS = ("letter_writing", "letter_joining", "dictation")
+WRITING_SPECULATIVE_ENDPOINTS = {
+    endpoint.strip()
+    for endpoint in (os.getenv("WRITING_SPECULATIVE_ENDPOINTS") or ",".join(WRITING_ENDPOINTS)).split(",")
+    if endpoint.strip()
+}
+if WRITING_SPECULATIVE_ENDPOINTS - set(WRITING_ENDPOINTS):
+    print(f"[WARNING] Ignoring unknown WRITING_SPECULATIVE_ENDPOINTS {', '.join(sorted(WRITING_SPECULATIVE_ENDPOINTS - set(WRITING_ENDPOINTS)))}. Known endpoints: {', '.join(WRITING_ENDPOINTS)}")
+    WRITING_SPECULATIVE_ENDPOINTS &= set(WRITING_ENDPOINTS)
+
+WRITING_DEDUP_TTL_SECONDS = 10 * 60 # How long a graded image can be matched by a resubmission
+WRITING_DEDUP_CACHE_SIZE = 2000 # Max number of (user, problem) scopes we remember graded images for
+WRITING_DEDUP_IMAGES_PER_SCOPE = 5 # Max graded images remembered per scope, most recent first
+WRITING_DEDUP_MAX_HAMMING_DISTANCE = 10 # Max differing hash bits (out of 256) for two photos to count as the same
+WRITING_DEDUP_MAX_ASPECT_DIFFERENCE = 0.05 # Max relative difference in the writing crop's aspect ratio
+WRITING_BATCH_MAX_ITEMS = int(os.getenv("WRITING_BATCH_MAX_ITEMS") or 20) # Max images in one batch grading request
+WRITING_BATCH_CONCURRENCY = int(os.getenv("WRITING_BATCH_CONCURRENCY") or 4) # Max items of one batch being graded at the same time
+
+
+# Pronounciation evaluation
+PRONOUNCIATION_PASS_OVERALL_SCORE = 88.0 # A pronounciation passes if its overall score,
+PRONOUNCIATION_PASS_ACCURACY_SCORE = 85.0 # accuracy
+PRONOUNCIATION_PASS_COMPLETENESS_SCORE = 95.0 # and completeness are all at least these
+PRONOUNCIATION_TEMPLATED_FEEDBACK_ENABLED = _env_flag("PRONOUNCIATION_TEMPLATED_FEEDBACK_ENABLED", True) # Write the feedback on clear passes and fails without the LLM
+PRONOUNCIATION_TEMPLATE_MARGIN = float(os.getenv("PRONOUNCIATION_TEMPLATE_MARGIN") or 5.0) # Scores closer than this to a pass threshold get their feedback written by the LLM
+PRONOUNCIATION_WEAK_PHONEME_SCORE = 70.0 # Phonemes Azure scores below this are pointed out in templated feedback
+PRONOUNCIATION_TEMPLATE_MAX_ISSUES = 2 # Max problems named in templated feedback, so it stays short like the LLM's
 
 
 #API URLs
@@ -14,6 +106,101 @@ PRONOUNCIATION_BASE_URL = "https://eastus.stt.speech.microsoft.com/speech/recogn
 TTS_BASE_URL = f"https://api.elevenlabs.io/v1/text-to-speech/{VOICE_ID}"
 
 
+# ElevenLabs output formats we support and the MIME type of the audio they return.
+# PCM is returned raw by ElevenLabs, so we wrap it in a WAV header before sending it to the browser.
+TTS_OUTPUT_FORMATS: Dict[str, str] = {
+    "mp3_22050_32": "audio/mpeg",
+    "mp3_44100_32": "audio/mpeg",
+    "mp3_44100_64": "audio/mpeg",
+    "mp3_44100_96": "audio/mpeg",
+    "mp3_44100_128": "audio/mpeg",
+    "mp3_44100_192": "audio/mpeg",
+    "opus_48000_32": "audio/ogg",
+    "opus_48000_64": "audio/ogg",
+    "opus_48000_96": "audio/ogg",
+    "opus_48000_128": "audio/ogg",
+    "pcm_16000": "audio/wav",
+    "pcm_22050": "audio/wav",
+    "pcm_24000": "audio/wav",
+    "pcm_44100": "audio/wav",
+}
+
+# A typo in the env value would otherwise fail every TTS call
+if TTS_OUTPUT_FORMAT not in TTS_OUTPUT_FORMATS:
+    print(f"[WARNING] Unsupported TTS_OUTPUT_FORMAT {TTS_OUTPUT_FORMAT!r}, using mp3_22050_32. Supported formats: {', '.join(TTS_OUTPUT_FORMATS)}")
+    TTS_OUTPUT_FORMAT = "mp3_22050_32"
+
+# The format used when a client asks for a MIME type without naming a bitrate or sample rate
+TTS_DEFAULT_FORMAT_FOR_MIME_TYPE: Dict[str, str] = {
+    "audio/mpeg": "mp3_22050_32",
+    "audio/mp3": "mp3_22050_32",
+    "audio/ogg": "opus_48000_32",
+    "audio/opus": "opus_48000_32",
+    "audio/wav": "pcm_16000",
+    "audio/pcm": "pcm_16000",
+}
+
+
+# Voice tutor evaluation
+SPEAKING_PRONOUNCIATION_PASS_SCORE = 70.0 # A response passes if its overall pronounciation score is above this
+SPEAKING_GRAMMAR_PASS_SCORE = 70.0 # and its grammatical score is above this, and the answer makes sense
+SPEAKING_SINGLE_CALL_ENABLED = _env_flag("SPEAKING_SINGLE_CALL_ENABLED", True) # Evaluate the answer and write the feedback in one LLM call
+SPEAKING_CHECKPOINT_MAX_RUNS = 500 # Max voice tutor runs whose checkpoints are kept so a failed run can be resumed
+SPEAKING_CHECKPOINT_TTL_SECONDS = 600 # How long after its last step a run can still be resumed
+SPEAKING_CHECKPOINT_MAX_BYTES = 16 * 1024 * 1024 # Max memory for checkpoints, which hold no audio, so a run takes a few KB
+SPEAKING_NODE_CACHE_SIZE = 200 # Max cached node results
+SPEAKING_NODE_CACHE_MAX_BYTES = 8 * 1024 * 1024
+SPEAKING_NODE_CACHE_TTL_SECONDS = 600
+VOCAB_MATCH_MIN_SIMILARITY = 0.8 # Edit similarity (0-1) at which a misheard or misspelled word still counts as the vocab word
+VOCAB_MATCH_MIN_FUZZY_LENGTH = 5 # Shorter words must match exactly, since one changed letter often makes a different word (pero/perro)
+VOCAB_MATCH_CACHE_SIZE = 10000
+
+
+# Pipelined feedback audio
+TTS_PIPELINE_CONCURRENCY = 3 # Max sentences being synthesized at the same time for one response
+TTS_PIPELINE_MIN_CHARS = 40 # Short sentences are merged with the next one so we don't make lots of tiny TTS calls
+TTS_PIPELINE_FORMAT_PREFIXES = ("mp3", "pcm") # Formats whose segments can be joined by concatenating the bytes
+
+
+# Deferred feedback audio
+FEEDBACK_AUDIO_TTL_SECONDS = 600 # How long synthesized feedback audio can be fetched for
+FEEDBACK_AUDIO_CACHE_SIZE = 500 # Max number of pending or finished feedback audio clips we hold in memory
+FEEDBACK_AUDIO_CACHE_MAX_BYTES = 64 * 1024 * 1024 # Max memory for finished clips (base64), least recently fetched dropped first
+FEEDBACK_AUDIO_WAIT_SECONDS = 30.0 # How long a fetch waits for synthesis that is still running
+
+
+# Evaluation sessions
+REDIS_URL = os.getenv("REDIS_URL") # Shares evaluations across server instances. Without it they are kept in memory.
+EVALUATION_TTL_SECONDS = int(os.getenv("EVALUATION_TTL_SECONDS") or 3600) # How long follow up questions can be asked about a graded attempt
+EVALUATION_CACHE_SIZE = 10000 # Max number of evaluations held in memory
+
+
+# Conversation memory for explain prompts
+CONVERSATION_VERBATIM_ENTRIES = 4 # Latest questions and answers sent word for word. Older ones are summarized.
+CONVERSATION_MAX_UNSUMMARIZED_ENTRIES = 8 # Older entries still sent word for word while their summary is written. Past this the oldest are dropped.
+CONVERSATION_SUMMARY_CACHE_SIZE = 5000
+CONVERSATION_SUMMARY_TTL_SECONDS = 3600
+
+
+# Explain response cache
+EXPLAIN_CACHE_ENABLED = _env_flag("EXPLAIN_CACHE_ENABLED", True)
+EXPLAIN_CACHE_MIN_SIMILARITY = float(os.getenv("EXPLAIN_CACHE_MIN_SIMILARITY") or 0.85) # Trigram similarity for reusing the answer to a reworded question. 1.0 only reuses exact matches.
+EXPLAIN_CACHE_SIZE = 2000 # Max number of evaluation contexts with cached answers
+EXPLAIN_CACHE_QUERIES_PER_CONTEXT = 50 # Max cached questions per context, least recently used dropped first
+EXPLAIN_CACHE_TTL_SECONDS = 86400
+
+
+# Audio Processing
+AZURE_SAMPLE_RATE = 16000 # Azure expects 16 kHz mono PCM WAV
+VAD_FRAME_MS = 30 # Length of each analysis frame
+VAD_PADDING_MS = 200 # Audio kept on either side of the detected speech so word onsets/endings aren't clipped
+VAD_MIN_SPEECH_MS = 150 # Recordings with less detected speech than this are rejected as empty
+VAD_MIN_ENERGY_DBFS = -55.0 # Frames quieter than this are never treated as speech
+VAD_NOISE_MARGIN_DB = 10.0 # How far above the noise floor a frame must be to count as speech. Recordings peaking less than this above it are rejected.
+VAD_FRICATIVE_ZCR = 0.25 # Zero crossing rate above which quieter frames still count as (unvoiced) speech
+VAD_FRICATIVE_MARGIN_DB = 6.0 # How far below the speech threshold a high ZCR frame may be
+
+
 # Resource Maps    
 AZURE_LANGUAGE_CODE: Dict[AvailableLanguage, Dict[AvailableDialect, str] | str] = {
     AvailableLanguage.ARABIC: {
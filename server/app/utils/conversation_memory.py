@@ -0,0 +1,105 @@
+import json
+import asyncio
+import hashlib
+from typing import Dict, List
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+from app.utils.llm_gateway import llm_gateway
+from app.utils.prompts.general.summarize_conversation import build_summarize_conversation_messages
+from app.utils.constants import (
+    CONVERSATION_VERBATIM_ENTRIES,
+    CONVERSATION_MAX_UNSUMMARIZED_ENTRIES,
+    CONVERSATION_SUMMARY_CACHE_SIZE,
+    CONVERSATION_SUMMARY_TTL_SECONDS,
+)
+
+
+# Hash of a conversation's first entries -> summary of every entry after the original feedback.
+# Keyed by content rather than by evaluation, so clients that resend previous_feedback share the summaries too.
+summaries: TTLCache[str, str] = TTLCache(CONVERSATION_SUMMARY_CACHE_SIZE, CONVERSATION_SUMMARY_TTL_SECONDS)
+
+# Summaries being written, so each is only requested once
+pending_summaries: Dict[str, asyncio.Task] = {}
+
+
+def _prefix_hashes(entries: List[str]) -> List[str]:
+    """Returns a hash for every prefix of the conversation: hashes[k] covers entries[:k]."""
+
+    hashes = [hashlib.sha256().hexdigest()]
+
+    for entry in entries:
+        hashes.append(hashlib.sha256(f"{hashes[-1]}\n{entry}".encode("utf-8")).hexdigest())
+
+    return hashes
+
+
+async def _summarize(key: str, original_feedback: str, previous_summary: str | None, new_entries: List[str]) -> None:
+    """Folds new entries into the previous summary and caches the result under the key."""
+
+    try:
+        response = await llm_gateway.chat(
+            task="summarize",
+            messages=build_summarize_conversation_messages(original_feedback, previous_summary, str(new_entries)),
+            response_format={"type": "json_object"}
+        )
+        summary = json.loads(response.choices[0].message.content)["summary"]
+
+        summaries.set(key, summary)
+        metrics.increment("conversation_memory.summaries")
+    except Exception as e:
+        # The next question tries again, and until then the entries are still sent word for word
+        metrics.increment("conversation_memory.summary_errors")
+        print(f"[WARNING] Summarizing conversation failed: {type(e).__name__}: {str(e)}")
+    finally:
+        pending_summaries.pop(key, None)
+
+
+def _start_summary(key: str, original_feedback: str, previous_summary: str | None, new_entries: List[str]) -> None:
+    if key in pending_summaries or key in summaries:
+        return
+
+    pending_summaries[key] = asyncio.create_task(_summarize(key, original_feedback, previous_summary, new_entries))
+
+
+def render_previous_feedback(previous_feedback: List[str]) -> str:
+    """
+    Renders the conversation for an explain prompt with a bounded size. The original feedback and the latest entries
+    are kept word for word, and everything in between is replaced by a summary that is updated in the background.
+    Until the summary catches up, the entries it doesn't cover yet are sent word for word, up to a limit.
+
+    Questions and answers alternate after the original feedback, so every cut is made at an odd index to keep
+    answers at even indices and questions at odd ones.
+    """
+
+    if len(previous_feedback) <= 1 + CONVERSATION_VERBATIM_ENTRIES:
+        return str(previous_feedback)
+
+    # Entries from recent_start on are always sent word for word
+    recent_start = len(previous_feedback) - CONVERSATION_VERBATIM_ENTRIES
+    recent_start += 1 - recent_start % 2
+
+    hashes = _prefix_hashes(previous_feedback[:recent_start])
+
+    # Find the summary covering the most entries. summarized_end == 1 means there's nothing summarized yet.
+    summarized_end, summary = 1, None
+    for end in range(recent_start, 1, -2):
+        summary = summaries.get(hashes[end])
+        if summary is not None:
+            summarized_end = end
+            break
+
+    # Bring the summary up to date in the background, for this question's follow ups
+    if summarized_end < recent_start:
+        _start_summary(hashes[recent_start], previous_feedback[0], summary, previous_feedback[summarized_end:recent_start])
+
+    verbatim_start = max(summarized_end, recent_start - CONVERSATION_MAX_UNSUMMARIZED_ENTRIES)
+    verbatim_start += 1 - verbatim_start % 2
+
+    if verbatim_start > summarized_end:
+        metrics.increment("conversation_memory.dropped_entries", verbatim_start - summarized_end)
+
+    opening = previous_feedback[0]
+    if summary:
+        opening += f"\n\n(Summary of the earlier questions and answers: {summary})"
+
+    return str([opening] + previous_feedback[verbatim_start:])
@@ -0,0 +1,146 @@
+import io
+import os
+import wave
+import base64
+import httpx
+from fastapi import HTTPException, status
+from app.utils.constants import TTS_BASE_URL, TTS_OUTPUT_FORMAT, TTS_OUTPUT_FORMATS, TTS_DEFAULT_FORMAT_FOR_MIME_TYPE
+
+
+def _bitrate_matches(output_format: str, bitrate: str | None) -> bool:
+    """Checks if an ElevenLabs format (e.g. mp3_44100_128) has the requested kbps bitrate."""
+    return bitrate is None or output_format.rsplit("_", 1)[-1] == bitrate
+
+
+def negotiate_output_format(audio_accept: str | None) -> str:
+    """
+    Picks the ElevenLabs output format for an Accept-style audio preference string.
+
+    Entries are comma separated and may be ElevenLabs format names ("opus_48000_64") or MIME types with
+    an optional bitrate ("audio/mpeg;bitrate=128"). q values are respected. If nothing is requested we use
+    the server default, which is tuned for mobile.
+    """
+
+    if not audio_accept or not audio_accept.strip():
+        return TTS_OUTPUT_FORMAT
+
+    # 1. Parse the entries and their q values
+    preferences = []
+
+    for position, entry in enumerate(audio_accept.split(",")):
+        parts = [part.strip() for part in entry.split(";") if part.strip()]
+        if not parts:
+            continue
+
+        params = {}
+        for param in parts[1:]:
+            key, _, value = param.partition("=")
+            params[key.strip().lower()] = value.strip()
+
+        try:
+            quality = float(params.get("q", 1.0))
+        except ValueError:
+            quality = 0.0
+
+        if quality > 0:
+            preferences.append((-quality, position, parts[0].lower(), params.get("bitrate")))
+
+    # 2. Return the first supported format in preference order
+    for _, _, media_range, bitrate in sorted(preferences):
+        if media_range in TTS_OUTPUT_FORMATS:
+            return media_range
+
+        if media_range in ("*/*", "audio/*"):
+            return TTS_OUTPUT_FORMAT
+
+        default_format = TTS_DEFAULT_FORMAT_FOR_MIME_TYPE.get(media_range)
+        if default_format is None:
+            continue
+
+        if bitrate is None:
+            return default_format
+
+        mime_type = TTS_OUTPUT_FORMATS[default_format]
+        for output_format, format_mime_type in TTS_OUTPUT_FORMATS.items():
+            if format_mime_type == mime_type and _bitrate_matches(output_format, bitrate):
+                return output_format
+
+    raise HTTPException(
+        status_code=status.HTTP_406_NOT_ACCEPTABLE,
+        detail=f"None of the requested audio formats are supported: {audio_accept}. Supported formats: {', '.join(TTS_OUTPUT_FORMATS)}"
+    )
+
+
+def _pcm_to_wav(pcm_bytes: bytes, sample_rate: int) -> bytes:
+    """Wraps raw 16 bit mono PCM in a WAV header so browsers can play it."""
+
+    wav_buffer = io.BytesIO()
+
+    with wave.open(wav_buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm_bytes)
+
+    return wav_buffer.getvalue()
+
+
+def to_audio_data_url(audio_bytes: bytes, output_format: str) -> str:
+    """Converts ElevenLabs audio bytes into a data URL the browser can play."""
+
+    if output_format.startswith("pcm"):
+        audio_bytes = _pcm_to_wav(audio_bytes, int(output_format.split("_")[1]))
+
+    audio_base64 = base64.b64encode(audio_bytes).decode()
+
+    return f"data:{TTS_OUTPUT_FORMATS[output_format]};base64,{audio_base64}"
+
+
+async def synthesize_speech_bytes(text: str, output_format: str = TTS_OUTPUT_FORMAT, previous_text: str | None = None) -> bytes:
+    """
+    Performs TTS on the text with ElevenLabs and returns the raw audio bytes in the given output format.
+    previous_text is the text spoken just before this one, which keeps the intonation natural when a longer
+    text is synthesized in pieces.
+    """
+
+    headers = {
+        "Accept": TTS_OUTPUT_FORMATS[output_format],
+        "Content-Type": "application/json",
+        "xi-api-key": os.getenv("ELEVEN_LABS_KEY")
+    }
+
+    payload = {
+        "text": text,
+        "model_id": "eleven_multilingual_v2",
+        "voice_settings": {
+            "stability": 0.5, # How emotive the voice is
+            "use_speaker_boost": True, # Boosts similarity of the voice of the response to the selected voice
+            "similarity_boost": 0.75, # Determines how closely response follows specified voice
+            "style": 0.3, # How exaggerated the response voice is
+            "speed": 0.8 # Controls the speed of the voice
+        }
+    }
+
+    if previous_text:
+        payload["previous_text"] = previous_text
+
+    async with httpx.AsyncClient() as client:
+        response = await client.post(
+            TTS_BASE_URL,
+            params={"output_format": output_format},
+            headers=headers,
+            json=payload,
+            timeout=30.0
+        )
+
+        response.raise_for_status()
+
+    return response.content
+
+
+async def synthesize_speech(text: str, output_format: str = TTS_OUTPUT_FORMAT) -> str:
+    """Performs TTS on the text with ElevenLabs and returns a web playable data URL."""
+
+    audio_bytes = await synthesize_speech_bytes(text, output_format)
+
+    return to_audio_data_url(audio_bytes, output_format)
@@ -0,0 +1,190 @@
+import json
+import uuid
+import threading
+from typing import List, Type, TypeVar
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+from app.models.ai.evaluation import EvaluationExplainInput
+from app.utils.constants import REDIS_URL, EVALUATION_TTL_SECONDS, EVALUATION_CACHE_SIZE
+
+try:
+    # Redis is optional. Without it evaluations only live in this server's memory.
+    from redis.asyncio import Redis
+except ImportError:
+    Redis = None
+
+
+C = TypeVar("C", bound=BaseModel)
+I = TypeVar("I", bound=BaseModel)
+
+
+class EvaluationStore:
+    """
+    Keeps graded attempts on the server under an evaluation id, so follow up questions only send the id and their
+    query instead of the whole evaluation. Entries are kept in memory, or in Redis when REDIS_URL is set.
+
+    Each evaluation records the user it belongs to, and only that user can load it. Questions and answers are
+    appended to a separate list, so two questions asked at once can't overwrite each other's answers.
+    """
+
+    def __init__(self, redis_url: str | None = REDIS_URL):
+        self._local: TTLCache[str, str] = TTLCache(EVALUATION_CACHE_SIZE, EVALUATION_TTL_SECONDS)
+        self._local_answers: TTLCache[str, List[str]] = TTLCache(EVALUATION_CACHE_SIZE, EVALUATION_TTL_SECONDS)
+        self._local_lock = threading.Lock()
+        self._redis = Redis.from_url(redis_url) if redis_url and Redis else None
+
+        if redis_url and Redis is None:
+            print("[WARNING] REDIS_URL is set but the redis package is not installed. Evaluations are kept in memory.")
+
+
+    def _key(self, evaluation_id: str) -> str:
+        return f"evaluation:{evaluation_id}"
+
+
+    def _answers_key(self, evaluation_id: str) -> str:
+        return f"evaluation:{evaluation_id}:answers"
+
+
+    async def _write(self, evaluation_id: str, value: str) -> None:
+        if self._redis:
+            try:
+                await self._redis.set(self._key(evaluation_id), value, ex=EVALUATION_TTL_SECONDS)
+                return
+            except Exception as e:
+                # Follow up questions still work on this server if Redis is down
+                metrics.increment("evaluations.redis_errors")
+                print(f"[WARNING] Saving evaluation to Redis failed, keeping it in memory: {e}")
+
+        self._local.set(evaluation_id, value)
+
+
+    async def _read(self, evaluation_id: str) -> str | None:
+        if self._redis:
+            try:
+                value = await self._redis.get(self._key(evaluation_id))
+                if value is not None:
+                    return value.decode("utf-8") if isinstance(value, bytes) else value
+            except Exception as e:
+                metrics.increment("evaluations.redis_errors")
+                print(f"[WARNING] Loading evaluation from Redis failed, checking memory: {e}")
+
+        return self._local.get(evaluation_id)
+
+
+    async def _read_answers(self, evaluation_id: str) -> List[str]:
+        if self._redis:
+            try:
+                answers = await self._redis.lrange(self._answers_key(evaluation_id), 0, -1)
+                if answers:
+                    return [answer.decode("utf-8") if isinstance(answer, bytes) else answer for answer in answers]
+            except Exception as e:
+                metrics.increment("evaluations.redis_errors")
+                print(f"[WARNING] Loading evaluation answers from Redis failed, checking memory: {e}")
+
+        return self._local_answers.get(evaluation_id) or []
+
+
+    async def save(self, context: BaseModel, owner: str | None = None) -> str:
+        """Stores the context of a graded attempt for the user it belongs to and returns the new evaluation id."""
+
+        evaluation_id = uuid.uuid4().hex
+        await self._write(evaluation_id, json.dumps({
+            "kind": type(context).__name__,
+            "owner": owner,
+            "context": context.model_dump(mode="json")
+        }, ensure_ascii=False))
+        metrics.increment("evaluations.saved")
+
+        return evaluation_id
+
+
+    async def append(self, evaluation_id: str, entries: List[str]) -> None:
+        """Atomically adds entries to the evaluation's previous feedback, restarting its time to live."""
+
+        if self._redis:
+            try:
+                # RPUSH appends in one step, so concurrent appends all land. The transaction keeps the TTLs in step.
+                async with self._redis.pipeline(transaction=True) as pipeline:
+                    pipeline.rpush(self._answers_key(evaluation_id), *entries)
+                    pipeline.expire(self._answers_key(evaluation_id), EVALUATION_TTL_SECONDS)
+                    pipeline.expire(self._key(evaluation_id), EVALUATION_TTL_SECONDS)
+                    await pipeline.execute()
+                return
+            except Exception as e:
+                metrics.increment("evaluations.redis_errors")
+                print(f"[WARNING] Saving evaluation answers to Redis failed, keeping them in memory: {e}")
+
+        with self._local_lock:
+            self._local_answers.set(evaluation_id, [*(self._local_answers.get(evaluation_id) or []), *entries])
+
+            value = self._local.get(evaluation_id)
+            if value is not None:
+                self._local.set(evaluation_id, value)
+
+
+    async def load(self, evaluation_id: str, context_type: Type[C], owner: str | None = None) -> C:
+        """
+        Returns the stored context with every answer appended since. Raises a 404 if it is missing, expired, belongs
+        to a different kind of problem, or belongs to another user.
+        """
+
+        value = await self._read(evaluation_id)
+
+        try:
+            stored = json.loads(value) if value is not None else None
+        except ValueError:
+            stored = None
+
+        # Another user's evaluation looks the same as a missing one
+        if not isinstance(stored, dict) or stored.get("kind") != context_type.__name__ or stored.get("owner") != owner:
+            metrics.increment("evaluations.misses")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Evaluation {evaluation_id} not found or expired. Please submit your attempt again."
+            )
+
+        try:
+            context = context_type.model_validate(stored["context"])
+            context.previous_feedback = [*context.previous_feedback, *await self._read_answers(evaluation_id)]
+        except (KeyError, ValidationError):
+            metrics.increment("evaluations.misses")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Evaluation {evaluation_id} can no longer be read. Please submit your attempt again."
+            )
+
+        metrics.increment("evaluations.hits")
+        return context
+
+
+evaluation_store = EvaluationStore()
+
+
+async def resolve_explain_input(
+    input: I | EvaluationExplainInput,
+    context_type: Type[C],
+    input_type: Type[I],
+    user_email: str | None = None
+) -> tuple[I, str | None]:
+    """
+    Turns an explain request into the full explain input. Requests that only send an evaluation id and a query are
+    filled in from the user's stored evaluation. Returns the input and the evaluation id, if there is one.
+    """
+
+    if not isinstance(input, EvaluationExplainInput):
+        return input, None
+
+    context = await evaluation_store.load(input.evaluation_id, context_type, user_email)
+
+    return input_type(query=input.query, **context.model_dump()), input.evaluation_id
+
+
+async def record_answer(evaluation_id: str | None, query: str, answer: str) -> None:
+    """Adds the question and its answer to the stored evaluation's previous feedback, so later questions see them."""
+
+    if evaluation_id is None:
+        return
+
+    await evaluation_store.append(evaluation_id, [query, answer])
@@ -0,0 +1,132 @@
+import re
+import json
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from typing import FrozenSet, Set, Tuple
+from pydantic import BaseModel
+from app.utils.cache import TTLCache
+from app.utils.metrics import metrics
+from app.utils.text_normalization import ARABIC_DIACRITICS
+from app.utils.constants import (
+    EXPLAIN_CACHE_ENABLED,
+    EXPLAIN_CACHE_MIN_SIMILARITY,
+    EXPLAIN_CACHE_SIZE,
+    EXPLAIN_CACHE_QUERIES_PER_CONTEXT,
+    EXPLAIN_CACHE_TTL_SECONDS,
+)
+
+
+# Tasks whose answers may be cached. The key covers every field of the evaluation the prompt sees (scores,
+# reflection and feedback included), since the answer can quote any of them, so only an identical evaluation is
+# answered from the cache. Voice tutor answers are never cached: they quote the learner's own transcription and
+# grammar, and the cache is shared by every learner.
+CACHED_TASKS: Set[str] = {"explain_writing", "explain_joining", "explain_dictation", "explain_pronounciation"}
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Folds case, width, Arabic diacritics, punctuation and spacing, so trivially different questions match."""
+
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = ARABIC_DIACRITICS.sub("", query)
+    query = _PUNCTUATION.sub(" ", query)
+
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(first: FrozenSet[str], second: FrozenSet[str]) -> float:
+    """Jaccard similarity of two trigram sets."""
+
+    if not first or not second:
+        return 0.0
+
+    return len(first & second) / len(first | second)
+
+
+class ExplainCache:
+    """
+    Reuses answers to explain questions that were already asked about the same evaluation, e.g. "why did I fail?" asked
+    again after a resubmission was matched to the graded image. Exact matches on the normalized question are checked first, then
+    reworded questions by trigram similarity within the same context.
+
+    Only the first question about an attempt is cached. Later questions can lean on the earlier conversation
+    ("what do you mean?"), so their answers can't be shared.
+    """
+
+    def __init__(self):
+        # Context hash -> normalized question -> (its trigrams, the answer), least recently used first
+        self._contexts: TTLCache[str, "OrderedDict[str, Tuple[FrozenSet[str], str]]"] = TTLCache(EXPLAIN_CACHE_SIZE, EXPLAIN_CACHE_TTL_SECONDS)
+
+
+    def key(self, task: str, input: BaseModel) -> str | None:
+        """Returns the cache key of the explain input's context, or None if its answer shouldn't be cached."""
+
+        if not EXPLAIN_CACHE_ENABLED or task not in CACHED_TASKS or len(getattr(input, "previous_feedback", [])) > 1:
+            return None
+
+        context = input.model_dump(mode="json", exclude={"query"})
+        context["mistake_tags"] = sorted(context.get("mistake_tags", []))
+
+        return hashlib.sha256(f"{task}:{json.dumps(context, sort_keys=True, ensure_ascii=False)}".encode("utf-8")).hexdigest()
+
+
+    def get(self, key: str | None, query: str) -> str | None:
+        """Returns a cached answer to the question, or None."""
+
+        if key is None:
+            return None
+
+        answers = self._contexts.get(key)
+        normalized = normalize_query(query)
+
+        if answers is not None:
+            if normalized in answers:
+                answers.move_to_end(normalized)
+                metrics.increment("explain_cache.exact_hits")
+                return answers[normalized][1]
+
+            if EXPLAIN_CACHE_MIN_SIMILARITY < 1.0:
+                query_trigrams = trigrams(normalized)
+                best_score, best_query = max(
+                    ((similarity(query_trigrams, cached_trigrams), cached_query) for cached_query, (cached_trigrams, _) in answers.items()),
+                    default=(0.0, None)
+                )
+
+                if best_query is not None and best_score >= EXPLAIN_CACHE_MIN_SIMILARITY:
+                    answers.move_to_end(best_query)
+                    metrics.increment("explain_cache.similar_hits")
+                    return answers[best_query][1]
+
+        metrics.increment("explain_cache.misses")
+        return None
+
+
+    def set(self, key: str | None, query: str, answer: str) -> None:
+        """Caches the answer to the question."""
+
+        if key is None:
+            return
+
+        answers = self._contexts.get(key)
+        if answers is None:
+            answers = OrderedDict()
+
+        normalized = normalize_query(query)
+        answers[normalized] = (trigrams(normalized), answer)
+        answers.move_to_end(normalized)
+
+        while len(answers) > EXPLAIN_CACHE_QUERIES_PER_CONTEXT:
+            answers.popitem(last=False)
+
+        self._contexts.set(key, answers)
+
+
+explain_cache = ExplainCache()
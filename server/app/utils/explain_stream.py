@@ -0,0 +1,80 @@
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from app.utils.llm_gateway import llm_gateway
+from app.utils.metrics import metrics
+from app.utils.explain_cache import explain_cache
+from app.utils.json_stream import JsonStringFieldExtractor
+from app.utils.sse import format_sse, format_sse_error
+
+
+async def stream_explain_answer(
+    task: str,
+    messages: List[Dict[str, Any]],
+    field: str,
+    build_output: Callable[[str], BaseModel],
+    on_answer: Callable[[str], Awaitable[None]] | None = None,
+    cache_key: str | None = None,
+    query: str | None = None,
+    response_format: Dict[str, Any] | None = None
+) -> AsyncIterator[str]:
+    """
+    Streams the answer to an explain question as Server-Sent Events. The answer is the string field of the JSON the
+    LLM writes, so token events carry each newly decoded piece of it as it arrives. A final done event carries the
+    same output the non streaming endpoint returns. on_answer is called with the full answer before done is sent.
+
+    The response format defaults to a JSON object. With a cache key, a cached answer to the query is sent as a single token event without calling the LLM, and new
+    answers are cached.
+    """
+
+    extractor = JsonStringFieldExtractor(field)
+    content = ""
+    streamed_answer = ""
+    started_at = time.monotonic()
+
+    try:
+        cached_answer = explain_cache.get(cache_key, query) if query else None
+
+        if cached_answer is not None:
+            if on_answer:
+                await on_answer(cached_answer)
+
+            yield format_sse("token", {"text": cached_answer})
+            yield format_sse("done", build_output(cached_answer))
+            return
+
+        async for chunk in llm_gateway.stream_chat(task=task, messages=messages, response_format=response_format or {"type": "json_object"}):
+            content += chunk
+            text = extractor.feed(chunk)
+
+            if text:
+                if not streamed_answer:
+                    metrics.observe(f"explain.{task}.first_token_seconds", time.monotonic() - started_at)
+
+                streamed_answer += text
+                yield format_sse("token", {"text": text})
+
+        # The full JSON is the source of truth, but if it's malformed after the field we already have the answer
+        try:
+            answer = json.loads(content).get(field)
+        except json.JSONDecodeError:
+            answer = streamed_answer if extractor.done else None
+
+        if not answer:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"The {task} response did not contain an answer."
+            )
+
+        if query:
+            explain_cache.set(cache_key, query, answer)
+
+        if on_answer:
+            await on_answer(answer)
+
+        yield format_sse("done", build_output(answer))
+    except Exception as e:
+        print(f"[ERROR] Streaming {task} failed: {type(e).__name__}: {str(e)}")
+        yield format_sse_error(e)
@@ -0,0 +1,113 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import MemorySaver
+from app.utils.metrics import metrics
+
+
+class ExpiringMemorySaver(MemorySaver):
+    """
+    An in-memory LangGraph checkpointer that forgets a run once it hasn't been written to for ttl_seconds, and keeps
+    at most max_runs runs taking up at most max_bytes. Checkpoints are only needed long enough for a client to retry a
+    failed run, so they don't need to outlive the server.
+
+    Channels in excluded_channels (e.g. audio) are never saved, so a resumed run sees them at their defaults and has
+    to get them some other way.
+    """
+
+    def __init__(self, max_runs: int, ttl_seconds: float, max_bytes: int, excluded_channels: Iterable[str] = ()):
+        super().__init__()
+        self.max_runs = max_runs
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.excluded_channels = frozenset(excluded_channels)
+        self.total_bytes = 0
+        self._lock = threading.Lock() # The async methods of MemorySaver run the sync ones in worker threads
+        self._last_written: OrderedDict[str, float] = OrderedDict() # Least recently written run first
+        self._run_bytes: Dict[str, int] = {} # Serialized size of each run's checkpoints and writes
+
+
+    def _delete(self, thread_id: str) -> None:
+        self.storage.pop(thread_id, None)
+
+        for key in [key for key in self.writes if key[0] == thread_id]:
+            del self.writes[key]
+
+        self._last_written.pop(thread_id, None)
+        self.total_bytes -= self._run_bytes.pop(thread_id, 0)
+
+
+    def _expire(self, now: float) -> None:
+        while self._last_written:
+            thread_id, written_at = next(iter(self._last_written.items()))
+
+            if now - written_at <= self.ttl_seconds and len(self._last_written) <= self.max_runs and self.total_bytes <= self.max_bytes:
+                break
+
+            self._delete(thread_id)
+            metrics.increment("graph_checkpoints.expired")
+
+
+    def _touch(self, config: RunnableConfig, written_bytes: int) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        now = time.monotonic()
+
+        with self._lock:
+            self._last_written[thread_id] = now
+            self._last_written.move_to_end(thread_id)
+            self._run_bytes[thread_id] = self._run_bytes.get(thread_id, 0) + written_bytes
+            self.total_bytes += written_bytes
+            self._expire(now)
+
+
+    def _strip(self, values: Any) -> Any:
+        if not isinstance(values, dict):
+            return values
+
+        return {channel: value for channel, value in values.items() if channel not in self.excluded_channels}
+
+
+    def delete_run(self, thread_id: str) -> None:
+        """Forgets a run's checkpoints straight away."""
+
+        with self._lock:
+            self._delete(thread_id)
+
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with self._lock:
+            self._expire(time.monotonic())
+
+            # Reading an unknown run would otherwise leave an empty entry behind in storage
+            if config["configurable"]["thread_id"] not in self._last_written:
+                return None
+
+        return super().get_tuple(config)
+
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        checkpoint = {**checkpoint, "channel_values": self._strip(checkpoint["channel_values"])}
+
+        # The metadata repeats each node's state update
+        if "writes" in metadata:
+            metadata = {**metadata, "writes": {node: self._strip(update) for node, update in (metadata["writes"] or {}).items()}}
+
+        saved_config = super().put(config, checkpoint, metadata, new_versions)
+
+        saved = saved_config["configurable"]
+        saved_checkpoint, saved_metadata, _ = self.storage[saved["thread_id"]][saved["checkpoint_ns"]][saved["checkpoint_id"]]
+        self._touch(config, len(saved_checkpoint[1]) + len(saved_metadata[1]))
+
+        return saved_config
+
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str) -> None:
+        writes = [(channel, value) for channel, value in writes if channel not in self.excluded_channels]
+        super().put_writes(config, writes, task_id)
+
+        configurable = config["configurable"]
+        saved_writes = self.writes[(configurable["thread_id"], configurable["checkpoint_ns"], configurable["checkpoint_id"])]
+        self._touch(config, sum(len(value[1]) for write_task_id, _, value in saved_writes.values() if write_task_id == task_id))
@@ -0,0 +1,170 @@
+import io
+import time
+import base64
+import asyncio
+import numpy as np
+from typing import Literal
+from fastapi import HTTPException, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+from pydantic import BaseModel
+from app.utils.metrics import metrics
+from app.utils.image_quality import ImageQualityReport, measure_image_quality, classify_image_quality
+from app.utils.constants import (
+    IMAGE_MAX_DIMENSION,
+    IMAGE_LOW_DETAIL_MAX_DIMENSION,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_INK_CONTRAST,
+    IMAGE_MIN_INK_FRACTION,
+    IMAGE_INK_OUTLIER_FRACTION,
+    IMAGE_CROP_PADDING,
+    IMAGE_HASH_SIZE,
+)
+
+try:
+    # iPhones upload HEIC by default. Pillow can only read it with the optional pillow-heif plugin installed.
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+
+class PreparedImage(BaseModel):
+    """A handwriting photo shrunk down for the vision models, encoded once and reused across every call"""
+    data_url: str
+    detail: Literal["low", "high"] # The OpenAI vision detail level, which decides how many image tokens we pay for
+    width: int
+    height: int
+    original_bytes: int
+    encoded_bytes: int
+    quality: ImageQualityReport # Local QA verdict, so clear cut photos don't need the LLM QA call
+    image_hash: int # Perceptual hash of the cropped writing, for spotting resubmissions of the same photo
+    aspect_ratio: float
+
+
+def _open_grayscale(raw_bytes: bytes) -> tuple[Image.Image, int]:
+    """
+    Decodes the upload, applies the EXIF orientation and returns it as 8 bit grayscale on a white background,
+    along with the longest side of the original photo in pixels.
+    """
+
+    try:
+        image = Image.open(io.BytesIO(raw_bytes))
+        original_size = max(image.size)
+
+        # JPEG can decode straight to a smaller grayscale image, which is much faster for 12 MP camera photos
+        image.draft("L", (IMAGE_MAX_DIMENSION * 2, IMAGE_MAX_DIMENSION * 2))
+        image = ImageOps.exif_transpose(image)
+
+        # Transparent pixels (e.g. in reference PNGs) would turn black, so we put them on white paper first
+        if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+            rgba = image.convert("RGBA")
+            background = Image.new("RGBA", rgba.size, (255, 255, 255, 255))
+            image = Image.alpha_composite(background, rgba)
+
+        return image.convert("L"), original_size
+    except (UnidentifiedImageError, OSError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Could not read the uploaded image. Please upload a JPEG, PNG or HEIC photo: {str(e)}"
+        )
+
+
+def ink_bounding_box(gray: np.ndarray) -> tuple[int, int, int, int] | None:
+    """
+    Finds the box (left, top, right, bottom) around the writing in a grayscale image. Ink is anything clearly darker
+    than the paper, and a small fraction of outlying ink pixels (specks, shadows at the edges) is ignored.
+    Returns None if there is too little ink to crop to.
+    """
+
+    paper_level = np.percentile(gray, 90)
+    ink_rows, ink_cols = np.nonzero(gray < paper_level - IMAGE_INK_CONTRAST)
+
+    if len(ink_rows) < IMAGE_MIN_INK_FRACTION * gray.size:
+        return None
+
+    low, high = IMAGE_INK_OUTLIER_FRACTION * 100, (1 - IMAGE_INK_OUTLIER_FRACTION) * 100
+    top, bottom = np.percentile(ink_rows, [low, high])
+    left, right = np.percentile(ink_cols, [low, high])
+
+    # Pad the box so strokes at the edges and the surrounding spacing stay visible
+    pad = IMAGE_CROP_PADDING * max(bottom - top, right - left)
+    height, width = gray.shape
+
+    return (
+        max(0, int(left - pad)),
+        max(0, int(top - pad)),
+        min(width, int(right + pad) + 1),
+        min(height, int(bottom + pad) + 1),
+    )
+
+
+def difference_hash(image: Image.Image, hash_size: int = IMAGE_HASH_SIZE) -> int:
+    """
+    Computes a dHash: the image is shrunk to (hash_size + 1) x hash_size and each bit records whether a pixel is
+    brighter than its right neighbour. Near-identical images (recompressed, slightly shifted or re-exposed) differ in
+    only a few bits, which is far cheaper to check than another vision call.
+    """
+
+    pixels = np.asarray(image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def hamming_distance(first_hash: int, second_hash: int) -> int:
+    """Counts the bits two hashes differ in."""
+    return (first_hash ^ second_hash).bit_count()
+
+
+def _prepare_image(raw_bytes: bytes) -> PreparedImage:
+    started_at = time.monotonic()
+
+    # 1. Decode, orient and convert to grayscale. Colour doesn't matter for grading handwriting.
+    image, original_size = _open_grayscale(raw_bytes)
+
+    # 2. Work on a reduced copy so the ink search and quality checks stay cheap, then crop to the writing
+    image.thumbnail((IMAGE_MAX_DIMENSION * 2, IMAGE_MAX_DIMENSION * 2), Image.Resampling.LANCZOS)
+
+    gray = np.asarray(image)
+    bounding_box = ink_bounding_box(gray)
+    quality = classify_image_quality(measure_image_quality(gray, bounding_box, max(image.size) / original_size))
+
+    if bounding_box:
+        image = image.crop(bounding_box)
+
+    # 3. Downscale to what the vision model actually looks at (never upscale)
+    image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.Resampling.LANCZOS)
+
+    # 4. Re-encode compactly
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+    encoded = buffer.getvalue()
+
+    # Low detail is a fixed 512px view, which is enough once the image is a tight crop that small
+    detail = "low" if max(image.size) <= IMAGE_LOW_DETAIL_MAX_DIMENSION else "high"
+
+    metrics.observe("images.preprocess_seconds", time.monotonic() - started_at)
+    metrics.observe("images.original_bytes", len(raw_bytes))
+    metrics.observe("images.encoded_bytes", len(encoded))
+    metrics.increment(f"images.detail.{detail}")
+    metrics.increment(f"images.quality.{quality.verdict}")
+
+    return PreparedImage(
+        data_url=f"data:image/jpeg;base64,{base64.b64encode(encoded).decode('utf-8')}",
+        detail=detail,
+        width=image.width,
+        height=image.height,
+        original_bytes=len(raw_bytes),
+        encoded_bytes=len(encoded),
+        quality=quality,
+        image_hash=difference_hash(image),
+        aspect_ratio=image.width / image.height
+    )
+
+
+async def prepare_image(raw_bytes: bytes) -> PreparedImage:
+    """
+    Auto-orients, grayscales, crops to the ink and downscales an uploaded handwriting photo, then re-encodes it as a
+    compact JPEG data URL with the vision detail level to use. Runs in a worker thread to keep the event loop free.
+    """
+    return await asyncio.to_thread(_prepare_image, raw_bytes)
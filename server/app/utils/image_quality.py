@@ -0,0 +1,152 @@
+import os
+import json
+import numpy as np
+from typing import Dict, List, Literal
+from pydantic import BaseModel
+from app.utils.constants import IMAGE_INK_CONTRAST
+
+
+class ImageQualityMetrics(BaseModel):
+    """Cheap, deterministic measurements of a handwriting photo"""
+    sharpness: float # Variance of the Laplacian around the writing. Blurry photos have soft edges and score low.
+    paper_brightness: float # Gray level (0-255) of the paper
+    clipped_fraction: float # Share of pixels blown out to pure white, from glare or overexposure
+    ink_contrast: float # How much darker the ink is than the paper
+    ink_fraction: float # Share of the photo covered by ink
+    ink_size: float # Longest side of the writing in the original photo, in pixels
+
+
+class ImageQualityThresholds(BaseModel):
+    """
+    Two bands per metric: past the reject bound the photo is clearly bad, past the accept bound it is clearly good.
+    Photos in between are left to the LLM QA. Tune with scripts/calibrate_image_quality.py.
+    """
+    sharpness_reject: float = 15.0
+    sharpness_accept: float = 120.0
+    paper_brightness_reject: float = 70.0
+    paper_brightness_accept: float = 130.0
+    clipped_fraction_reject: float = 0.3
+    clipped_fraction_accept: float = 0.05
+    ink_contrast_reject: float = 25.0
+    ink_contrast_accept: float = 70.0
+    ink_fraction_min_reject: float = 0.001
+    ink_fraction_min_accept: float = 0.003
+    ink_fraction_max_reject: float = 0.5
+    ink_fraction_max_accept: float = 0.25
+    ink_size_reject: float = 48.0
+    ink_size_accept: float = 160.0
+
+
+class ImageQualityReport(BaseModel):
+    """The local QA verdict on a photo: reject it, accept it, or ask the LLM"""
+    verdict: Literal["reject", "accept", "uncertain"]
+    metrics: ImageQualityMetrics
+    reasons: List[str] # Uses the same tags as the LLM QA prompt
+    capture_tips: str
+
+
+CAPTURE_TIPS: Dict[str, str] = {
+    "BLURRY": "Hold your phone still and tap the screen to focus on your writing before taking the picture.",
+    "TOO_DARK": "Take the picture somewhere brighter, or turn on more lights.",
+    "TOO_BRIGHT": "Move away from direct light or glare so the page isn't washed out.",
+    "TOO_FAINT": "Write with a darker pen or pencil so your writing stands out from the paper.",
+    "TOO_FAR": "Move your camera closer so your writing fills more of the picture.",
+    "TOO_CLOSE": "Move your camera back a little so all of your writing fits in the picture.",
+    "NOT_HANDWRITING": "Make sure your writing is in the picture and dark enough to see clearly.",
+}
+
+
+def load_image_quality_thresholds() -> ImageQualityThresholds:
+    """Loads the thresholds, using the JSON file at IMAGE_QUALITY_THRESHOLDS_PATH (written by the calibration script) if set."""
+
+    thresholds_path = os.getenv("IMAGE_QUALITY_THRESHOLDS_PATH")
+    if not thresholds_path:
+        return ImageQualityThresholds()
+
+    with open(thresholds_path, "r", encoding="utf-8") as thresholds_file:
+        return ImageQualityThresholds(**json.load(thresholds_file))
+
+
+IMAGE_QUALITY_THRESHOLDS = load_image_quality_thresholds()
+
+
+def measure_image_quality(gray: np.ndarray, ink_box: tuple[int, int, int, int] | None, scale: float) -> ImageQualityMetrics:
+    """
+    Measures a grayscale photo. ink_box is the writing's bounding box in the same image, and scale is how much the
+    image was shrunk from the original photo, so sizes can be reported in original pixels.
+    """
+
+    pixels = gray.astype(np.float32)
+    paper_level = float(np.percentile(pixels, 90))
+    ink_mask = pixels < paper_level - IMAGE_INK_CONTRAST
+    ink_fraction = float(ink_mask.mean())
+
+    # Measure sharpness and ink contrast around the writing, where focus matters
+    region = pixels
+    if ink_box:
+        left, top, right, bottom = ink_box
+        region = pixels[top:bottom, left:right]
+
+    laplacian = (
+        region[1:-1, :-2] + region[1:-1, 2:] + region[:-2, 1:-1] + region[2:, 1:-1] - 4 * region[1:-1, 1:-1]
+    )
+    sharpness = float(laplacian.var()) if laplacian.size else 0.0
+
+    ink_contrast = paper_level - float(np.percentile(pixels[ink_mask], 50)) if ink_mask.any() else 0.0
+    ink_size = max(ink_box[2] - ink_box[0], ink_box[3] - ink_box[1]) / scale if ink_box else 0.0
+
+    return ImageQualityMetrics(
+        sharpness=sharpness,
+        paper_brightness=paper_level,
+        clipped_fraction=float((pixels >= 250).mean()),
+        ink_contrast=ink_contrast,
+        ink_fraction=ink_fraction,
+        ink_size=ink_size
+    )
+
+
+def _problems(metrics: ImageQualityMetrics, thresholds: ImageQualityThresholds, band: Literal["reject", "accept"]) -> List[str]:
+    """Returns the tags of every check the metrics fail, using either the reject or the accept bounds."""
+
+    bound = lambda name: getattr(thresholds, f"{name}_{band}")
+    problems = []
+
+    # Without enough ink the other measurements are meaningless
+    if metrics.ink_fraction < bound("ink_fraction_min"):
+        return ["NOT_HANDWRITING"]
+
+    if metrics.ink_fraction > bound("ink_fraction_max"):
+        problems.append("TOO_CLOSE")
+    if metrics.sharpness < bound("sharpness"):
+        problems.append("BLURRY")
+    if metrics.paper_brightness < bound("paper_brightness"):
+        problems.append("TOO_DARK")
+    # Blown out paper is only a problem when it washes out the ink too (e.g. glare), not for clean white backgrounds
+    if metrics.clipped_fraction > bound("clipped_fraction") and metrics.ink_contrast < thresholds.ink_contrast_accept:
+        problems.append("TOO_BRIGHT")
+    if metrics.ink_contrast < bound("ink_contrast"):
+        problems.append("TOO_FAINT")
+    if metrics.ink_size < bound("ink_size"):
+        problems.append("TOO_FAR")
+
+    return problems
+
+
+def classify_image_quality(metrics: ImageQualityMetrics, thresholds: ImageQualityThresholds = IMAGE_QUALITY_THRESHOLDS) -> ImageQualityReport:
+    """Rejects photos that are clearly bad, accepts ones that are clearly good, and leaves the rest to the LLM QA."""
+
+    reasons = _problems(metrics, thresholds, "reject")
+
+    if reasons:
+        verdict = "reject"
+    elif _problems(metrics, thresholds, "accept"):
+        verdict = "uncertain"
+    else:
+        verdict = "accept"
+
+    return ImageQualityReport(
+        verdict=verdict,
+        metrics=metrics,
+        reasons=reasons,
+        capture_tips=" ".join(CAPTURE_TIPS[reason] for reason in reasons)
+    )
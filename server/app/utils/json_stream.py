@@ -0,0 +1,87 @@
+import re
+
+
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class JsonStringFieldExtractor:
+    """
+    Incrementally extracts the value of one top level string field from a JSON object that is being streamed in
+    chunks, e.g. the feedback_text of an LLM response, so the text can be used before the JSON is complete.
+    """
+
+    def __init__(self, field: str):
+        self._key_pattern = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self._buffer = ""
+        self._position: int | None = None # Index in the buffer of the next undecoded character of the value
+        self.done = False
+
+
+    def feed(self, chunk: str) -> str:
+        """Adds the next chunk of the JSON text and returns any newly decoded characters of the field's value."""
+
+        if self.done:
+            return ""
+
+        self._buffer += chunk
+
+        # 1. Wait until we have seen the opening quote of the value
+        if self._position is None:
+            match = self._key_pattern.search(self._buffer)
+            if match is None:
+                return ""
+            self._position = match.end()
+
+        # 2. Decode as much of the value as we can. An escape split across chunks is left for the next call.
+        decoded = []
+        position = self._position
+
+        while position < len(self._buffer):
+            char = self._buffer[position]
+
+            if char == '"':
+                self.done = True
+                position += 1
+                break
+
+            if char != "\\":
+                decoded.append(char)
+                position += 1
+                continue
+
+            if position + 1 >= len(self._buffer):
+                break
+
+            escape = self._buffer[position + 1]
+            if escape == "u":
+                if position + 6 > len(self._buffer):
+                    break
+
+                code = int(self._buffer[position + 2:position + 6], 16)
+
+                # Characters outside the BMP (e.g. emoji) arrive as a \uD8xx\uDCxx surrogate pair
+                if 0xD800 <= code < 0xDC00:
+                    if position + 12 > len(self._buffer):
+                        break
+                    low = int(self._buffer[position + 8:position + 12], 16)
+                    decoded.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                    position += 12
+                else:
+                    decoded.append(chr(code))
+                    position += 6
+            else:
+                decoded.append(_ESCAPES.get(escape, escape))
+                position += 2
+
+        self._position = position
+
+        return "".join(decoded)
@@ -0,0 +1,445 @@
+import time
+import random
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, TypeVar
+import openai
+from fastapi import HTTPException, status
+from langchain_core.messages import BaseMessage
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
+from app.utils.openai import openai_client
+from app.utils.metrics import metrics
+from app.utils.llm_tasks import LLMTask, get_llm_task
+from app.utils.constants import (
+    LLM_MAX_CONCURRENCY,
+    LLM_ROUTE_MAX_CONCURRENCY,
+    LLM_QUEUE_TIMEOUT_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_RETRY_MAX_SECONDS,
+    LLM_MAX_RETRY_AFTER_SECONDS,
+    LLM_RETRY_BUDGET_RATIO,
+    LLM_RETRY_BUDGET_MIN_RETRIES,
+    LLM_RETRY_BUDGET_WINDOW_SECONDS,
+    LLM_CIRCUIT_FAILURE_THRESHOLD,
+    LLM_CIRCUIT_RESET_SECONDS,
+)
+
+
+T = TypeVar("T")
+
+
+class EmptyCompletionError(Exception):
+    """The model answered without any content, e.g. a reasoning model spent the whole token limit thinking."""
+
+    def __init__(self, finish_reason: str | None):
+        super().__init__(f"The model returned no content (finish reason: {finish_reason})")
+        self.finish_reason = finish_reason
+
+
+# Errors that are worth retrying. Anything else (bad request, auth, ...) fails straight away.
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError, EmptyCompletionError)
+
+# LangChain message types and the OpenAI roles they map to
+MESSAGE_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+
+class CircuitBreaker:
+    """Stops calling a failing upstream for a while after too many consecutive failures, then lets one trial call through."""
+
+    def __init__(self, failure_threshold: int = LLM_CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = LLM_CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit lets a trial call through."""
+
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+
+    def allow(self) -> bool:
+        """Checks if a call may go ahead. While half open only a single trial call is allowed at a time."""
+
+        state = self.state
+
+        if state == "closed":
+            return True
+
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+
+        return False
+
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+
+    def release_trial(self) -> None:
+        """Frees the trial slot when a call ends without telling us anything about the upstream (e.g. it was cancelled)."""
+        self._trial_in_flight = False
+
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic() # (Re)open the circuit
+
+
+class RetryBudget:
+    """Caps retries to a fraction of recent calls, so an upstream outage can't turn into a retry storm."""
+
+    def __init__(
+        self,
+        ratio: float = LLM_RETRY_BUDGET_RATIO,
+        min_retries: int = LLM_RETRY_BUDGET_MIN_RETRIES,
+        window_seconds: float = LLM_RETRY_BUDGET_WINDOW_SECONDS
+    ):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_seconds = window_seconds
+        self._calls: deque[float] = deque()
+        self._retries: deque[float] = deque()
+
+
+    def _trim(self, now: float) -> None:
+        for timestamps in (self._calls, self._retries):
+            while timestamps and now - timestamps[0] > self.window_seconds:
+                timestamps.popleft()
+
+
+    def record_call(self) -> None:
+        now = time.monotonic()
+        self._trim(now)
+        self._calls.append(now)
+
+
+    def try_spend(self) -> bool:
+        """Uses up one retry if the budget allows it."""
+
+        now = time.monotonic()
+        self._trim(now)
+
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._calls):
+            return False
+
+        self._retries.append(now)
+        return True
+
+
+def _retry_after_seconds(e: Exception) -> float | None:
+    """Reads how long the provider asked us to wait from the Retry-After headers of a failed response."""
+
+    response = getattr(e, "response", None)
+    if response is None:
+        return None
+
+    headers = response.headers
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def to_openai_messages(messages: List[BaseMessage | Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Converts LangChain messages into OpenAI chat messages. OpenAI style dicts are passed through unchanged."""
+
+    return [
+        {"role": MESSAGE_ROLES[message.type], "content": message.content} if isinstance(message, BaseMessage) else message
+        for message in messages
+    ]
+
+
+class LLMGateway:
+    """
+    The single entry point for LLM calls. Each call names a task, which picks its model and limits. The gateway
+    limits concurrency globally and per route, retries transient failures
+    with jittered backoff (honouring Retry-After) inside a retry budget, applies per-call timeouts, and trips a
+    per-route circuit breaker when the upstream keeps failing. Overload surfaces as a 503 instead of piling up.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        route_max_concurrency: int = LLM_ROUTE_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+    ):
+        self._client = client.with_options(max_retries=0) # Retries are handled here so they respect the budget
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.route_max_concurrency = route_max_concurrency
+        self.max_retries = max_retries
+        self._route_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._retry_budget = RetryBudget()
+        self._usage_tasks: set[str] = set()
+
+
+    def _breaker(self, route: str) -> CircuitBreaker:
+        if route not in self._breakers:
+            self._breakers[route] = CircuitBreaker()
+        return self._breakers[route]
+
+
+    def _route_semaphore(self, route: str) -> asyncio.Semaphore:
+        if route not in self._route_semaphores:
+            self._route_semaphores[route] = asyncio.Semaphore(self.route_max_concurrency)
+        return self._route_semaphores[route]
+
+
+    def _unavailable(self, route: str, detail: str, retry_after: float) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"LLM route {route}: {detail}",
+            headers={"Retry-After": str(max(1, round(retry_after)))}
+        )
+
+
+    @asynccontextmanager
+    async def _slot(self, route: str):
+        """Waits for a free global and per-route slot, shedding the call if the queue is too long."""
+
+        started_at = time.monotonic()
+        route_semaphore = self._route_semaphore(route)
+
+        try:
+            await asyncio.wait_for(route_semaphore.acquire(), timeout=LLM_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            metrics.increment(f"llm.{route}.shed")
+            raise self._unavailable(route, "too many requests in flight, please try again shortly.", LLM_QUEUE_TIMEOUT_SECONDS)
+
+        try:
+            remaining = LLM_QUEUE_TIMEOUT_SECONDS - (time.monotonic() - started_at)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=max(remaining, 0.001))
+            except asyncio.TimeoutError:
+                metrics.increment(f"llm.{route}.shed")
+                raise self._unavailable(route, "too many requests in flight, please try again shortly.", LLM_QUEUE_TIMEOUT_SECONDS)
+
+            metrics.observe(f"llm.{route}.queue_seconds", time.monotonic() - started_at)
+
+            try:
+                yield
+            finally:
+                self._semaphore.release()
+        finally:
+            route_semaphore.release()
+
+
+    async def _call_with_retries(self, route: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Makes the call, retrying transient failures while the retry budget and circuit breaker allow it."""
+
+        breaker = self._breaker(route)
+        self._retry_budget.record_call()
+        attempt = 0
+
+        while True:
+            if not breaker.allow():
+                metrics.increment(f"llm.{route}.circuit_rejected")
+                raise self._unavailable(route, "the AI provider is currently unavailable, please try again shortly.", breaker.retry_after())
+
+            started_at = time.monotonic()
+            metrics.increment(f"llm.{route}.attempts")
+
+            try:
+                result = await call()
+                breaker.record_success()
+                metrics.observe(f"llm.{route}.latency_seconds", time.monotonic() - started_at)
+                return result
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, EmptyCompletionError):
+                    breaker.record_success() # The provider is up, this answer just came back empty
+                else:
+                    breaker.record_failure()
+                metrics.increment(f"llm.{route}.errors.{type(e).__name__}")
+
+                retry_after = _retry_after_seconds(e)
+                if retry_after is not None and retry_after > LLM_MAX_RETRY_AFTER_SECONDS:
+                    raise self._unavailable(route, "the AI provider is rate limiting us, please try again later.", retry_after)
+
+                if attempt >= self.max_retries or not self._retry_budget.try_spend():
+                    if isinstance(e, openai.RateLimitError):
+                        raise self._unavailable(route, "the AI provider is rate limiting us, please try again shortly.", retry_after or LLM_RETRY_MAX_SECONDS)
+                    if isinstance(e, EmptyCompletionError):
+                        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=f"LLM route {route}: the AI provider returned an empty answer, please try again.")
+                    raise
+
+                # Full jitter backoff, but never sooner than the provider asked for
+                backoff = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+                attempt += 1
+                metrics.increment(f"llm.{route}.retries")
+
+                await asyncio.sleep(max(backoff, retry_after or 0.0))
+            except openai.APIStatusError:
+                breaker.record_success() # The provider answered, so it is up even though it rejected this request
+                raise
+            except BaseException:
+                breaker.release_trial()
+                raise
+
+
+    def _route_call(self, task_name: str, model: str | None, timeout: float | None) -> tuple[LLMTask, Dict[str, Any]]:
+        """Resolves the task's routing into OpenAI call arguments and records the decision."""
+
+        task = get_llm_task(task_name)
+        model = model or task.model
+
+        arguments: Dict[str, Any] = {"model": model, "timeout": timeout or task.timeout}
+        if task.max_completion_tokens:
+            arguments["max_completion_tokens"] = task.max_completion_tokens
+
+        metrics.increment(f"llm.{task.route}.calls")
+        metrics.increment(f"llm.tasks.{task_name}.{model}")
+
+        return task, arguments
+
+
+    def _record_usage(self, task: str, usage: Any) -> None:
+        """Records the task's token usage, splitting prompt tokens into those served from the provider's prompt cache and the rest."""
+
+        if usage is None:
+            return
+
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0
+
+        metrics.increment(f"llm.tasks.{task}.prompt_tokens", prompt_tokens)
+        metrics.increment(f"llm.tasks.{task}.cached_prompt_tokens", cached_tokens)
+        metrics.increment(f"llm.tasks.{task}.uncached_prompt_tokens", prompt_tokens - cached_tokens)
+        metrics.increment(f"llm.tasks.{task}.completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+        self._usage_tasks.add(task)
+
+
+    async def chat(
+        self,
+        task: str,
+        messages: List[BaseMessage | Dict[str, Any]],
+        model: str | None = None,
+        timeout: float | None = None,
+        **kwargs: Any
+    ) -> ChatCompletion:
+        """
+        Makes a chat completion call for the named task (see app/utils/llm_tasks.py), which decides the model, token limit,
+        timeout and route. Extra keyword arguments (e.g. response_format) go straight to OpenAI.
+        """
+
+        llm_task, arguments = self._route_call(task, model, timeout)
+
+        async def call() -> ChatCompletion:
+            response = await self._client.chat.completions.create(
+                messages=to_openai_messages(messages),
+                **arguments,
+                **kwargs
+            )
+
+            # Every caller parses the content, so an empty answer is retried rather than failing json.loads("")
+            choice = response.choices[0] if response.choices else None
+            if choice is None or not choice.message.content:
+                metrics.increment(f"llm.tasks.{task}.empty_completions")
+                self._record_usage(task, getattr(response, "usage", None))
+                raise EmptyCompletionError(choice.finish_reason if choice else None)
+
+            return response
+
+        async with self._slot(llm_task.route):
+            started_at = time.monotonic()
+
+            response = await self._call_with_retries(llm_task.route, call)
+
+            metrics.observe(f"llm.tasks.{task}.latency_seconds", time.monotonic() - started_at)
+            self._record_usage(task, getattr(response, "usage", None))
+
+            return response
+
+
+    async def stream_chat(
+        self,
+        task: str,
+        messages: List[BaseMessage | Dict[str, Any]],
+        model: str | None = None,
+        timeout: float | None = None,
+        **kwargs: Any
+    ) -> AsyncIterator[str]:
+        """Makes a streaming chat completion call for the named task and yields the content as it arrives. Only opening the stream is retried."""
+
+        llm_task, arguments = self._route_call(task, model, timeout)
+
+        async with self._slot(llm_task.route):
+            stream = await self._call_with_retries(
+                llm_task.route,
+                lambda: self._client.chat.completions.create(
+                    messages=to_openai_messages(messages),
+                    stream=True,
+                    stream_options={"include_usage": True}, # Usage comes in a last chunk without choices
+                    **arguments,
+                    **kwargs
+                )
+            )
+
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+                if getattr(chunk, "usage", None):
+                    self._record_usage(task, chunk.usage)
+
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the state of each route's circuit breaker."""
+
+        return {
+            route: {"state": breaker.state, "consecutive_failures": breaker.consecutive_failures}
+            for route, breaker in self._breakers.items()
+        }
+
+
+    def prompt_cache_stats(self) -> Dict[str, float | None]:
+        """Returns the share of each task's prompt tokens that the provider served from its prompt cache."""
+
+        return {
+            task: metrics.ratio(f"llm.tasks.{task}.cached_prompt_tokens", f"llm.tasks.{task}.prompt_tokens")
+            for task in sorted(self._usage_tasks)
+        }
+
+
+llm_gateway = LLMGateway(openai_client)
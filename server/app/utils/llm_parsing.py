@@ -0,0 +1,121 @@
+import copy
+from functools import lru_cache
+from typing import Any, Dict, List, Type, TypeVar
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from app.utils.llm_gateway import llm_gateway
+from app.utils.metrics import metrics
+
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def _make_strict(schema: Any) -> Any:
+    """Rewrites a pydantic JSON schema in place into the subset strict structured outputs accept."""
+
+    if isinstance(schema, dict):
+        schema.pop("default", None)
+        schema.pop("title", None)
+
+        if schema.get("type") == "object" and "properties" in schema:
+            schema["additionalProperties"] = False
+            schema["required"] = list(schema["properties"]) # Strict mode needs every field, defaults or not
+
+        for value in schema.values():
+            _make_strict(value)
+    elif isinstance(schema, list):
+        for value in schema:
+            _make_strict(value)
+
+    return schema
+
+
+@lru_cache(maxsize=None)
+def _strict_schema(output_type: Type[BaseModel]) -> Dict[str, Any]:
+    return _make_strict(output_type.model_json_schema())
+
+
+def json_schema_format(output_type: Type[BaseModel]) -> Dict[str, Any]:
+    """Returns the response_format that makes the LLM answer with JSON matching the model's schema."""
+
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": output_type.__name__,
+            "strict": True,
+            "schema": copy.deepcopy(_strict_schema(output_type))
+        }
+    }
+
+
+def parse_structured(content: str, output_type: Type[M]) -> M:
+    """Validates the LLM's JSON against the model, requiring every field. Markdown code fences around it are ignored."""
+
+    content = content.strip()
+
+    if content.startswith("```"):
+        content = content.split("\n", 1)[1] if "\n" in content else ""
+        content = content.rsplit("```", 1)[0].strip()
+
+    output = output_type.model_validate_json(content)
+
+    # The schema requires every field, so a default filling in a missing one would hide a bad response
+    missing = [name for name in output_type.model_fields if name not in output.model_fields_set]
+    if missing:
+        raise ValidationError.from_exception_data(
+            output_type.__name__,
+            [{"type": "missing", "loc": (name,), "input": content} for name in missing]
+        )
+
+    return output
+
+
+async def repair_structured(
+    task: str,
+    messages: List[Any],
+    content: str,
+    error: ValidationError,
+    output_type: Type[M],
+    **kwargs: Any
+) -> M:
+    """
+    Shows the LLM the response that failed validation and the errors, and asks for a corrected one. Only made once, so
+    a bad response costs one more call to this step instead of a failed request.
+    """
+
+    metrics.increment(f"llm.parsing.{task}.repairs")
+
+    repair_messages = [
+        *messages,
+        {"role": "assistant", "content": content},
+        {
+            "role": "user",
+            "content": f"That response could not be used:\n{error}\nRespond again with ONLY the corrected JSON object in the required format."
+        }
+    ]
+
+    response = await llm_gateway.chat(task=task, messages=repair_messages, response_format=json_schema_format(output_type), **kwargs)
+    repaired_content = response.choices[0].message.content or ""
+
+    try:
+        return parse_structured(repaired_content, output_type)
+    except ValidationError as e:
+        metrics.increment(f"llm.parsing.{task}.failures")
+        print(f"[ERROR] {task} returned invalid JSON after a repair attempt. Raw content: {repaired_content[:500]}")
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"The {task} response did not match the expected format: {e.errors()[0]['msg'] if e.errors() else e}"
+        )
+
+
+async def chat_structured(task: str, messages: List[Any], output_type: Type[M], **kwargs: Any) -> M:
+    """Makes a chat call whose answer must match the model's JSON schema, with one repair attempt if it doesn't."""
+
+    response = await llm_gateway.chat(task=task, messages=messages, response_format=json_schema_format(output_type), **kwargs)
+    content = response.choices[0].message.content or ""
+
+    try:
+        return parse_structured(content, output_type)
+    except ValidationError as e:
+        print(f"[WARNING] {task} returned invalid JSON, asking for a repair: {e.error_count()} errors")
+        return await repair_structured(task, messages, content, e, output_type, **kwargs)
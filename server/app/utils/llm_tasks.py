@@ -0,0 +1,86 @@
+import os
+import json
+from typing import Dict
+from pydantic import BaseModel
+from app.utils.constants import PRIMARY_MODEL, FAST_MODEL, LLM_TIMEOUT_SECONDS
+
+
+class LLMTask(BaseModel):
+    """How a kind of LLM call is routed: which gateway route it counts against, the model, and its limits."""
+    route: str
+    model: str
+    max_completion_tokens: int | None = None
+    timeout: float = LLM_TIMEOUT_SECONDS
+
+
+# Defaults for every prompt we send. Light, classification-like tasks run on the fast model. The token limits include
+# the reasoning tokens of reasoning models, so they leave room for thinking on top of the answer itself.
+DEFAULT_LLM_TASKS: Dict[str, LLMTask] = {
+    # Writing
+    "qa": LLMTask(route="writing", model=FAST_MODEL, max_completion_tokens=2000, timeout=20.0),
+    "letter_eval": LLMTask(route="writing", model=PRIMARY_MODEL, max_completion_tokens=2000, timeout=60.0),
+    "joining_eval": LLMTask(route="writing", model=PRIMARY_MODEL, max_completion_tokens=2000, timeout=60.0),
+    "dictation_eval": LLMTask(route="writing", model=PRIMARY_MODEL, max_completion_tokens=2000, timeout=60.0),
+    # Cheap first pass of the writing evaluation cascade, escalated to the *_eval task above when unclear
+    "letter_eval_fast": LLMTask(route="writing", model=FAST_MODEL, max_completion_tokens=2000, timeout=30.0),
+    "joining_eval_fast": LLMTask(route="writing", model=FAST_MODEL, max_completion_tokens=2000, timeout=30.0),
+    "dictation_eval_fast": LLMTask(route="writing", model=FAST_MODEL, max_completion_tokens=2000, timeout=30.0),
+    "explain_writing": LLMTask(route="writing", model=PRIMARY_MODEL, max_completion_tokens=2000, timeout=40.0),
+    "explain_joining": LLMTask(route="writing", model=PRIMARY_MODEL, max_completion_tokens=2000, timeout=40.0),
+    "explain_dictation": LLMTask(route="writing", model=PRIMARY_MODEL, max_completion_tokens=2000, timeout=40.0),
+    # Pronounciation
+    "pronounciation_feedback": LLMTask(route="pronounciation", model=PRIMARY_MODEL, max_completion_tokens=2000, timeout=30.0),
+    "explain_pronounciation": LLMTask(route="pronounciation", model=PRIMARY_MODEL, max_completion_tokens=2000, timeout=40.0),
+    # Speaking
+    "semantic_eval": LLMTask(route="speaking", model=PRIMARY_MODEL, max_completion_tokens=2000, timeout=30.0),
+    "feedback": LLMTask(route="speaking", model=PRIMARY_MODEL, max_completion_tokens=2000, timeout=30.0),
+    "evaluate_and_feedback": LLMTask(route="speaking", model=PRIMARY_MODEL, max_completion_tokens=3000, timeout=40.0),
+    "explain_speaking": LLMTask(route="speaking", model=PRIMARY_MODEL, max_completion_tokens=2000, timeout=40.0),
+    # Conversation memory, summarizing older explain questions and answers in the background
+    "summarize": LLMTask(route="memory", model=FAST_MODEL, max_completion_tokens=1500, timeout=20.0),
+}
+
+
+def load_llm_tasks() -> Dict[str, LLMTask]:
+    """
+    Builds the task registry from the defaults plus any overrides, so routing can change without code changes:
+    - LLM_TASK_CONFIG_PATH can point at a JSON file like {"qa": {"model": "gpt-4.1-nano", "timeout": 10}}
+    - LLM_TASK_<TASK>_MODEL (e.g. LLM_TASK_SEMANTIC_EVAL_MODEL) overrides a single task's model
+    """
+
+    tasks = {name: task.model_copy() for name, task in DEFAULT_LLM_TASKS.items()}
+
+    config_path = (os.getenv("LLM_TASK_CONFIG_PATH") or "").strip()
+    if config_path:
+        if not os.path.isfile(config_path):
+            raise RuntimeError(f"LLM_TASK_CONFIG_PATH is set to {config_path!r}, but there is no such file. Unset it to use the default LLM tasks.")
+
+        try:
+            with open(config_path, "r", encoding="utf-8") as config_file:
+                overrides = json.load(config_file)
+        except json.JSONDecodeError as e:
+            raise RuntimeError(f"LLM_TASK_CONFIG_PATH {config_path!r} is not valid JSON: {e}") from e
+
+        for name, override in overrides.items():
+            base = tasks.get(name)
+            tasks[name] = base.model_copy(update=override) if base else LLMTask(**override)
+
+    for name, task in tasks.items():
+        model = os.getenv(f"LLM_TASK_{name.upper()}_MODEL")
+        if model:
+            task.model = model
+
+    return tasks
+
+
+LLM_TASKS = load_llm_tasks()
+
+
+def get_llm_task(name: str) -> LLMTask:
+    """Looks up a task's routing. Every call site names its task, so an unknown name is a programming error."""
+
+    task = LLM_TASKS.get(name)
+    if task is None:
+        raise ValueError(f"Unknown LLM task: {name}")
+
+    return task
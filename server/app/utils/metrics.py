@@ -0,0 +1,59 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class Metrics:
+    """In-process counters and timings. Served from /metrics so we can watch the AI pipelines without extra infrastructure."""
+
+    def __init__(self):
+        self._lock = threading.Lock() # Some work runs in worker threads, so updates must be thread safe
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._timings: Dict[str, Dict[str, float]] = {}
+
+
+    def increment(self, name: str, value: float = 1.0) -> None:
+        """Adds the value to the named counter."""
+
+        with self._lock:
+            self._counters[name] += value
+
+
+    def observe(self, name: str, value: float) -> None:
+        """Records a measurement (e.g. a latency in seconds) and keeps its count, total and max."""
+
+        with self._lock:
+            timing = self._timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            timing["count"] += 1
+            timing["total"] += value
+            timing["max"] = max(timing["max"], value)
+
+
+    def get(self, name: str) -> float:
+        """Returns the current value of a counter."""
+
+        with self._lock:
+            return self._counters.get(name, 0.0)
+
+
+    def ratio(self, numerator: str, denominator: str) -> float | None:
+        """Returns numerator / denominator for two counters, or None if the denominator is still 0."""
+
+        with self._lock:
+            total = self._counters.get(denominator, 0.0)
+            return self._counters.get(numerator, 0.0) / total if total else None
+
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Returns a copy of every counter and timing, with the mean of each timing filled in."""
+
+        with self._lock:
+            timings = {
+                name: {**timing, "mean": timing["total"] / timing["count"] if timing["count"] else 0.0}
+                for name, timing in self._timings.items()
+            }
+
+            return {"counters": dict(sorted(self._counters.items())), "timings": timings}
+
+
+metrics = Metrics()
@@ -0,0 +1,37 @@
+from app.utils.prompts.layout import layout_messages, static_prefix
+
+
+SYSTEM_CONTENT = """You are a teaching assistant who keeps short notes on a conversation between a language teacher and a student about \
+    the student's attempt at an exercise, so the teacher can keep answering questions without rereading the whole conversation. The following is \
+    information on the data you're provided:
+    original_feedback: The feedback the student got on their attempt, which started the conversation.
+    previous_summary: Your notes on the conversation so far. Can be None if there are no notes yet.
+    new_entries: A list of strings continuing the conversation. Elements at even indices are the student's questions and elements at odd indices are the teacher's answers.
+
+    You must respond ONLY with valid JSON in this exact format:
+    {
+        "summary": "The student asked why their ب was marked wrong and was told the dot must sit below the bowl, not inside it. They then asked how long the bowl should be and were told to keep it about twice as wide as it is tall."
+    }
+
+    Rules:
+    - summary must combine previous_summary and new_entries into one set of notes.
+    - Keep every question the student asked and the key point of each answer, including any Arabic letters or words discussed.
+    - Leave out greetings, encouragement and anything already in original_feedback.
+    - summary must be at most 120 words and written in English.
+    """.strip()
+
+
+def build_summarize_conversation_messages(
+    original_feedback: str,
+    previous_summary: str | None,
+    new_entries: str
+):
+    return layout_messages(
+        static_prefix("summarize_conversation", SYSTEM_CONTENT),
+        "Given the following conversation, update the notes on it:",
+        {
+            "original_feedback": original_feedback,
+            "previous_summary": previous_summary,
+            "new_entries": new_entries
+        }
+    )
@@ -0,0 +1,47 @@
+from typing import Any, Dict, List, Tuple
+
+
+Message = Dict[str, Any]
+
+# (prompt, language, dialect) -> the messages every call of that prompt starts with
+_prefixes: Dict[Tuple[str, str | None, str | None], Tuple[Message, ...]] = {}
+
+
+def static_prefix(prompt: str, system_content: str, language: str | None = None, dialect: str | None = None) -> Tuple[Message, ...]:
+    """
+    Returns the messages every call of the prompt starts with for the language and dialect. Providers cache prompts
+    by their longest repeated prefix, so nothing that changes between calls may go in here. Built once per
+    (prompt, language, dialect), so system_content is only read the first time.
+    """
+
+    key = (prompt, language, dialect)
+    prefix = _prefixes.get(key)
+
+    if prefix is None:
+        prefix = ({"role": "system", "content": system_content},)
+        if language is not None:
+            prefix += ({"role": "system", "content": f"language: {language}\ndialect: {dialect}"},)
+
+        _prefixes[key] = prefix
+
+    return prefix
+
+
+def render_fields(instruction: str, fields: Dict[str, Any]) -> str:
+    """
+    Renders the data of a call as "name: value" lines after the instruction. Lines keep the order of the fields, so
+    callers list the ones that change least first (e.g. the attempt before the conversation about it, the question last).
+    """
+
+    return "\n".join([instruction, *(f"{name}: {value}" for name, value in fields.items())])
+
+
+def layout_messages(prefix: Tuple[Message, ...], instruction: str, fields: Dict[str, Any], images: List[Message] | None = None) -> List[Message]:
+    """Appends the user message with the call's data to the static prefix. Images and their captions go after the data."""
+
+    user_content = render_fields(instruction, fields)
+
+    if images:
+        return [*prefix, {"role": "user", "content": [{"type": "text", "text": user_content}, *images]}]
+
+    return [*prefix, {"role": "user", "content": user_content}]
@@ -1,14 +1,7 @@
-def build_check_pronounciation_messages(
-        phrase: str,
-        language: str,
-        dialect: str | None,
-        transcription: str, 
-        accuracy: float, 
-        completeness: float, 
-        overall_score: float, 
-        status: str
-    ):
-    system_content = """You are world class Arabic educator who is skilled at correcting students' prononciation of Arabic letters and words \
+from app.utils.prompts.layout import layout_messages, static_prefix
+
+
+SYSTEM_CONTENT = """You are world class Arabic educator who is skilled at correcting students' prononciation of Arabic letters and words \
     when they're trying to learn the Arabic alphabet. You are compassionate and encouraging, but take care to pick out every mistake the user \
     made and provide feedback to correct these mistakes. The following is information on the data you're provided:
     phrase: The letter or word the student is trying to pronounce.
@@ -37,24 +30,26 @@ def build_check_pronounciation_messages(
     - Ensure that all fields are provided in English with arabic words or letters included when appropriate.
     """.strip()
 
-    user_content = f"""Given the following data on the user's pronounciation of a letter or word, evaluate their performance and provide them actionable feedback to improve:
-    phrase: {phrase}
-    language: {language}
-    dialect: {dialect}
-    transcription: {transcription}
-    accuracy: {accuracy}
-    completeness: {completeness}
-    overall_score: {overall_score}
-    status: {status}
-    """.strip()
 
-    return [
-        {
-            "role": "system",
-            "content": system_content
-        },
+def build_check_pronounciation_messages(
+        phrase: str,
+        language: str,
+        dialect: str | None,
+        transcription: str, 
+        accuracy: float, 
+        completeness: float, 
+        overall_score: float, 
+        status: str
+    ):
+    return layout_messages(
+        static_prefix("check_pronounciation", SYSTEM_CONTENT, language, dialect),
+        "Given the following data on the user's pronounciation of a letter or word, evaluate their performance and provide them actionable feedback to improve:",
         {
-            "role": "user",
-            "content": user_content
+            "phrase": phrase,
+            "status": status,
+            "transcription": transcription,
+            "accuracy": accuracy,
+            "completeness": completeness,
+            "overall_score": overall_score
         }
-    ]
\ No newline at end of file
+    )
@@ -1,15 +1,7 @@
-def build_explain_pronounciation_messages(
-    query: str,
-    language: str,
-    dialect: str | None,
-    phrase: str,
-    status: str,
-    transcription: str,
-    previous_feedback: str,
-    mistake_tags: str,
-    performance_reflection: str
-):
-    system_content = """You are an excellent world class Arabic educator who is skilled at answering questions students have about their pronounciation and related performance. You are known for answering \
+from app.utils.prompts.layout import layout_messages, static_prefix
+
+
+SYSTEM_CONTENT = """You are an excellent world class Arabic educator who is skilled at answering questions students have about their pronounciation and related performance. You are known for answering \
     students' questions in a clear, intuitive, actionable way to help them effectively improve their pronounciation and/or expand their understanding of the Arabic language. You are also a skilled collaborator \
     who is able to effectively leverage the notes of their collegues regarding the student's pronounciation to better answer their questions. The following is information on the data you're provided:
     query: The question the user asks about their pronounciation.
@@ -33,25 +25,29 @@ def build_explain_pronounciation_messages(
     - Ensure that response is provided primarily in English with arabic words or letters included when appropriate.
     """.strip()
 
-    user_content = f"""Given the following data on the user's question and their pronounciation, answer their question:
-    query: {query}
-    language: {language}
-    dialect: {dialect}
-    phrase: {phrase}
-    status: {status}
-    transcription: {transcription}
-    previous_feedback: {previous_feedback}
-    mistake_tags: {mistake_tags}
-    performance_reflection: {performance_reflection}
-    """
 
-    return [
-        {
-            "role": "system",
-            "content": system_content
-        },
+def build_explain_pronounciation_messages(
+    query: str,
+    language: str,
+    dialect: str | None,
+    phrase: str,
+    status: str,
+    transcription: str,
+    previous_feedback: str,
+    mistake_tags: str,
+    performance_reflection: str
+):
+    # The attempt, then the conversation about it, then the question, so follow ups share everything up to the question
+    return layout_messages(
+        static_prefix("explain_pronounciation", SYSTEM_CONTENT, language, dialect),
+        "Given the following data on the user's question and their pronounciation, answer their question:",
         {
-            "role": "user",
-            "content": user_content
+            "phrase": phrase,
+            "status": status,
+            "transcription": transcription,
+            "mistake_tags": mistake_tags,
+            "performance_reflection": performance_reflection,
+            "previous_feedback": previous_feedback,
+            "query": query
         }
-    ]
\ No newline at end of file
+    )
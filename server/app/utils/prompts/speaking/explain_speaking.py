@@ -1,26 +1,8 @@
 from typing import List
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from app.utils.prompts.layout import Message, layout_messages, static_prefix
 
 
-def build_explain_speaking_messages(
-    query: str,
-    question: str,
-    language: str,
-    dialect: str | None,
-    vocab_words: str,
-    transcription: str,
-    accuracy: float,
-    completeness: float,
-    overall: float,
-    vocab_words_used: str,
-    answer_makes_sense: bool,
-    grammatical_score: float,
-    grammar_notes: str,
-    status: str,
-    performance_reflection: str,
-    previous_feedback: str,
-) -> List[BaseMessage]:
-    system = """You are an excellent world class Arabic educator who is skilled at answering questions students have about their responses to speaking questions they were asked. You are known for answering \
+SYSTEM_CONTENT = """You are an excellent world class Arabic educator who is skilled at answering questions students have about their responses to speaking questions they were asked. You are known for answering \
     students' questions in a clear, intuitive, actionable way to help them effectively improve their speaking and/or expand their understanding of the Arabic language. You are also a skilled collaborator \
     who is able to effectively leverage the notes of their collegues regarding the student's speaking to better answer their questions. The following is information on the data you're provided:
     query: The question the user asks about their speaking.
@@ -51,26 +33,43 @@ def build_explain_speaking_messages(
     - Ensure that response is provided primarily in English with Arabic words or letters included when appropriate.
     """.strip()
 
-    human = f"""Given the following data on the user's query and their speaking, answer their query:
-    query: {query}
-    question: {question}
-    language: {language}
-    dialect: {dialect}
-    vocab_words: {vocab_words}
-    transcription: {transcription}
-    accuracy: {accuracy}
-    completeness: {completeness}
-    overall: {overall}
-    vocab_words_used: {vocab_words_used}
-    answer_makes_sense: {answer_makes_sense}
-    grammatical_score: {grammatical_score}
-    grammar_notes: {grammar_notes}
-    status: {status}
-    performance_reflection: {performance_reflection}
-    previous_feedback: {previous_feedback}
-    """
 
-    return [
-        SystemMessage(content=system),
-        HumanMessage(content=human)
-    ]
\ No newline at end of file
+def build_explain_speaking_messages(
+    query: str,
+    question: str,
+    language: str,
+    dialect: str | None,
+    vocab_words: str,
+    transcription: str,
+    accuracy: float,
+    completeness: float,
+    overall: float,
+    vocab_words_used: str,
+    answer_makes_sense: bool,
+    grammatical_score: float,
+    grammar_notes: str,
+    status: str,
+    performance_reflection: str,
+    previous_feedback: str,
+) -> List[Message]:
+    # The attempt, then the conversation about it, then the question, so follow ups share everything up to the question
+    return layout_messages(
+        static_prefix("explain_speaking", SYSTEM_CONTENT, language, dialect),
+        "Given the following data on the user's query and their speaking, answer their query:",
+        {
+            "question": question,
+            "vocab_words": vocab_words,
+            "transcription": transcription,
+            "accuracy": accuracy,
+            "completeness": completeness,
+            "overall": overall,
+            "vocab_words_used": vocab_words_used,
+            "answer_makes_sense": answer_makes_sense,
+            "grammatical_score": grammatical_score,
+            "grammar_notes": grammar_notes,
+            "status": status,
+            "performance_reflection": performance_reflection,
+            "previous_feedback": previous_feedback,
+            "query": query
+        }
+    )
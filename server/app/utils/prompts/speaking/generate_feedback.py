@@ -1,23 +1,8 @@
 from typing import List
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from app.utils.prompts.layout import Message, layout_messages, static_prefix
 
 
-def build_generate_feedback_messages(
-    status: str,
-    language: str, 
-    dialect: str | None,
-    question: str,
-    vocab_words: str,
-    transcription: str,
-    accuracy: float,
-    completeness: float,
-    overall: float,
-    vocab_words_used: str,
-    answer_makes_sense: bool,
-    grammatical_score: float,
-    grammar_notes: str,
-) -> List[BaseMessage]:
-    system = """You are a highly experienced Arabic teacher who is skilled at teaching Arabic to students who may \
+SYSTEM_CONTENT = """You are a highly experienced Arabic teacher who is skilled at teaching Arabic to students who may \
     not have had prior exposure to the language. You are highly encouraging and based on the user's response \
     evaluation, you are able to generate comphrensive, honest, actionable feedback for how they could improve. \
     The following is information about the data you're provided:
@@ -51,23 +36,36 @@ def build_generate_feedback_messages(
     - performance_reflection must be a string that summarizes the user's answer and mistakes if applicable for other teachers to reference when trying to help the student.
     """.strip()
 
-    human = f"""Given the following data regarding the quality of the user's response to the specified question, generate feedback for them to improve:
-    status: {status}
-    language: {language}
-    dialect: {dialect}
-    question: {question}
-    vocab_words: {vocab_words}
-    transcription: {transcription}
-    accuracy: {accuracy}
-    completeness: {completeness}
-    overall: {overall}
-    vocab_words_used: {vocab_words_used}
-    answer_makes_sense: {answer_makes_sense}
-    grammatical_score: {grammatical_score}
-    grammar_notes: {grammar_notes}
-    """
 
-    return [
-        SystemMessage(content=system),
-        HumanMessage(content=human)
-    ]
\ No newline at end of file
+def build_generate_feedback_messages(
+    status: str,
+    language: str, 
+    dialect: str | None,
+    question: str,
+    vocab_words: str,
+    transcription: str,
+    accuracy: float,
+    completeness: float,
+    overall: float,
+    vocab_words_used: str,
+    answer_makes_sense: bool,
+    grammatical_score: float,
+    grammar_notes: str,
+) -> List[Message]:
+    return layout_messages(
+        static_prefix("generate_feedback", SYSTEM_CONTENT, language, dialect),
+        "Given the following data regarding the quality of the user's response to the specified question, generate feedback for them to improve:",
+        {
+            "question": question,
+            "vocab_words": vocab_words,
+            "status": status,
+            "transcription": transcription,
+            "accuracy": accuracy,
+            "completeness": completeness,
+            "overall": overall,
+            "vocab_words_used": vocab_words_used,
+            "answer_makes_sense": answer_makes_sense,
+            "grammatical_score": grammatical_score,
+            "grammar_notes": grammar_notes
+        }
+    )
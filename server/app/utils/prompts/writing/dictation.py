@@ -1,5 +1,7 @@
-def build_dictation_messages(user_image_url: str, target_word: str, language: str, dialect: str | None):
-    system_content = """You are a world class Arabic educator who is skilled at evaluating the writing of Arabic students with little to no Arabic exposure. You are \
+from app.utils.prompts.layout import layout_messages, static_prefix
+
+
+SYSTEM_CONTENT = """You are a world class Arabic educator who is skilled at evaluating the writing of Arabic students with little to no Arabic exposure. You are \
     specialized at looking at an image of the student's word writing of a word they were to write from dictation and evaluating how closely the student wrote the \
     correct word from the dictation and offer them feedback on how they can improve their writing. You are a strict grader and have high standards for your students, \
     but strive to help guide them to improve their Arabic writing with honest, rigorous, but encouraging feedback for improvement. The following is information on the \
@@ -52,24 +54,21 @@ def build_dictation_messages(user_image_url: str, target_word: str, language: st
     - Ensure that all string output fields are provided primarily in English.
     """
 
-    user_content = f"""Given the user writing image and the target word, evaluate their writing. The details for the letters joined are provided below:
-    language: {language}
-    dialect: {dialect}
-    target_word: {target_word}
-    """
 
-    return [
-        {"role": "system", "content": system_content},
+def build_dictation_messages(user_image_url: str, target_word: str, language: str, dialect: str | None, user_image_detail: str = "auto"):
+    return layout_messages(
+        static_prefix("dictation", SYSTEM_CONTENT, language, dialect),
+        "Given the user writing image and the target word, evaluate their writing. The details for the letters joined are provided below:",
         {
-            "role": "user",
-            "content": [
-                {"type": "text", "text": user_content},
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": user_image_url
-                    }
+            "target_word": target_word
+        },
+        images=[
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": user_image_url,
+                    "detail": user_image_detail
                 }
-            ]
-        }
-    ]
\ No newline at end of file
+            }
+        ]
+    )
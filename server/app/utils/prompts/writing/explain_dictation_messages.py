@@ -1,21 +1,7 @@
-def build_explain_dictation_messages(
-    query: str,
-    language: str,
-    dialect: str | None,
-    target_word: str,
-    status: str,
-    word_accuracy: float,
-    letter_identity: float,
-    joining_quality: float,
-    legibility: float,
-    dots_diacritics: float,
-    baseline_spacing: float,
-    overall: float,
-    previous_feedback: str,
-    mistake_tags: str,
-    performance_reflection: str
-):
-    system_content = """You are an excellent world class Arabic educator who is skilled at answering questions students have about their writing and related performance. You are known for answering \
+from app.utils.prompts.layout import layout_messages, static_prefix
+
+
+SYSTEM_CONTENT = """You are an excellent world class Arabic educator who is skilled at answering questions students have about their writing and related performance. You are known for answering \
     students' questions in a clear, intuitive, actionable way to help them effectively improve their writing and/or expand their understanding of the Arabic language. You are also a skilled collaborator \
     who is able to effectively leverage the notes of their colleagues regarding the student's writing to better answer their questions. The following is information on the data you're provided:
     query: The question the user asks about their writing.
@@ -45,31 +31,41 @@ def build_explain_dictation_messages(
     - Ensure that response is provided primarily in English with Arabic words or letters included when appropriate.
     """.strip()
 
-    user_content = f"""Given the following data on the user's question and their writing, answer their question:
-    query: {query}
-    language: {language}
-    dialect: {dialect}
-    target_word: {target_word}
-    status: {status}
-    word_accuracy: {word_accuracy}
-    letter_identity: {letter_identity}
-    joining_quality: {joining_quality}
-    legibility: {legibility}
-    dots_diacritics: {dots_diacritics}
-    baseline_spacing: {baseline_spacing}
-    overall: {overall}
-    previous_feedback: {previous_feedback}
-    mistake_tags: {mistake_tags}
-    performance_reflection: {performance_reflection}
-    """
 
-    return [
-        {
-            "role": "system",
-            "content": system_content
-        },
+def build_explain_dictation_messages(
+    query: str,
+    language: str,
+    dialect: str | None,
+    target_word: str,
+    status: str,
+    word_accuracy: float,
+    letter_identity: float,
+    joining_quality: float,
+    legibility: float,
+    dots_diacritics: float,
+    baseline_spacing: float,
+    overall: float,
+    previous_feedback: str,
+    mistake_tags: str,
+    performance_reflection: str
+):
+    # The attempt, then the conversation about it, then the question, so follow ups share everything up to the question
+    return layout_messages(
+        static_prefix("explain_dictation", SYSTEM_CONTENT, language, dialect),
+        "Given the following data on the user's question and their writing, answer their question:",
         {
-            "role": "user",
-            "content": user_content
+            "target_word": target_word,
+            "status": status,
+            "word_accuracy": word_accuracy,
+            "letter_identity": letter_identity,
+            "joining_quality": joining_quality,
+            "legibility": legibility,
+            "dots_diacritics": dots_diacritics,
+            "baseline_spacing": baseline_spacing,
+            "overall": overall,
+            "mistake_tags": mistake_tags,
+            "performance_reflection": performance_reflection,
+            "previous_feedback": previous_feedback,
+            "query": query
         }
-    ]
\ No newline at end of file
+    )
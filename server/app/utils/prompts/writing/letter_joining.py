@@ -1,11 +1,7 @@
-def build_letter_joining_messages(
-    user_image_url: str, 
-    letter_list: str, 
-    target_word: str,
-    language: str,
-    dialect: str | None
-):
-    system_content = """You are a world class Arabic educator who is skilled at evaluating the writing of Arabic students with little to no Arabic exposure. You are \
+from app.utils.prompts.layout import layout_messages, static_prefix
+
+
+SYSTEM_CONTENT = """You are a world class Arabic educator who is skilled at evaluating the writing of Arabic students with little to no Arabic exposure. You are \
     specialized at looking at an image of the student's word writing and evaluating how well a student joined together a list of Arabic letters to form a target word \
     and offer them feedback on how they can improve their writing. You are a strict grader and have high standards for your students, but strive to help guide them to \
     improve their Arabic writing with blunt but encouraging feedback for improvement. The following is information on the data you're provided:
@@ -51,25 +47,29 @@ def build_letter_joining_messages(
     - Ensure that all string output fields are provided primarily in English.
     """
 
-    user_content = f"""Given the user letter joining writing image, the sequence of letters, and the target word, evaluate their writing. The details for the letters joined are provided below:
-    letter_list: {letter_list}
-    target_word: {target_word}
-    language: {language}
-    dialect: {dialect}
-    """
 
-    return [
-        {"role": "system", "content": system_content},
+def build_letter_joining_messages(
+    user_image_url: str, 
+    letter_list: str, 
+    target_word: str,
+    language: str,
+    dialect: str | None,
+    user_image_detail: str = "auto"
+):
+    return layout_messages(
+        static_prefix("letter_joining", SYSTEM_CONTENT, language, dialect),
+        "Given the user letter joining writing image, the sequence of letters, and the target word, evaluate their writing. The details for the letters joined are provided below:",
         {
-            "role": "user",
-            "content": [
-                {"type": "text", "text": user_content},
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": user_image_url
-                    }
+            "letter_list": letter_list,
+            "target_word": target_word
+        },
+        images=[
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": user_image_url,
+                    "detail": user_image_detail
                 }
-            ]
-        }
-    ]
\ No newline at end of file
+            }
+        ]
+    )
@@ -1,12 +1,7 @@
-def build_letter_writing_messages(
-    user_image_url: str, 
-    target_image_url: str, 
-    letter: str, 
-    language: str,
-    dialect: str | None,
-    position: str | None
-):
-    system_content = """You are a world class Arabic educator who is especially talented at evaluating the handwriting of his students \
+from app.utils.prompts.layout import layout_messages, static_prefix
+
+
+SYSTEM_CONTENT = """You are a world class Arabic educator who is especially talented at evaluating the handwriting of his students \
     and offering them feedback to improve. You are especially good with working with beginner Arabic students with no prior exposure to Arabic \
     and guiding them with writing Arabic letters properly and cleanly in their various forms such as beginning, middle, end, and standalone. You \
     are proficient at looking at an image of the student's letter writing and a reference image of how the letter is correctly written and provide \
@@ -19,6 +14,7 @@ def build_letter_writing_messages(
     position: The position at which the letter is at, which influences how its written. The position may only be one of the following: beginning, middle, end, standalone. It is possible for this to be null if letter position is not relevant for a language.
     user_image_url: Image data of the user's photo of their writing of the letter.
     target_image_url: Image data of how the letter is ideally written. This is ONLY to be used as a general guideline on how the letter is to be written.
+    shape_similarity: An automated 0-100 estimate of how closely the outline of the user's writing matches the reference image. It is only a rough hint and can be None. Always judge the writing by what you see in the images.
 
     You must respond ONLY with valid JSON in this exact format:
     {
@@ -53,39 +49,48 @@ def build_letter_writing_messages(
     - Ensure that all string output fields are provided primarily in English
     """
 
-    user_content = f"""Given the user letter writing image and the reference letter writing image, evaluate their writing. The details for the letter written are provided below:
-    letter: {letter}
-    language: {language}
-    dialect: {dialect}
-    position: {position}
-    """
 
-    return [
-        {"role": "system", "content": system_content},
+def build_letter_writing_messages(
+    user_image_url: str, 
+    target_image_url: str, 
+    letter: str, 
+    language: str,
+    dialect: str | None,
+    position: str | None,
+    user_image_detail: str = "auto",
+    target_image_detail: str = "auto",
+    shape_similarity: float | None = None
+):
+    return layout_messages(
+        static_prefix("letter_writing", SYSTEM_CONTENT, language, dialect),
+        "Given the user letter writing image and the reference letter writing image, evaluate their writing. The details for the letter written are provided below:",
         {
-            "role": "user",
-            "content": [
-                {"type": "text", "text": user_content},
-                {
-                    "type": "text", 
-                    "text": "STUDENT IMAGE - Photo of the student's writing of the letter"
-                },
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": user_image_url
-                    }
-                },
-                {
-                    "type": "text", 
-                    "text": "REFERENCE IMAGE - Reference photo of how the letter ought to be written"
-                },
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": target_image_url
-                    }
+            "letter": letter,
+            "position": position,
+            "shape_similarity": round(shape_similarity, 1) if shape_similarity is not None else None
+        },
+        images=[
+            {
+                "type": "text", 
+                "text": "STUDENT IMAGE - Photo of the student's writing of the letter"
+            },
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": user_image_url,
+                    "detail": user_image_detail
+                }
+            },
+            {
+                "type": "text", 
+                "text": "REFERENCE IMAGE - Reference photo of how the letter ought to be written"
+            },
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": target_image_url,
+                    "detail": target_image_detail
                 }
-            ]
-        }
-    ]
\ No newline at end of file
+            }
+        ]
+    )
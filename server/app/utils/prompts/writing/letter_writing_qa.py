@@ -1,5 +1,7 @@
-def build_letter_writing_qa_messages(user_image_url: str):
-    system_content = """You are a quality inspector for a handwriting learning app. Your job is ONLY to decide whether the image quality \
+from app.utils.prompts.layout import layout_messages, static_prefix
+
+
+SYSTEM_CONTENT = """You are a quality inspector for a handwriting learning app. Your job is ONLY to decide whether the image quality \
     is good enough to evaluate handwriting. If the image of the student's writing is of good enough quality to be used downstream in a handwriting \
     critique system, approve the image. You err on the side of leniency.
     Return ONLY valid JSON in this exact format:
@@ -21,20 +23,19 @@ def build_letter_writing_qa_messages(user_image_url: str):
     - capture_tips will be based on reasons.
     """
 
-    user_content = "Given the image, perform QA upon it."
 
-    return [
-        {"role": "system", "content": system_content},
-        {
-            "role": "user",
-            "content": [
-                {"type": "text", "text": user_content},
-                {
-                    "type": "image_url", 
-                    "image_url": {
-                        "url": user_image_url
-                    }
+def build_letter_writing_qa_messages(user_image_url: str, user_image_detail: str = "auto"):
+    return layout_messages(
+        static_prefix("letter_writing_qa", SYSTEM_CONTENT),
+        "Given the image, perform QA upon it.",
+        {},
+        images=[
+            {
+                "type": "image_url",
+                "image_url": {
+                    "url": user_image_url,
+                    "detail": user_image_detail
                 }
-            ]
-        }
-    ]
\ No newline at end of file
+            }
+        ]
+    )
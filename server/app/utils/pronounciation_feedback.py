@@ -0,0 +1,206 @@
+from typing import Any, Dict, List, Literal
+from pydantic import BaseModel
+from app.db.enums import AvailableLanguage, AvailableDialect
+from app.models.ai.pronounciation import PronounciationFeedback
+from app.utils.constants import (
+    PRONOUNCIATION_PASS_OVERALL_SCORE,
+    PRONOUNCIATION_PASS_ACCURACY_SCORE,
+    PRONOUNCIATION_PASS_COMPLETENESS_SCORE,
+    PRONOUNCIATION_TEMPLATE_MARGIN,
+    PRONOUNCIATION_WEAK_PHONEME_SCORE,
+    PRONOUNCIATION_TEMPLATE_MAX_ISSUES,
+)
+
+
+ScoreBand = Literal["clear_pass", "clear_fail", "borderline"]
+
+# Interjected at the start of templated feedback, the way the LLM mixes the language into its English feedback
+PRAISE: Dict[AvailableLanguage, str] = {
+    AvailableLanguage.ARABIC: "ممتاز",
+    AvailableLanguage.FRENCH: "Excellent",
+    AvailableLanguage.SPANISH: "¡Excelente",
+}
+
+ENCOURAGEMENT: Dict[AvailableLanguage, str] = {
+    AvailableLanguage.ARABIC: "يلا",
+    AvailableLanguage.FRENCH: "Allez",
+    AvailableLanguage.SPANISH: "¡Vamos",
+}
+
+
+class WordDetail(BaseModel):
+    """Azure's assessment of one word of the reference text"""
+    word: str
+    accuracy: float
+    error_type: str # None, Omission, Insertion or Mispronunciation
+    weak_phonemes: List[str] # Phonemes scoring below PRONOUNCIATION_WEAK_PHONEME_SCORE, weakest first
+
+
+def parse_word_details(best: Dict[str, Any]) -> List[WordDetail]:
+    """Reads the word and phoneme scores out of the best result of Azure's detailed response."""
+
+    details = []
+
+    for word in best.get("Words") or []:
+        assessment = word.get("PronunciationAssessment") or word # Older responses put the scores on the word itself
+        phonemes = sorted(
+            (
+                ((phoneme.get("PronunciationAssessment") or phoneme).get("AccuracyScore", 100.0), phoneme.get("Phoneme"))
+                for phoneme in word.get("Phonemes") or []
+            ),
+            key=lambda phoneme: phoneme[0]
+        )
+
+        details.append(WordDetail(
+            word=word.get("Word", ""),
+            accuracy=assessment.get("AccuracyScore", 0.0),
+            error_type=assessment.get("ErrorType") or "None",
+            weak_phonemes=[name for score, name in phonemes if name and score < PRONOUNCIATION_WEAK_PHONEME_SCORE]
+        ))
+
+    return details
+
+
+def passes(accuracy: float, completeness: float, overall: float) -> bool:
+    return (
+        overall >= PRONOUNCIATION_PASS_OVERALL_SCORE
+        and accuracy >= PRONOUNCIATION_PASS_ACCURACY_SCORE
+        and completeness >= PRONOUNCIATION_PASS_COMPLETENESS_SCORE
+    )
+
+
+def score_band(accuracy: float, completeness: float, overall: float) -> ScoreBand:
+    """
+    Sorts an attempt into a clear pass, a clear fail, or a borderline case whose feedback needs the LLM's judgement.
+    Completeness is left out of the pass margin, since saying every sound of a short phrase usually scores exactly 100.
+    """
+
+    if passes(accuracy, completeness, overall):
+        if (
+            overall >= PRONOUNCIATION_PASS_OVERALL_SCORE + PRONOUNCIATION_TEMPLATE_MARGIN
+            and accuracy >= PRONOUNCIATION_PASS_ACCURACY_SCORE + PRONOUNCIATION_TEMPLATE_MARGIN
+        ):
+            return "clear_pass"
+    elif (
+        overall <= PRONOUNCIATION_PASS_OVERALL_SCORE - PRONOUNCIATION_TEMPLATE_MARGIN
+        or accuracy <= PRONOUNCIATION_PASS_ACCURACY_SCORE - PRONOUNCIATION_TEMPLATE_MARGIN
+        or completeness <= PRONOUNCIATION_PASS_COMPLETENESS_SCORE - PRONOUNCIATION_TEMPLATE_MARGIN
+    ):
+        return "clear_fail"
+
+    return "borderline"
+
+
+def language_label(language: AvailableLanguage, dialect: AvailableDialect | None) -> str:
+    if dialect is None:
+        return language.value
+    if dialect == AvailableDialect.MSA:
+        return f"Modern Standard {language.value}"
+
+    return f"{dialect.value} {language.value}"
+
+
+def _join(items: List[str]) -> str:
+    return items[0] if len(items) == 1 else f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+def _issues(words: List[WordDetail]) -> List[tuple[str, str, str]]:
+    """Returns (mistake tag, feedback sentence, reflection note) for each problem in the attempt, most serious first."""
+
+    omitted = [word.word for word in words if word.error_type == "Omission"]
+    mispronounced = [word for word in words if word.error_type == "Mispronunciation"]
+    weak = [word for word in words if word.error_type == "None" and word.weak_phonemes]
+    inserted = [word.word for word in words if word.error_type == "Insertion"]
+
+    issues = []
+
+    if omitted:
+        issues.append((
+            "OMITTED_WORD",
+            f"You left out {_join(omitted)}, so make sure you say the whole phrase.",
+            f"omitted {_join(omitted)}"
+        ))
+
+    for word in mispronounced:
+        if word.weak_phonemes:
+            sounds = _join([f"/{phoneme}/" for phoneme in word.weak_phonemes[:2]])
+            issues.append((
+                "MISPRONOUNCED_SOUND",
+                f"In {word.word}, the {sounds} {'sound needs' if len(word.weak_phonemes[:2]) == 1 else 'sounds need'} the most work, so say it slowly and copy the reference audio.",
+                f"mispronounced {word.word} ({word.accuracy:.0f}), weakest on {sounds}"
+            ))
+        else:
+            issues.append((
+                "MISPRONOUNCED_WORD",
+                f"{word.word} didn't sound quite right yet, so listen to the reference audio and repeat it slowly.",
+                f"mispronounced {word.word} ({word.accuracy:.0f})"
+            ))
+
+    for word in weak:
+        sounds = _join([f"/{phoneme}/" for phoneme in word.weak_phonemes[:2]])
+        issues.append((
+            "WEAK_SOUND",
+            f"Pay a little more attention to the {sounds} in {word.word}.",
+            f"{sounds} in {word.word} scored low"
+        ))
+
+    if inserted:
+        issues.append((
+            "INSERTED_WORD",
+            f"You added {_join(inserted)}, which isn't part of the phrase.",
+            f"added {_join(inserted)}"
+        ))
+
+    return issues
+
+
+def templated_feedback(
+    band: ScoreBand,
+    phrase: str,
+    is_word: bool,
+    language: AvailableLanguage,
+    dialect: AvailableDialect | None,
+    transcription: str,
+    accuracy: float,
+    completeness: float,
+    overall: float,
+    words: List[WordDetail]
+) -> PronounciationFeedback:
+    """Writes the feedback on a clear pass or clear fail from Azure's scores, without the LLM."""
+
+    label = language_label(language, dialect)
+    kind = "word" if is_word else "letter"
+    issues = _issues(words)[:PRONOUNCIATION_TEMPLATE_MAX_ISSUES]
+    scores = f"overall {overall:.0f}, accuracy {accuracy:.0f}, completeness {completeness:.0f}"
+
+    if band == "clear_pass":
+        sentences = [f"{PRAISE[language]}! Your pronounciation of {phrase} sounds clear and natural for {label}."]
+        if issues:
+            sentences.append(f"To polish it further: {issues[0][1][0].lower()}{issues[0][1][1:]}")
+            issues = issues[:1]
+        else:
+            sentences.append("Keep practising at this pace and it will become second nature.")
+    else:
+        sentences = [f"You're on your way with {phrase}, but it isn't there yet."]
+        if issues:
+            sentences.extend(issue[1] for issue in issues)
+        elif completeness <= PRONOUNCIATION_PASS_COMPLETENESS_SCORE - PRONOUNCIATION_TEMPLATE_MARGIN:
+            issues = [("INCOMPLETE_PRONOUNCIATION", "", "did not say all of it")]
+            sentences.append(f"Make sure you say all of {phrase} clearly from start to finish.")
+        else:
+            issues = [("LOW_ACCURACY", "", "sounds were far from a native speaker's")]
+            sentences.append(f"Listen to a native {label} speaker say the {kind} again and copy each sound slowly.")
+        sentences.append(f"{ENCOURAGEMENT[language]}, try it once more!")
+
+    outcome = "passed clearly" if band == "clear_pass" else "failed clearly"
+    notes = f" Notes: {'; '.join(issue[2] for issue in issues)}." if issues else ""
+    heard = f"was heard saying \"{transcription}\"" if transcription else "nothing they said was recognized"
+
+    return PronounciationFeedback(
+        feedback=" ".join(sentences),
+        mistake_tags=[issue[0] for issue in issues],
+        performance_reflection=(
+            f"The student {outcome} on the {label} {kind} {phrase} ({scores}) and {heard}.{notes} "
+            "The feedback was written from the automated scores without a detailed review."
+        )
+    )
@@ -0,0 +1,200 @@
+import io
+import base64
+import asyncio
+import numpy as np
+from PIL import Image
+from pydantic import BaseModel
+from app.utils.cache import TTLCache
+from app.utils.image_processing import PreparedImage
+from app.utils.constants import (
+    SHAPE_CANVAS_SIZE,
+    SHAPE_CHAMFER_SCALE,
+    SHAPE_HU_SCALE,
+    SHAPE_CHAMFER_WEIGHT,
+    REFERENCE_IMAGE_CACHE_SIZE,
+    REFERENCE_IMAGE_TTL_SECONDS,
+)
+
+
+class ShapeMatch(BaseModel):
+    """How closely the shape of the user's writing matches the reference"""
+    score: float # 0-100 combined similarity
+    chamfer_distance: float # Mean distance between the two skeletons, as a fraction of the canvas
+    hu_distance: float # Distance between the log scaled Hu moments of the two shapes
+
+
+class ShapeDescriptor(BaseModel):
+    """What we compare for one image: its skeleton points on the normalized canvas and its Hu moments"""
+    skeleton_points: list[tuple[int, int]]
+    hu_moments: list[float]
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    """Finds the gray level that best separates ink from paper (Otsu's method: max between-class variance)."""
+
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+
+    weight_dark = np.cumsum(histogram)
+    weight_light = weight_dark[-1] - weight_dark
+    sum_dark = np.cumsum(histogram * levels)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_dark = sum_dark / weight_dark
+        mean_light = (sum_dark[-1] - sum_dark) / weight_light
+        between_variance = weight_dark * weight_light * (mean_dark - mean_light) ** 2
+
+    return int(np.nanargmax(between_variance))
+
+
+def normalize_shape(mask: np.ndarray, size: int = SHAPE_CANVAS_SIZE) -> np.ndarray:
+    """Crops the ink, centres it on a square canvas keeping its aspect ratio, and resizes it to size x size."""
+
+    rows, cols = np.nonzero(mask)
+    cropped = mask[rows.min():rows.max() + 1, cols.min():cols.max() + 1]
+
+    side = max(cropped.shape)
+    canvas = np.zeros((side, side), dtype=np.uint8)
+    top, left = (side - cropped.shape[0]) // 2, (side - cropped.shape[1]) // 2
+    canvas[top:top + cropped.shape[0], left:left + cropped.shape[1]] = cropped * 255
+
+    # Leave a small border so the skeleton never touches the edge
+    inner = size - 4
+    resized = np.asarray(Image.fromarray(canvas).resize((inner, inner), Image.Resampling.BILINEAR)) > 127
+
+    return np.pad(resized, 2)
+
+
+def skeletonize(mask: np.ndarray) -> np.ndarray:
+    """Thins the ink down to 1 pixel wide strokes with the Zhang-Suen algorithm, so stroke thickness doesn't matter."""
+
+    image = np.pad(mask.astype(np.uint8), 1)
+
+    changed = True
+    while changed:
+        changed = False
+
+        for step in (0, 1):
+            # The 8 neighbours of every pixel, clockwise from the one above
+            p2, p3, p4 = image[:-2, 1:-1], image[:-2, 2:], image[1:-1, 2:]
+            p5, p6, p7 = image[2:, 2:], image[2:, 1:-1], image[2:, :-2]
+            p8, p9 = image[1:-1, :-2], image[:-2, :-2]
+            neighbours = [p2, p3, p4, p5, p6, p7, p8, p9]
+
+            neighbour_count = sum(neighbours)
+            transitions = sum((first == 0) & (second == 1) for first, second in zip(neighbours, neighbours[1:] + neighbours[:1]))
+
+            if step == 0:
+                side_condition = (p2 * p4 * p6 == 0) & (p4 * p6 * p8 == 0)
+            else:
+                side_condition = (p2 * p4 * p8 == 0) & (p2 * p6 * p8 == 0)
+
+            core = image[1:-1, 1:-1]
+            removable = (core == 1) & (neighbour_count >= 2) & (neighbour_count <= 6) & (transitions == 1) & side_condition
+
+            if removable.any():
+                core[removable] = 0
+                changed = True
+
+    return image[1:-1, 1:-1].astype(bool)
+
+
+def hu_moments(mask: np.ndarray) -> np.ndarray:
+    """Computes the 7 Hu moments of the shape, log scaled so they are comparable. They don't change with position or scale."""
+
+    ys, xs = np.nonzero(mask)
+    xs, ys = xs.astype(np.float64), ys.astype(np.float64)
+    area = len(xs)
+    dx, dy = xs - xs.mean(), ys - ys.mean()
+
+    eta = lambda p, q: (dx ** p * dy ** q).sum() / area ** (1 + (p + q) / 2)
+    n20, n02, n11 = eta(2, 0), eta(0, 2), eta(1, 1)
+    n30, n03, n21, n12 = eta(3, 0), eta(0, 3), eta(2, 1), eta(1, 2)
+
+    moments = np.array([
+        n20 + n02,
+        (n20 - n02) ** 2 + 4 * n11 ** 2,
+        (n30 - 3 * n12) ** 2 + (3 * n21 - n03) ** 2,
+        (n30 + n12) ** 2 + (n21 + n03) ** 2,
+        (n30 - 3 * n12) * (n30 + n12) * ((n30 + n12) ** 2 - 3 * (n21 + n03) ** 2)
+        + (3 * n21 - n03) * (n21 + n03) * (3 * (n30 + n12) ** 2 - (n21 + n03) ** 2),
+        (n20 - n02) * ((n30 + n12) ** 2 - (n21 + n03) ** 2) + 4 * n11 * (n30 + n12) * (n21 + n03),
+        (3 * n21 - n03) * (n30 + n12) * ((n30 + n12) ** 2 - 3 * (n21 + n03) ** 2)
+        - (n30 - 3 * n12) * (n21 + n03) * (3 * (n30 + n12) ** 2 - (n21 + n03) ** 2),
+    ])
+
+    return -np.sign(moments) * np.log10(np.maximum(np.abs(moments), 1e-30))
+
+
+def describe_shape(gray: np.ndarray) -> ShapeDescriptor | None:
+    """Binarizes, normalizes and skeletonizes a grayscale image of writing. Returns None if there's no ink to describe."""
+
+    mask = gray <= otsu_threshold(gray)
+
+    # A (nearly) blank image puts the threshold inside the paper noise, so we require the ink to be a minority
+    if not mask.any() or mask.mean() > 0.5:
+        return None
+
+    normalized = normalize_shape(mask)
+    skeleton = skeletonize(normalized)
+    ys, xs = np.nonzero(skeleton)
+
+    return ShapeDescriptor(
+        skeleton_points=list(zip(ys.tolist(), xs.tolist())),
+        hu_moments=hu_moments(normalized).tolist()
+    )
+
+
+def chamfer_distance(first_points: np.ndarray, second_points: np.ndarray) -> float:
+    """Mean distance from each point to the nearest point of the other set, averaged both ways, as a fraction of the canvas."""
+
+    distances = np.sqrt(((first_points[:, None, :] - second_points[None, :, :]) ** 2).sum(axis=2))
+
+    return float((distances.min(axis=1).mean() + distances.min(axis=0).mean()) / 2 / SHAPE_CANVAS_SIZE)
+
+
+def compare_shapes(user: ShapeDescriptor, reference: ShapeDescriptor) -> ShapeMatch:
+    """Scores two shapes 0-100 from the chamfer distance between their skeletons and the difference of their Hu moments."""
+
+    chamfer = chamfer_distance(np.array(user.skeleton_points, dtype=np.float64), np.array(reference.skeleton_points, dtype=np.float64))
+    hu = float(np.abs(np.array(user.hu_moments) - np.array(reference.hu_moments)).sum())
+
+    chamfer_similarity = max(0.0, 1 - chamfer / SHAPE_CHAMFER_SCALE)
+    hu_similarity = float(np.exp(-hu / SHAPE_HU_SCALE))
+    score = 100 * (SHAPE_CHAMFER_WEIGHT * chamfer_similarity + (1 - SHAPE_CHAMFER_WEIGHT) * hu_similarity)
+
+    return ShapeMatch(score=score, chamfer_distance=chamfer, hu_distance=hu)
+
+
+def _grayscale_pixels(image: PreparedImage) -> np.ndarray:
+    """Decodes a prepared image back to grayscale pixels."""
+
+    encoded = image.data_url.split(",", 1)[1]
+    return np.asarray(Image.open(io.BytesIO(base64.b64decode(encoded))).convert("L"))
+
+
+# Reference image hash -> its shape, since the same references are compared against over and over
+reference_shapes: TTLCache[int, ShapeDescriptor | None] = TTLCache(REFERENCE_IMAGE_CACHE_SIZE, REFERENCE_IMAGE_TTL_SECONDS)
+
+
+def _match_to_reference(user_image: PreparedImage, reference_image: PreparedImage) -> ShapeMatch | None:
+    if reference_image.image_hash in reference_shapes:
+        reference = reference_shapes.get(reference_image.image_hash)
+    else:
+        reference = describe_shape(_grayscale_pixels(reference_image))
+        reference_shapes.set(reference_image.image_hash, reference)
+
+    user = describe_shape(_grayscale_pixels(user_image))
+
+    if user is None or reference is None or not user.skeleton_points or not reference.skeleton_points:
+        return None
+
+    return compare_shapes(user, reference)
+
+
+async def match_to_reference(user_image: PreparedImage, reference_image: PreparedImage) -> ShapeMatch | None:
+    """
+    Compares the shape of the user's writing with the reference image in a worker thread. Returns None when either
+    image has no usable ink to compare.
+    """
+    return await asyncio.to_thread(_match_to_reference, user_image, reference_image)
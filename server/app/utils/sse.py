@@ -0,0 +1,40 @@
+import json
+from typing import Any, AsyncIterator, Dict
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Formats a single Server-Sent Event. The data can be anything FastAPI knows how to JSON encode."""
+
+    payload = json.dumps(jsonable_encoder(data), ensure_ascii=False)
+
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def error_details(e: Exception) -> Dict[str, Any]:
+    """Returns the status code and detail an exception would have produced as an HTTP response."""
+
+    if isinstance(e, HTTPException):
+        return {"status_code": e.status_code, "detail": e.detail}
+
+    return {"status_code": status.HTTP_500_INTERNAL_SERVER_ERROR, "detail": str(e)}
+
+
+def format_sse_error(e: Exception) -> str:
+    """Formats an exception as an error event, since the HTTP status has already been sent once a stream starts."""
+    return format_sse("error", error_details(e))
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """Wraps an async iterator of formatted events in a streaming response."""
+
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no", # Stops proxies like nginx from buffering the stream
+        }
+    )
@@ -0,0 +1,157 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import FrozenSet, List, Sequence, Tuple
+from app.db.enums import AvailableLanguage
+from app.utils.constants import (
+    VOCAB_MATCH_MIN_SIMILARITY,
+    VOCAB_MATCH_MIN_FUZZY_LENGTH,
+    VOCAB_MATCH_CACHE_SIZE,
+)
+
+
+ARABIC_DIACRITICS = re.compile(r"[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]") # Tashkeel, Quranic marks and tatweel
+_ARABIC_FOLDING = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", # Alef with hamza or madda
+    "ى": "ي", "ی": "ي", # Alef maqsura and Persian ya, which STT and keyboards mix up with ya
+    "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه", # Ta marbuta
+    "ک": "ك",
+})
+_SEPARATORS = re.compile(r"[^\w]+") # Punctuation, apostrophes and hyphens, so "l'école" and "est-ce" split into words
+
+# Clitics STT writes joined to a word, longest first. Only stripped from what the user said, since vocab words are
+# dictionary forms (apart from the Arabic article).
+_PREFIXES = {
+    AvailableLanguage.ARABIC: ("وبال", "وال", "فال", "بال", "كال", "لل", "ال", "و", "ف", "ب", "ك", "ل", "س"),
+}
+_SUFFIXES = {
+    AvailableLanguage.ARABIC: ("كما", "هما", "كم", "كن", "هم", "هن", "نا", "ها", "ني", "ه", "ك", "ي", "ش"), # ش for dialect negation (ما...ش)
+    AvailableLanguage.FRENCH: ("s", "x"), # Plurals
+    AvailableLanguage.SPANISH: ("selo", "sela", "melo", "mela", "telo", "tela", "nos", "los", "las", "les", "me", "te", "se", "lo", "la", "le", "es", "s"), # Enclitic pronouns and plurals
+}
+_MIN_STEM_LENGTH = 3 # Shorter stems are too likely to be a different word
+
+
+def strip_accents(text: str) -> str:
+    """Drops the combining marks of Latin letters, e.g. é -> e, ñ -> n."""
+
+    decomposed = unicodedata.normalize("NFD", text)
+    return unicodedata.normalize("NFC", "".join(char for char in decomposed if unicodedata.category(char) != "Mn"))
+
+
+def normalize_text(text: str, language: AvailableLanguage) -> str:
+    """
+    Folds away the differences that don't change which word was said: case, width, punctuation and spacing, plus
+    tashkeel and alef/ya/ta marbuta spelling in Arabic, and accents and ligatures in French and Spanish.
+    """
+
+    text = unicodedata.normalize("NFKC", text).casefold()
+
+    if language == AvailableLanguage.ARABIC:
+        text = ARABIC_DIACRITICS.sub("", text).translate(_ARABIC_FOLDING)
+    else:
+        text = strip_accents(text).replace("œ", "oe").replace("æ", "ae")
+
+    return _SEPARATORS.sub(" ", text).replace("_", " ").strip()
+
+
+def tokenize(text: str, language: AvailableLanguage) -> List[str]:
+    return normalize_text(text, language).split()
+
+
+@lru_cache(maxsize=VOCAB_MATCH_CACHE_SIZE)
+def token_forms(token: str, language: AvailableLanguage) -> FrozenSet[str]:
+    """The normalized token plus what is left of it with its clitics stripped off, e.g. وبكتابها -> كتاب."""
+
+    forms = {token}
+    stems = [token]
+
+    # Up to two proclitics, e.g. a conjunction then a preposition as in وبكتابها
+    for stem in [token, *(token[len(prefix):] for prefix in _PREFIXES.get(language, ()) if token.startswith(prefix))]:
+        for prefix in _PREFIXES.get(language, ()):
+            if stem.startswith(prefix) and len(stem) - len(prefix) >= _MIN_STEM_LENGTH:
+                stems.append(stem[len(prefix):])
+
+    for stem in stems:
+        forms.add(stem)
+
+        for suffix in _SUFFIXES.get(language, ()):
+            if stem.endswith(suffix) and len(stem) - len(suffix) >= _MIN_STEM_LENGTH:
+                base = stem[:-len(suffix)]
+                forms.add(base)
+
+                # Ta marbuta is written as ta before a suffix, e.g. مدرسة + ها -> مدرستها
+                if language == AvailableLanguage.ARABIC and base.endswith("ت"):
+                    forms.add(base[:-1] + "ه")
+
+    return frozenset(forms)
+
+
+@lru_cache(maxsize=VOCAB_MATCH_CACHE_SIZE)
+def vocab_forms(vocab_word: str, language: AvailableLanguage) -> Tuple[FrozenSet[str], ...]:
+    """The forms each word of a vocab entry may be said in. Arabic vocab matches with or without its article."""
+
+    forms = []
+
+    for token in tokenize(vocab_word, language):
+        token_variants = {token}
+        if language == AvailableLanguage.ARABIC and token.startswith("ال") and len(token) - 2 >= _MIN_STEM_LENGTH:
+            token_variants.add(token[2:])
+
+        forms.append(frozenset(token_variants))
+
+    return tuple(forms)
+
+
+def similarity(first: str, second: str) -> float:
+    """1 minus the Levenshtein distance as a fraction of the longer word."""
+
+    previous = list(range(len(second) + 1))
+
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (first_char != second_char)))
+        previous = current
+
+    return 1 - previous[-1] / max(len(first), len(second), 1)
+
+
+def _word_matches(said: FrozenSet[str], expected: FrozenSet[str]) -> bool:
+    if said & expected:
+        return True
+
+    # Misspellings from STT, e.g. a dropped or swapped letter. Short words must match exactly.
+    return any(
+        similarity(said_form, expected_form) >= VOCAB_MATCH_MIN_SIMILARITY
+        for said_form in said if len(said_form) >= VOCAB_MATCH_MIN_FUZZY_LENGTH
+        for expected_form in expected if len(expected_form) >= VOCAB_MATCH_MIN_FUZZY_LENGTH
+    )
+
+
+@lru_cache(maxsize=VOCAB_MATCH_CACHE_SIZE)
+def _find_vocab_words_used(transcription: str, vocab_words: Tuple[str, ...], language: AvailableLanguage) -> Tuple[str, ...]:
+    said = [token_forms(token, language) for token in tokenize(transcription, language)]
+    used = []
+
+    for vocab_word in vocab_words:
+        expected = vocab_forms(vocab_word, language)
+        if not expected or vocab_word in used:
+            continue
+
+        # Multi-word vocab (e.g. صباح الخير) must be said as consecutive words
+        if any(
+            all(_word_matches(said[start + offset], expected_word) for offset, expected_word in enumerate(expected))
+            for start in range(len(said) - len(expected) + 1)
+        ):
+            used.append(vocab_word)
+
+    return tuple(used)
+
+
+def find_vocab_words_used(transcription: str, vocab_words: Sequence[str], language: AvailableLanguage) -> List[str]:
+    """Returns the vocab words that appear in the transcription, in the order they were given."""
+
+    return list(_find_vocab_words_used(transcription, tuple(vocab_words), language))
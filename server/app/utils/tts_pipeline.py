@@ -0,0 +1,94 @@
+import re
+import asyncio
+from typing import List
+from app.utils.constants import TTS_PIPELINE_CONCURRENCY, TTS_PIPELINE_MIN_CHARS, TTS_PIPELINE_FORMAT_PREFIXES
+from app.utils.elevenlabs import synthesize_speech_bytes, to_audio_data_url
+
+
+# A sentence ends with ., !, ?, the Arabic question mark or an ellipsis followed by whitespace, or with a newline
+SENTENCE_END = re.compile(r"(?<=[.!?؟…])\s+|\n+")
+
+
+def supports_pipelining(output_format: str) -> bool:
+    """Checks if audio in this format can be synthesized in pieces and joined back together."""
+    return output_format.startswith(TTS_PIPELINE_FORMAT_PREFIXES)
+
+
+class SentenceBuffer:
+    """Collects streamed text and hands back complete sentences as soon as they end."""
+
+    def __init__(self, min_chars: int = TTS_PIPELINE_MIN_CHARS):
+        self.min_chars = min_chars
+        self._text = ""
+
+
+    def add(self, text: str) -> List[str]:
+        """Adds the next piece of text and returns any sentences it completed."""
+
+        self._text += text
+        sentences = []
+
+        while True:
+            # Find the first sentence end that leaves us with a chunk of at least min_chars
+            cut = None
+            for match in SENTENCE_END.finditer(self._text):
+                if len(self._text[:match.start()].strip()) >= self.min_chars:
+                    cut = match
+                    break
+
+            if cut is None:
+                return sentences
+
+            sentences.append(self._text[:cut.start()].strip())
+            self._text = self._text[cut.end():]
+
+
+    def flush(self) -> List[str]:
+        """Returns whatever text is left once the stream has finished."""
+
+        remainder = self._text.strip()
+        self._text = ""
+
+        return [remainder] if remainder else []
+
+
+class PipelinedSpeech:
+    """Synthesizes sentences as they are added, with bounded parallelism, and joins the audio back in order."""
+
+    def __init__(self, output_format: str, max_concurrency: int = TTS_PIPELINE_CONCURRENCY):
+        self.output_format = output_format
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: List[asyncio.Task] = []
+        self._previous_sentence: str | None = None
+
+
+    async def _synthesize(self, sentence: str, previous_text: str | None) -> bytes:
+        async with self._semaphore:
+            return await synthesize_speech_bytes(sentence, self.output_format, previous_text)
+
+
+    def add(self, sentence: str) -> None:
+        """Starts synthesizing the sentence in the background."""
+
+        self._tasks.append(asyncio.create_task(self._synthesize(sentence, self._previous_sentence)))
+        self._previous_sentence = sentence
+
+
+    async def finish(self) -> str:
+        """Waits for every sentence and returns the joined audio as a web playable data URL."""
+
+        try:
+            segments = await asyncio.gather(*self._tasks)
+        except Exception:
+            self.cancel()
+            raise
+
+        # MP3 frames and raw PCM can both be joined by concatenating the bytes
+        return to_audio_data_url(b"".join(segments), self.output_format)
+
+
+    def cancel(self) -> None:
+        """Stops any synthesis that hasn't finished yet."""
+
+        for task in self._tasks:
+            task.cancel()
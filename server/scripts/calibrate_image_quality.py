@@ -0,0 +1,156 @@
+"""
+Calibrates the local image quality thresholds (app/utils/image_quality.py) from a folder of labelled photos:
+
+    <folder>/good/...   photos the LLM QA should accept
+    <folder>/bad/...    photos that should be retaken
+
+Run from the server directory:
+
+    python -m scripts.calibrate_image_quality path/to/photos --output image_quality_thresholds.json
+
+Then point IMAGE_QUALITY_THRESHOLDS_PATH at the output file.
+
+The reject bounds are set so at most --max-good-rejected of the good photos are wrongly rejected, pushed out by --margin
+so a small sample isn't overfit. The accept bounds are then loosened as far as possible while keeping the share of bad
+photos that are accepted without the LLM under --max-bad-accepted. Everything in between goes to the LLM QA.
+"""
+import sys
+import json
+import asyncio
+import argparse
+import numpy as np
+from pathlib import Path
+from typing import Dict, List
+from app.utils.image_processing import prepare_image
+from app.utils.image_quality import ImageQualityMetrics, ImageQualityThresholds, classify_image_quality
+
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".heic", ".heif", ".webp"}
+
+# Threshold name -> (metric, whether a problem is a value below the bound)
+CHECKS = {
+    "sharpness": ("sharpness", True),
+    "paper_brightness": ("paper_brightness", True),
+    "clipped_fraction": ("clipped_fraction", False),
+    "ink_contrast": ("ink_contrast", True),
+    "ink_fraction_min": ("ink_fraction", True),
+    "ink_fraction_max": ("ink_fraction", False),
+    "ink_size": ("ink_size", True),
+}
+
+
+def load_metrics(folder: Path) -> List[ImageQualityMetrics]:
+    """Measures every image in the folder."""
+
+    measured = []
+
+    for path in sorted(folder.rglob("*")):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+
+        try:
+            prepared = asyncio.run(prepare_image(path.read_bytes()))
+            measured.append(prepared.quality.metrics)
+        except Exception as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+
+    return measured
+
+
+def bounds_at(good: List[ImageQualityMetrics], percentile: float, margin: float = 0.0) -> Dict[str, float]:
+    """
+    Returns the bound for every check that the given percentile of good photos fail, moved outward by margin times
+    the spread of the good photos so the bounds don't overfit a small sample.
+    """
+
+    bounds = {}
+
+    for name, (metric, problem_is_low) in CHECKS.items():
+        values = [getattr(m, metric) for m in good]
+        spread = float(np.percentile(values, 95) - np.percentile(values, 5))
+        bound = float(np.percentile(values, percentile if problem_is_low else 100 - percentile))
+        bounds[name] = max(0.0, bound - margin * spread) if problem_is_low else bound + margin * spread
+
+    return bounds
+
+
+def verdict_counts(measured: List[ImageQualityMetrics], thresholds: ImageQualityThresholds) -> Dict[str, int]:
+    counts = {"reject": 0, "accept": 0, "uncertain": 0}
+
+    for metrics in measured:
+        counts[classify_image_quality(metrics, thresholds).verdict] += 1
+
+    return counts
+
+
+def calibrate(
+    good: List[ImageQualityMetrics],
+    bad: List[ImageQualityMetrics],
+    max_good_rejected: float,
+    max_bad_accepted: float,
+    margin: float
+) -> ImageQualityThresholds:
+    # Tighten the reject bounds until at most max_good_rejected of the good photos fail any check
+    percentile = max_good_rejected * 100
+    while True:
+        reject_bounds = bounds_at(good, percentile, margin)
+        thresholds = ImageQualityThresholds(**{f"{name}_reject": value for name, value in reject_bounds.items()})
+
+        if percentile <= 0 or verdict_counts(good, thresholds)["reject"] / len(good) <= max_good_rejected:
+            break
+
+        percentile = max(0.0, percentile - 0.1)
+
+    best = None
+
+    # Start strict (only the best half of the good photos skip the LLM) and loosen while few enough bad photos get through
+    for percentile in range(50, 0, -1):
+        accept_bounds = bounds_at(good, percentile)
+
+        # An accept bound is never looser than its reject bound
+        for name, (_, problem_is_low) in CHECKS.items():
+            pick = max if problem_is_low else min
+            accept_bounds[name] = pick(accept_bounds[name], reject_bounds[name])
+
+        thresholds = ImageQualityThresholds(
+            **{f"{name}_reject": value for name, value in reject_bounds.items()},
+            **{f"{name}_accept": value for name, value in accept_bounds.items()}
+        )
+
+        if bad and verdict_counts(bad, thresholds)["accept"] / len(bad) > max_bad_accepted:
+            break
+
+        best = thresholds
+
+    if best is None:
+        raise SystemExit("No accept bounds keep the bad photos out. Add more good photos or raise --max-bad-accepted.")
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the local image quality thresholds from labelled photos.")
+    parser.add_argument("folder", type=Path, help="Folder with good/ and bad/ subfolders of photos")
+    parser.add_argument("--output", type=Path, default=Path("image_quality_thresholds.json"))
+    parser.add_argument("--max-good-rejected", type=float, default=0.01, help="Share of good photos that may be rejected")
+    parser.add_argument("--max-bad-accepted", type=float, default=0.02, help="Share of bad photos that may skip the LLM QA")
+    parser.add_argument("--margin", type=float, default=0.25, help="How far past the good photos the reject bounds sit, as a share of their spread")
+    args = parser.parse_args()
+
+    good = load_metrics(args.folder / "good")
+    bad = load_metrics(args.folder / "bad")
+
+    if not good:
+        raise SystemExit(f"No good photos found in {args.folder / 'good'}")
+
+    thresholds = calibrate(good, bad, args.max_good_rejected, args.max_bad_accepted, args.margin)
+    args.output.write_text(json.dumps(thresholds.model_dump(), indent=2))
+
+    print(f"Wrote {args.output}")
+    print(f"Good photos ({len(good)}): {verdict_counts(good, thresholds)}")
+    if bad:
+        print(f"Bad photos ({len(bad)}): {verdict_counts(bad, thresholds)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Evaluates the local letter shape matching (app/utils/shape_matching.py) on a folder of labelled attempts:
+
+    <folder>/<letter>/reference.png   how the letter should be written
+    <folder>/<letter>/correct/...     attempts at that letter, good or bad, that the LLM should grade
+    <folder>/<letter>/wrong/...       attempts that are clearly a different letter or shape
+
+Run from the server directory:
+
+    python -m scripts.evaluate_shape_matching path/to/letters
+
+For each candidate threshold it reports how many correct attempts would be wrongly failed without the LLM and how many
+wrong attempts would be caught. Pick SHAPE_MATCH_REJECT_SCORE where almost no correct attempts are failed.
+"""
+import sys
+import asyncio
+import argparse
+import numpy as np
+from pathlib import Path
+from typing import List
+from app.utils.image_processing import prepare_image
+from app.utils.shape_matching import match_to_reference
+
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".heic", ".heif", ".webp"}
+
+
+def image_paths(folder: Path) -> List[Path]:
+    return [path for path in sorted(folder.rglob("*")) if path.suffix.lower() in IMAGE_SUFFIXES]
+
+
+async def score_letter(letter_folder: Path) -> tuple[List[float], List[float]]:
+    """Scores every correct and wrong attempt in a letter's folder against its reference."""
+
+    references = [path for path in letter_folder.iterdir() if path.stem == "reference" and path.suffix.lower() in IMAGE_SUFFIXES]
+    if not references:
+        print(f"Skipping {letter_folder}: no reference image", file=sys.stderr)
+        return [], []
+
+    reference = await prepare_image(references[0].read_bytes())
+    scores = {"correct": [], "wrong": []}
+
+    for label in scores:
+        for path in image_paths(letter_folder / label):
+            try:
+                shape_match = await match_to_reference(await prepare_image(path.read_bytes()), reference)
+            except Exception as e:
+                print(f"Skipping {path}: {e}", file=sys.stderr)
+                continue
+
+            if shape_match is None:
+                print(f"Skipping {path}: no ink found", file=sys.stderr)
+                continue
+
+            scores[label].append(shape_match.score)
+
+    return scores["correct"], scores["wrong"]
+
+
+def describe(name: str, scores: List[float]) -> str:
+    if not scores:
+        return f"{name}: none"
+
+    low, median, high = np.percentile(scores, [5, 50, 95])
+    return f"{name} ({len(scores)}): min {min(scores):.1f}, p5 {low:.1f}, median {median:.1f}, p95 {high:.1f}, max {max(scores):.1f}"
+
+
+async def evaluate(folder: Path, thresholds: List[float]):
+    correct, wrong = [], []
+
+    for letter_folder in sorted(path for path in folder.iterdir() if path.is_dir()):
+        letter_correct, letter_wrong = await score_letter(letter_folder)
+        correct += letter_correct
+        wrong += letter_wrong
+
+        print(f"{letter_folder.name}: {describe('correct', letter_correct)} | {describe('wrong', letter_wrong)}")
+
+    if not correct:
+        raise SystemExit(f"No correct attempts found in {folder}")
+
+    print()
+    print(describe("All correct", correct))
+    print(describe("All wrong", wrong))
+    print()
+    print("threshold  correct failed  wrong caught")
+
+    for threshold in thresholds:
+        falsely_failed = sum(score < threshold for score in correct) / len(correct)
+        caught = sum(score < threshold for score in wrong) / len(wrong) if wrong else 0.0
+        print(f"{threshold:>9.1f}  {falsely_failed:>14.1%}  {caught:>12.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the local letter shape matching on labelled attempts.")
+    parser.add_argument("folder", type=Path, help="Folder with one subfolder per letter holding reference, correct/ and wrong/")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[10.0, 15.0, 20.0, 25.0, 30.0, 35.0, 40.0])
+    args = parser.parse_args()
+
+    asyncio.run(evaluate(args.folder, args.thresholds))
+
+
+if __name__ == "__main__":
+    main()
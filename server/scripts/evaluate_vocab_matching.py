@@ -0,0 +1,68 @@
+"""
+Evaluates the local vocab usage detection (app/utils/text_normalization.py) on a corpus of labelled transcriptions:
+
+    [{"language": "Arabic", "note": "...", "vocab_words": ["كتاب"], "transcription": "وبكتابها", "expected": ["كتاب"]}, ...]
+
+Run from the server directory:
+
+    python -m scripts.evaluate_vocab_matching [path/to/corpus.json]
+
+It defaults to scripts/data/vocab_matching_corpus.json, and reports the precision and recall per language, every case
+the matcher gets wrong, and how long a match takes. Exits with status 1 if any case is wrong, so add a case for every
+false positive or miss found in production before changing the normalization.
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from collections import defaultdict
+from app.db.enums import AvailableLanguage
+from app.utils.text_normalization import find_vocab_words_used, _find_vocab_words_used, token_forms, vocab_forms
+
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "vocab_matching_corpus.json"
+
+
+def evaluate(corpus_path: Path) -> bool:
+    cases = json.loads(corpus_path.read_text(encoding="utf-8"))
+    counts = defaultdict(lambda: {"true_positives": 0, "false_positives": 0, "false_negatives": 0})
+    correct = True
+
+    for case in cases:
+        language = AvailableLanguage(case["language"])
+        found = set(find_vocab_words_used(case["transcription"], case["vocab_words"], language))
+        expected = set(case["expected"])
+
+        counts[language.value]["true_positives"] += len(found & expected)
+        counts[language.value]["false_positives"] += len(found - expected)
+        counts[language.value]["false_negatives"] += len(expected - found)
+
+        if found != expected:
+            correct = False
+            print(f"WRONG [{language.value}] {case.get('note', '')}: {case['transcription']!r} found {sorted(found)}, expected {sorted(expected)}")
+
+    for language, count in counts.items():
+        found = count["true_positives"] + count["false_positives"]
+        expected = count["true_positives"] + count["false_negatives"]
+        precision = count["true_positives"] / found if found else 1.0
+        recall = count["true_positives"] / expected if expected else 1.0
+        print(f"{language}: precision {precision:.2f}, recall {recall:.2f} ({count['false_positives']} false positives, {count['false_negatives']} misses)")
+
+    # Timed without the caches, since each real transcription is only matched once
+    start = time.perf_counter()
+    for case in cases:
+        for cached in (_find_vocab_words_used, token_forms, vocab_forms):
+            cached.cache_clear()
+        find_vocab_words_used(case["transcription"], case["vocab_words"], AvailableLanguage(case["language"]))
+    print(f"Mean match time without caching: {(time.perf_counter() - start) / len(cases) * 1e6:.0f}µs over {len(cases)} cases")
+
+    return correct
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", type=Path, nargs="?", default=DEFAULT_CORPUS, help="JSON list of labelled transcriptions")
+    args = parser.parse_args()
+
+    sys.exit(0 if evaluate(args.corpus) else 1)